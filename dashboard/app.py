@@ -2,7 +2,14 @@
 import streamlit as st
 import pandas as pd
 import os
-import re # Usado para a busca de tecnologias
+import sys
+from consultas import versao_arquivo, agregados_executores, agregados_pesquisa, valores_unicos, IndiceFacetas, FACETAS_BUSCA, janela
+from busca_textual import BuscaTextual, RESULTADOS_POR_PAGINA
+
+# Permite importar os módulos de `src` ao executar o dashboard a partir da raiz do projeto
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.similarity_index import SimilarityIndex
+from src.data_io import read_table, table_columns, read_matching_rows
 
 # --- Configuração da Página ---
 # Define o título da aba do navegador e o layout da página
@@ -19,24 +26,145 @@ ARQUIVOS_CSV = {
     "Demais Organizações": './reports/demais_organizacoes.csv'
 }
 
-# Função com cache para carregar os dados, evitando recarregamentos desnecessários
+# Colunas lidas por cada página: as tabelas são carregadas sob demanda, só com o necessário.
+# A ficha detalhada lê todas as colunas, mas apenas da organização selecionada.
+COLUNAS_VISAO_GERAL = ['nome_organizacao', 'cidade_sede', 'fase_negocio', 'missoes_finais']
+COLUNAS_BUSCA = ['nome_organizacao'] + list(FACETAS_BUSCA)
+COLUNAS_PESQUISA = ['nome_organizacao', 'cidade_sede', 'tipo_organizacao_y', 'possui_nit', 'areas_expertise_x']
+COLUNAS_TABELA_PADRAO = ['nome_organizacao', 'categoria_organizacao', 'cidade_sede', 'uf_sede', 'missoes_finais', 'site_organizacao']
+OPCOES_LINHAS_POR_PAGINA = [25, 50, 100]
+
+# Índice de organizações semelhantes (gerado com `python src/build_similarity_index.py`)
+CAMINHO_INDICE_SIMILARIDADE = './reports/indice_similaridade.npz'
+
+# Função com cache para carregar os dados, evitando recarregamentos desnecessários.
+# A versão (datas de modificação dos arquivos) faz parte da chave do cache: se um arquivo
+# for regravado, os dados e todos os agregados derivados deles são recalculados.
 @st.cache_data
-def carregar_dados(caminho_do_arquivo):
-    """Carrega um arquivo CSV a partir de um caminho, com tratamento de erro."""
-    if not os.path.exists(caminho_do_arquivo):
-        # Mostra um erro se o arquivo não for encontrado
+def carregar_dados(caminho_do_arquivo, versao, colunas):
+    """
+    Carrega as colunas pedidas de um arquivo CSV, com tratamento de erro (None se não existir).
+    Se existir uma versão Parquet atualizada do arquivo (mesmo nome, extensão .parquet,
+    gerada com `python src/data_io.py <csv>`), ela é usada no lugar do CSV.
+    """
+    try:
+        return read_table(caminho_do_arquivo, columns=list(colunas))
+    except FileNotFoundError:
         return None
-    return pd.read_csv(caminho_do_arquivo)
 
-# Carrega todos os dataframes definidos no dicionário ARQUIVOS_CSV
-dataframes = {nome: carregar_dados(caminho) for nome, caminho in ARQUIVOS_CSV.items()}
+@st.cache_data
+def obter_colunas(caminho_do_arquivo, versao):
+    """Colunas de um arquivo, lidas só do cabeçalho (lista vazia se ele não existir)."""
+    try:
+        return table_columns(caminho_do_arquivo)
+    except FileNotFoundError:
+        return []
+
+@st.cache_data
+def carregar_organizacao(caminho_do_arquivo, versao, nome):
+    """Todas as colunas de uma organização, sem carregar o arquivo inteiro."""
+    return read_matching_rows(caminho_do_arquivo, 'nome_organizacao', nome)
+
+def carregar_grupo(grupo, colunas):
+    """Carrega as colunas de um grupo de organizações (as que existirem no arquivo)."""
+    caminho = ARQUIVOS_CSV[grupo]
+    disponiveis = obter_colunas(caminho, versoes[grupo])
+    if not disponiveis:
+        return None
+    return carregar_dados(caminho, versoes[grupo], tuple(col for col in colunas if col in disponiveis))
+
+def mostrar_tabela_paginada(df, chave):
+    """
+    Exibe uma tabela com paginação, ordenação e filtro feitos no servidor:
+    apenas as linhas da página atual são enviadas ao navegador.
+    """
+    col_filtro, col_termo, col_ordem, col_sentido = st.columns([1, 2, 1, 1])
+    with col_filtro:
+        coluna_filtro = st.selectbox("Filtrar coluna:", list(df.columns), key=f"{chave}_coluna_filtro")
+    with col_termo:
+        termo_filtro = st.text_input("Contém:", key=f"{chave}_termo_filtro")
+    with col_ordem:
+        ordenar_por = st.selectbox("Ordenar por:", [None] + list(df.columns), format_func=lambda c: c or "(ordem original)", key=f"{chave}_ordem")
+    with col_sentido:
+        crescente = st.radio("Sentido:", ["Crescente", "Decrescente"], horizontal=True, key=f"{chave}_sentido") == "Crescente"
+
+    col_linhas, col_pagina = st.columns(2)
+    with col_linhas:
+        por_pagina = st.selectbox("Linhas por página:", OPCOES_LINHAS_POR_PAGINA, key=f"{chave}_por_pagina")
+    _, total = janela(df, 1, 0, coluna_filtro=coluna_filtro, termo_filtro=termo_filtro)
+    total_paginas = max(1, (total - 1) // por_pagina + 1)
+    with col_pagina:
+        pagina = st.number_input(f"Página (de {total_paginas}):", min_value=1, max_value=total_paginas, value=1, key=f"{chave}_pagina")
+
+    df_pagina, total = janela(df, pagina, por_pagina, ordenar_por, crescente, coluna_filtro, termo_filtro)
+    st.caption(f"Linhas {min(total, (pagina - 1) * por_pagina + 1)}–{(pagina - 1) * por_pagina + len(df_pagina)} de {total}.")
+    st.dataframe(df_pagina, hide_index=True, use_container_width=True)
+
+# Agregados pré-calculados (ver `consultas.py`), memorizados por versão dos dados.
+# Os parâmetros com `_` não entram no hash do cache: a chave é a versão dos arquivos.
+@st.cache_data
+def obter_agregados_executores(_df, versao):
+    return agregados_executores(_df)
+
+@st.cache_data
+def obter_agregados_pesquisa(_df, versao, tipos_selecionados):
+    if tipos_selecionados:
+        _df = _df[_df['tipo_organizacao_y'].isin(tipos_selecionados)]
+    return agregados_pesquisa(_df)
+
+@st.cache_data
+def obter_valores_unicos(_df, versao, coluna):
+    return valores_unicos(_df[coluna])
+
+# O índice invertido da Busca Avançada é compartilhado entre as sessões (sem cópia a cada rerun)
+@st.cache_resource
+def obter_indice_facetas(_df, versao):
+    return IndiceFacetas(_df)
+
+# O índice BM25 fica em disco; ao mudar a versão de algum CSV, só o que mudou é reindexado
+@st.cache_resource
+def obter_busca_textual(versoes_arquivos):
+    busca = BuscaTextual()
+    busca.atualizar(ARQUIVOS_CSV)
+    return busca
+
+@st.cache_resource
+def obter_indice_similaridade(versao):
+    if not os.path.exists(CAMINHO_INDICE_SIMILARIDADE):
+        return None
+    return SimilarityIndex.load(CAMINHO_INDICE_SIMILARIDADE)
+
+def mostrar_similares(grupo, nome):
+    """Painel com os executores e as instituições de P&D mais semelhantes a uma organização."""
+    indice = obter_indice_similaridade(versao_arquivo(CAMINHO_INDICE_SIMILARIDADE))
+    if indice is None:
+        st.info("Índice de similaridade não encontrado. Execute `python src/build_similarity_index.py`.")
+        return
+    col_executores, col_pesquisa = st.columns(2)
+    for col, grupo_alvo, titulo in [
+        (col_executores, "Executores", "Executores Semelhantes"),
+        (col_pesquisa, "Base de Conhecimento e P&D", "Instituições de P&D Semelhantes"),
+    ]:
+        with col:
+            st.markdown(f"**{titulo}**")
+            similares = indice.similar_to(grupo, nome, k=5, groups=[grupo_alvo])
+            if similares:
+                st.dataframe(
+                    pd.DataFrame([(n, round(score, 3)) for _, n, score in similares], columns=["Organização", "Similaridade"]),
+                    hide_index=True, use_container_width=True
+                )
+            else:
+                st.caption("Nenhuma organização semelhante encontrada.")
+
+# Versão de cada arquivo (apenas datas de modificação): os dados em si são carregados por cada página
+versoes = {nome: versao_arquivo(caminho) for nome, caminho in ARQUIVOS_CSV.items()}
 
 # --- Barra Lateral (Sidebar) ---
 st.sidebar.title("Navegação")
 st.sidebar.markdown("Selecione uma visualização:")
 
 # Menu principal para navegar entre as diferentes páginas do dashboard
-paginas_principais = ["Visão Geral e Ficha Detalhada", "Busca Avançada", "Base de Conhecimento e P&D", "Visualização em Tabela"]
+paginas_principais = ["Visão Geral e Ficha Detalhada", "Busca Avançada", "Busca Textual", "Base de Conhecimento e P&D", "Visualização em Tabela"]
 pagina_selecionada = st.sidebar.radio("Menu Principal:", paginas_principais)
 
 # --- Corpo Principal do Dashboard ---
@@ -46,19 +174,17 @@ st.title("Mapeamento do Ecossistema de Inovação de Minas Gerais")
 if pagina_selecionada == "Visão Geral e Ficha Detalhada":
     st.header("Análise de Startups, EBTs e Médias/Grandes Empresas")
     
-    df_executores = dataframes.get("Executores")
+    df_executores = carregar_grupo("Executores", COLUNAS_VISAO_GERAL)
     
     if df_executores is not None:
+        agregados = obter_agregados_executores(df_executores, versoes["Executores"])
+
         # --- VISUALIZAÇÕES AGREGADAS ---
         st.subheader("Panorama Geral")
-        total_orgs = len(df_executores)
-        total_cidades = df_executores['cidade_sede'].nunique()
-        total_missoes = df_executores['missoes_finais'].nunique()
-        
         kpi1, kpi2, kpi3 = st.columns(3)
-        kpi1.metric("Organizações Mapeadas", total_orgs)
-        kpi2.metric("Cidades com Organizações", total_cidades)
-        kpi3.metric("Combinações de Missões", total_missoes)
+        kpi1.metric("Organizações Mapeadas", agregados['total_orgs'])
+        kpi2.metric("Cidades com Organizações", agregados['total_cidades'])
+        kpi3.metric("Combinações de Missões", agregados['total_missoes'])
         st.divider()
 
         st.subheader("Distribuições e Tendências")
@@ -66,25 +192,25 @@ if pagina_selecionada == "Visão Geral e Ficha Detalhada":
         
         with col_graf1:
             st.markdown("**Top 10 Cidades por Nº de Organizações**")
-            cidades_contagem = df_executores['cidade_sede'].value_counts().nlargest(10).sort_values(ascending=True)
-            st.bar_chart(cidades_contagem, horizontal=True)
+            st.bar_chart(agregados['top_cidades'], horizontal=True)
 
         with col_graf2:
             st.markdown("**Distribuição por Fase do Negócio**")
-            fase_contagem = df_executores['fase_negocio'].value_counts()
-            st.bar_chart(fase_contagem)
+            st.bar_chart(agregados['fases'])
+
+        st.markdown("**Organizações por Missão**")
+        st.bar_chart(agregados['missoes'])
         st.divider()
 
         # --- FICHA DETALHADA DA ORGANIZAÇÃO ---
         st.header("Ficha Detalhada da Organização")
         
-        lista_orgs = sorted(df_executores['nome_organizacao'].unique())
         org_nome_selecionado = st.selectbox(
             "Selecione uma organização para ver os detalhes:",
-            lista_orgs
+            agregados['organizacoes']
         )
         
-        org_dados = df_executores[df_executores['nome_organizacao'] == org_nome_selecionado].iloc[0]
+        org_dados = carregar_organizacao(ARQUIVOS_CSV["Executores"], versoes["Executores"], org_nome_selecionado).iloc[0]
 
         def mostrar_info(titulo, valor):
             if pd.notna(valor) and str(valor).strip() not in ["", " ", "não possui", "nan"]:
@@ -114,7 +240,7 @@ if pagina_selecionada == "Visão Geral e Ficha Detalhada":
 
         st.divider()
 
-        tab_sobre, tab_negocio, tab_contato = st.tabs(["Sobre a Organização", "Negócio e Investimento", "Contato e Links"])
+        tab_sobre, tab_negocio, tab_contato, tab_similares = st.tabs(["Sobre a Organização", "Negócio e Investimento", "Contato e Links", "Organizações Semelhantes"])
         with tab_sobre:
             st.subheader("Sobre a Organização")
             mostrar_info("Descrição", org_dados.get('descricao_organizacao'))
@@ -140,6 +266,10 @@ if pagina_selecionada == "Visão Geral e Ficha Detalhada":
             mostrar_link("Website", org_dados.get('site_organizacao'))
             mostrar_link("LinkedIn", org_dados.get('linkedin_url'))
             mostrar_info("Email para Contato", org_dados.get('email_contato'))
+
+        with tab_similares:
+            st.subheader("Organizações Semelhantes")
+            mostrar_similares("Executores", org_dados['nome_organizacao'])
     else:
         st.warning("Dados dos Executores não puderam ser carregados. Verifique o caminho do arquivo.")
 
@@ -148,32 +278,34 @@ elif pagina_selecionada == "Busca Avançada":
     st.header("Busca Avançada de Organizações")
     st.markdown("Use os filtros abaixo para encontrar organizações com perfis específicos.")
     
-    df_busca = dataframes.get("Executores")
+    df_busca = carregar_grupo("Executores", COLUNAS_BUSCA)
     
     if df_busca is not None:
-        techs = df_busca['tecnologias_disruptivas'].dropna().str.split(',').explode().str.strip().unique()
-        categorias = df_busca['categoria_organizacao'].dropna().unique()
-        segmentos = df_busca['segmento_atuacao'].dropna().unique()
-
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            techs_selecionadas = st.multiselect("Tecnologias Disruptivas:", sorted(techs))
-        with col2:
-            categorias_selecionadas = st.multiselect("Categoria da Organização:", sorted(categorias))
-        with col3:
-            segmentos_selecionados = st.multiselect("Segmento de Atuação:", sorted(segmentos))
-
-        df_filtrado = df_busca.copy()
-
-        if techs_selecionadas:
-            regex_techs = '|'.join([re.escape(t) for t in techs_selecionadas])
-            df_filtrado = df_filtrado[df_filtrado['tecnologias_disruptivas'].str.contains(regex_techs, na=False)]
-        
-        if categorias_selecionadas:
-            df_filtrado = df_filtrado[df_filtrado['categoria_organizacao'].isin(categorias_selecionadas)]
-
-        if segmentos_selecionados:
-            df_filtrado = df_filtrado[df_filtrado['segmento_atuacao'].isin(segmentos_selecionados)]
+        indice = obter_indice_facetas(df_busca, versoes["Executores"])
+
+        # Filtros por faceta: a seleção atual fica no session_state (chave = coluna), o que
+        # permite mostrar ao lado de cada opção quantas organizações ela traria com os demais filtros
+        rotulos_facetas = {
+            'tecnologias_disruptivas': "Tecnologias Disruptivas:",
+            'categoria_organizacao': "Categoria da Organização:",
+            'segmento_atuacao': "Segmento de Atuação:",
+            'cidade_sede': "Cidade:",
+            'missoes_finais': "Missões:",
+        }
+        filtros = {coluna: st.session_state.get(f"busca_{coluna}", []) for coluna in rotulos_facetas}
+
+        colunas_layout = st.columns(3) + st.columns(2)
+        for (coluna, rotulo), col in zip(rotulos_facetas.items(), colunas_layout):
+            contagens = indice.contagens(coluna, filtros)
+            with col:
+                filtros[coluna] = st.multiselect(
+                    rotulo,
+                    indice.valores(coluna),
+                    format_func=lambda valor, contagens=contagens: f"{valor} ({contagens[valor]})",
+                    key=f"busca_{coluna}"
+                )
+
+        df_filtrado = df_busca.iloc[indice.filtrar(filtros)]
 
         st.divider()
         st.subheader("Resultados da Busca")
@@ -184,18 +316,43 @@ elif pagina_selecionada == "Busca Avançada":
                 'nome_organizacao', 'cidade_sede', 'missoes_finais', 
                 'tecnologias_disruptivas', 'categoria_organizacao', 'segmento_atuacao'
             ]
-            st.dataframe(df_filtrado[colunas_para_exibir])
+            mostrar_tabela_paginada(df_filtrado[colunas_para_exibir], chave="busca")
         else:
             st.warning("Nenhuma organização encontrada com os critérios selecionados. Tente uma busca mais ampla.")
     else:
         st.warning("Dados dos Executores não puderam ser carregados para a busca.")
 
-# ===== PÁGINA 3: BASE DE CONHECIMENTO E P&D =====
-# ===== PÁGINA 3: BASE DE CONHECIMENTO E P&D (COM FILTRO) =====
+# ===== PÁGINA 3: BUSCA TEXTUAL =====
+elif pagina_selecionada == "Busca Textual":
+    st.header("Busca Textual de Organizações")
+    st.markdown("Pesquise por termos nas descrições, áreas de expertise e teses de investimento. Os resultados são ordenados por relevância.")
+
+    busca_textual = obter_busca_textual(tuple(versoes.items()))
+
+    col_consulta, col_grupos = st.columns([2, 1])
+    with col_consulta:
+        consulta = st.text_input("Termos da busca:", placeholder="e.g. inteligência artificial saúde")
+    with col_grupos:
+        grupos_selecionados = st.multiselect("Grupos:", list(ARQUIVOS_CSV.keys()), placeholder="Todos os grupos")
+
+    if consulta.strip():
+        # Descobre o total de resultados para limitar a paginação
+        _, total_resultados = busca_textual.buscar(consulta, por_pagina=0, grupos=grupos_selecionados)
+        if total_resultados:
+            total_paginas = (total_resultados - 1) // RESULTADOS_POR_PAGINA + 1
+            pagina = st.number_input(f"Página (de {total_paginas}):", min_value=1, max_value=total_paginas, value=1)
+            resultados, _ = busca_textual.buscar(consulta, pagina=pagina, grupos=grupos_selecionados)
+            st.success(f"**{total_resultados}** organizações encontradas.")
+            st.dataframe(resultados, hide_index=True, use_container_width=True)
+        else:
+            st.warning("Nenhuma organização encontrada para os termos pesquisados.")
+
+# ===== PÁGINA 4: BASE DE CONHECIMENTO E P&D =====
+# ===== PÁGINA 4: BASE DE CONHECIMENTO E P&D (COM FILTRO) =====
 elif pagina_selecionada == "Base de Conhecimento e P&D":
     st.header("Análise da Base de Conhecimento e P&D")
     
-    df_pesquisa = dataframes.get("Base de Conhecimento e P&D")
+    df_pesquisa = carregar_grupo("Base de Conhecimento e P&D", COLUNAS_PESQUISA)
     
     if df_pesquisa is not None:
         
@@ -204,10 +361,10 @@ elif pagina_selecionada == "Base de Conhecimento e P&D":
         
         # Prepara as opções para o filtro, removendo valores nulos e pegando os únicos
         if 'tipo_organizacao_y' in df_pesquisa.columns:
-            tipos_org = df_pesquisa['tipo_organizacao_y'].dropna().unique()
+            tipos_org = obter_valores_unicos(df_pesquisa, versoes["Base de Conhecimento e P&D"], 'tipo_organizacao_y')
             tipos_selecionados = st.multiselect(
                 "Filtre por Tipo de Organização:",
-                sorted(tipos_org),
+                tipos_org,
                 placeholder="Selecione um ou mais tipos"
             )
         else:
@@ -227,19 +384,13 @@ elif pagina_selecionada == "Base de Conhecimento e P&D":
         
         # Verifica se o dataframe filtrado não está vazio antes de continuar
         if not df_filtrado.empty:
+            agregados = obter_agregados_pesquisa(df_pesquisa, versoes["Base de Conhecimento e P&D"], tuple(sorted(tipos_selecionados)))
+
             st.subheader("Panorama Geral")
-            total_inst = len(df_filtrado)
-            total_cidades_pesquisa = df_filtrado['cidade_sede'].nunique()
-            
-            total_com_nit = 0
-            if 'possui_nit' in df_filtrado.columns:
-                df_filtrado['possui_nit'] = df_filtrado['possui_nit'].astype(str)
-                total_com_nit = df_filtrado[df_filtrado['possui_nit'].str.upper() == 'SIM'].shape[0]
-            
             kpi1, kpi2, kpi3 = st.columns(3)
-            kpi1.metric("Instituições Encontradas", total_inst)
-            kpi2.metric("Cidades Atendidas", total_cidades_pesquisa)
-            kpi3.metric("Instituições com NIT", total_com_nit)
+            kpi1.metric("Instituições Encontradas", agregados['total_inst'])
+            kpi2.metric("Cidades Atendidas", agregados['total_cidades'])
+            kpi3.metric("Instituições com NIT", agregados['total_com_nit'])
             st.divider()
 
             st.subheader("Distribuições e Áreas de Foco")
@@ -247,15 +398,12 @@ elif pagina_selecionada == "Base de Conhecimento e P&D":
             
             with col_graf1:
                 st.markdown("**Top 10 Cidades por Nº de Instituições**")
-                cidades_contagem = df_filtrado['cidade_sede'].value_counts().nlargest(10).sort_values(ascending=True)
-                st.bar_chart(cidades_contagem, horizontal=True)
+                st.bar_chart(agregados['top_cidades'], horizontal=True)
 
             with col_graf2:
                 st.markdown("**Top 10 Áreas de Expertise**")
-                if 'areas_expertise_x' in df_filtrado.columns:
-                    areas_expertise = df_filtrado['areas_expertise_x'].dropna().str.split(',').explode().str.strip()
-                    areas_contagem = areas_expertise.value_counts().nlargest(10).sort_values(ascending=True)
-                    st.bar_chart(areas_contagem, horizontal=True)
+                if agregados['top_areas'] is not None:
+                    st.bar_chart(agregados['top_areas'], horizontal=True)
                 else:
                     st.info("A coluna 'areas_expertise_x' não foi encontrada.")
             st.divider()
@@ -263,15 +411,14 @@ elif pagina_selecionada == "Base de Conhecimento e P&D":
             # --- FICHA DETALHADA (AGORA USA A LISTA FILTRADA) ---
             st.header("Ficha Detalhada da Instituição")
             
-            lista_inst = sorted(df_filtrado['nome_organizacao'].unique())
             inst_nome_selecionado = st.selectbox(
                 "Selecione uma instituição para ver os detalhes:",
-                lista_inst,
+                agregados['instituicoes'],
                 key="select_inst_pesquisa"
             )
             
             if inst_nome_selecionado:
-                inst_dados = df_filtrado[df_filtrado['nome_organizacao'] == inst_nome_selecionado].iloc[0]
+                inst_dados = carregar_organizacao(ARQUIVOS_CSV["Base de Conhecimento e P&D"], versoes["Base de Conhecimento e P&D"], inst_nome_selecionado).iloc[0]
 
                 def mostrar_info(titulo, valor_chave):
                     valor = inst_dados.get(valor_chave)
@@ -292,7 +439,7 @@ elif pagina_selecionada == "Base de Conhecimento e P&D":
 
                 st.divider()
 
-                tab_sobre, tab_contato = st.tabs(["Sobre e Expertise", "Contato"])
+                tab_sobre, tab_contato, tab_similares = st.tabs(["Sobre e Expertise", "Contato", "Organizações Semelhantes"])
                 with tab_sobre:
                     st.subheader("Sobre a Instituição")
                     mostrar_info("Descrição", 'descricao_organizacao')
@@ -305,6 +452,10 @@ elif pagina_selecionada == "Base de Conhecimento e P&D":
                         st.markdown(f"**Website:** [{inst_dados['site_organizacao']}]({inst_dados['site_organizacao']})")
                     mostrar_info("Email para Contato", 'email_contato')
                     mostrar_info("Contato para Divulgação Científica", 'contato_divulgacao_cientifica')
+
+                with tab_similares:
+                    st.subheader("Organizações Semelhantes")
+                    mostrar_similares("Base de Conhecimento e P&D", inst_dados['nome_organizacao'])
             else:
                 st.info("Nenhuma instituição selecionada.")
         else:
@@ -312,7 +463,7 @@ elif pagina_selecionada == "Base de Conhecimento e P&D":
 
     else:
         st.warning("Dados da Base de Conhecimento e P&D não puderam ser carregados.")
-# ===== PÁGINA 4: VISUALIZAÇÃO EM TABELA =====
+# ===== PÁGINA 5: VISUALIZAÇÃO EM TABELA =====
 elif pagina_selecionada == "Visualização em Tabela":
     st.header("Visualização por Segmento do Ecossistema")
     
@@ -321,9 +472,18 @@ elif pagina_selecionada == "Visualização em Tabela":
         list(ARQUIVOS_CSV.keys())
     )
     
-    df_selecionado = dataframes.get(grupo_tabela)
+    # Só as colunas escolhidas são lidas do arquivo
+    colunas_grupo = obter_colunas(ARQUIVOS_CSV[grupo_tabela], versoes[grupo_tabela])
+    colunas_exibidas = st.multiselect(
+        "Colunas exibidas:",
+        colunas_grupo,
+        default=[col for col in COLUNAS_TABELA_PADRAO if col in colunas_grupo],
+        key=f"colunas_{grupo_tabela}"
+    )
+
+    df_selecionado = carregar_grupo(grupo_tabela, colunas_exibidas or ['nome_organizacao'])
     if df_selecionado is not None:
         st.success(f"Exibindo **{len(df_selecionado)}** organizações.")
-        st.dataframe(df_selecionado)
+        mostrar_tabela_paginada(df_selecionado, chave=f"tabela_{grupo_tabela}")
     else:
         st.warning("Dados não carregados.")
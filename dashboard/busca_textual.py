@@ -0,0 +1,188 @@
+"""
+Busca textual por relevância (BM25) sobre os relatórios do dashboard.
+
+O índice invertido fica em disco, em um banco SQLite com uma tabela FTS5, cuja ordenação
+`bm25()` é o ranking Okapi BM25. Os textos são normalizados antes de indexar e de consultar:
+minúsculas, sem acentos e sem as stopwords em português do NLTK (as mesmas dos scripts de
+TF-IDF). A atualização é incremental: cada CSV só é relido quando sua data de modificação
+muda, e apenas as organizações novas, alteradas ou removidas são reindexadas.
+"""
+
+import os
+import re
+import hashlib
+import sqlite3
+import unicodedata
+from contextlib import contextmanager
+import pandas as pd
+import nltk
+from nltk.corpus import stopwords
+
+# Índice em disco (a pasta `data/cache/` não é versionada)
+CAMINHO_INDICE = os.path.join('.', 'data', 'cache', 'busca_textual.sqlite')
+
+# Campos indexados -> peso no BM25. Se a coluna não existir, usa as versões `_x`/`_y`
+# deixadas pelos merges do enriquecimento.
+CAMPOS_BUSCA = {
+    'nome_organizacao': 3.0,
+    'descricao_organizacao': 1.0,
+    'areas_expertise': 1.0,
+    'tese_investimento': 1.0,
+}
+
+RESULTADOS_POR_PAGINA = 10
+
+
+def carregar_stopwords():
+    """Stopwords em português do NLTK, normalizadas como o restante do texto."""
+    try:
+        palavras = stopwords.words('portuguese')
+    except LookupError:
+        print("Baixando recursos do NLTK (stopwords)...")
+        nltk.download('stopwords')
+        palavras = stopwords.words('portuguese')
+    return {remover_acentos(p.lower()) for p in palavras}
+
+
+def remover_acentos(texto):
+    texto = unicodedata.normalize('NFKD', texto)
+    return ''.join(char for char in texto if not unicodedata.combining(char))
+
+
+def normalizar(texto, palavras_vazias):
+    """Texto em minúsculas, sem acentos, sem pontuação e sem stopwords."""
+    if not isinstance(texto, str):
+        return ''
+    termos = re.findall(r'\w+', remover_acentos(texto.lower()))
+    return ' '.join(termo for termo in termos if termo not in palavras_vazias)
+
+
+def coluna_texto(df, campo):
+    """Coluna de texto de um campo, combinando as versões `_x`/`_y` quando for o caso."""
+    candidatas = [col for col in (campo, f"{campo}_x", f"{campo}_y") if col in df.columns]
+    if not candidatas:
+        return pd.Series('', index=df.index)
+    serie = df[candidatas[0]]
+    for col in candidatas[1:]:
+        serie = serie.fillna(df[col])
+    return serie.fillna('').astype(str)
+
+
+class BuscaTextual:
+    """Índice BM25 em disco dos relatórios, atualizado de forma incremental."""
+
+    def __init__(self, caminho_indice=CAMINHO_INDICE):
+        self.caminho_indice = caminho_indice
+        self.palavras_vazias = carregar_stopwords()
+        os.makedirs(os.path.dirname(caminho_indice), exist_ok=True)
+        with self._conectar() as conexao:
+            conexao.executescript(f"""
+                CREATE TABLE IF NOT EXISTS arquivos (grupo TEXT PRIMARY KEY, versao TEXT);
+                CREATE TABLE IF NOT EXISTS documentos (
+                    id INTEGER PRIMARY KEY, grupo TEXT, chave TEXT, hash TEXT,
+                    nome_organizacao TEXT, descricao_organizacao TEXT, cidade_sede TEXT,
+                    UNIQUE (grupo, chave)
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS textos USING fts5({', '.join(CAMPOS_BUSCA)});
+            """)
+
+    @contextmanager
+    def _conectar(self):
+        # Uma conexão por operação (com commit ao final): o Streamlit atende cada sessão em uma thread diferente
+        conexao = sqlite3.connect(self.caminho_indice)
+        try:
+            with conexao:
+                yield conexao
+        finally:
+            conexao.close()
+
+    def atualizar(self, arquivos):
+        """
+        Sincroniza o índice com os CSVs (`{grupo: caminho}`). Retorna quantos documentos
+        foram (re)indexados e quantos foram removidos.
+        """
+        indexados = removidos = 0
+        with self._conectar() as conexao:
+            for grupo, caminho in arquivos.items():
+                versao = str(os.path.getmtime(caminho)) if os.path.exists(caminho) else ''
+                registro = conexao.execute("SELECT versao FROM arquivos WHERE grupo = ?", (grupo,)).fetchone()
+                if registro and registro[0] == versao:
+                    continue
+                df = pd.read_csv(caminho) if versao else pd.DataFrame(columns=['nome_organizacao'])
+                novos, excluidos = self._sincronizar_grupo(conexao, grupo, df)
+                indexados, removidos = indexados + novos, removidos + excluidos
+                conexao.execute("INSERT OR REPLACE INTO arquivos VALUES (?, ?)", (grupo, versao))
+        return indexados, removidos
+
+    def _sincronizar_grupo(self, conexao, grupo, df):
+        textos = pd.DataFrame({campo: coluna_texto(df, campo) for campo in CAMPOS_BUSCA})
+        # Chave estável de cada organização: o nome mais o número da ocorrência (nomes repetidos)
+        nomes = df['nome_organizacao'].fillna('').astype(str)
+        chaves = nomes + '#' + nomes.groupby(nomes).cumcount().astype(str)
+        hashes = [
+            hashlib.sha1('\x1f'.join(valores).encode('utf-8')).hexdigest()
+            for valores in textos.itertuples(index=False, name=None)
+        ]
+
+        existentes = dict(conexao.execute(
+            "SELECT chave, hash FROM documentos WHERE grupo = ?", (grupo,)
+        ).fetchall())
+        atuais = dict(zip(chaves, hashes))
+        obsoletas = [chave for chave, h in existentes.items() if atuais.get(chave) != h]
+        for chave in obsoletas:
+            (doc_id,) = conexao.execute(
+                "SELECT id FROM documentos WHERE grupo = ? AND chave = ?", (grupo, chave)
+            ).fetchone()
+            conexao.execute("DELETE FROM textos WHERE rowid = ?", (doc_id,))
+            conexao.execute("DELETE FROM documentos WHERE id = ?", (doc_id,))
+
+        cidades = df['cidade_sede'] if 'cidade_sede' in df.columns else pd.Series(None, index=df.index)
+        cidades = cidades.astype(object).where(cidades.notna(), None)
+        novos = 0
+        for chave, h, nome, cidade, valores in zip(chaves, hashes, nomes, cidades, textos.itertuples(index=False)):
+            if existentes.get(chave) == h:
+                continue
+            cursor = conexao.execute(
+                "INSERT INTO documentos (grupo, chave, hash, nome_organizacao, descricao_organizacao, cidade_sede) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (grupo, chave, h, nome, valores.descricao_organizacao, cidade),
+            )
+            conexao.execute(
+                f"INSERT INTO textos (rowid, {', '.join(CAMPOS_BUSCA)}) VALUES (?{', ?' * len(CAMPOS_BUSCA)})",
+                (cursor.lastrowid, *(normalizar(valor, self.palavras_vazias) for valor in valores)),
+            )
+            novos += 1
+        removidos = len([chave for chave in obsoletas if chave not in atuais])
+        return novos, removidos
+
+    def buscar(self, consulta, pagina=1, por_pagina=RESULTADOS_POR_PAGINA, grupos=None):
+        """
+        Organizações mais relevantes para `consulta`, da página informada (começando em 1).
+        Retorna (DataFrame com grupo, nome, cidade, descrição e relevância; total de resultados).
+        Os termos da consulta são combinados com OU: quanto mais termos, maior a relevância.
+        """
+        colunas = ['grupo', 'nome_organizacao', 'cidade_sede', 'descricao_organizacao', 'relevancia']
+        termos = normalizar(consulta, self.palavras_vazias).split()
+        if not termos:
+            return pd.DataFrame(columns=colunas), 0
+        expressao = ' OR '.join(f'"{termo}"' for termo in dict.fromkeys(termos))
+        filtro_grupos, parametros_grupos = '', []
+        if grupos:
+            filtro_grupos = f" AND d.grupo IN ({', '.join('?' * len(grupos))})"
+            parametros_grupos = list(grupos)
+        pesos = ', '.join(str(peso) for peso in CAMPOS_BUSCA.values())
+
+        with self._conectar() as conexao:
+            (total,) = conexao.execute(
+                f"SELECT count(*) FROM textos JOIN documentos d ON d.id = textos.rowid "
+                f"WHERE textos MATCH ?{filtro_grupos}",
+                [expressao, *parametros_grupos],
+            ).fetchone()
+            # bm25() é negativo: quanto menor, mais relevante
+            linhas = conexao.execute(
+                f"SELECT d.grupo, d.nome_organizacao, d.cidade_sede, d.descricao_organizacao, -bm25(textos, {pesos}) "
+                f"FROM textos JOIN documentos d ON d.id = textos.rowid "
+                f"WHERE textos MATCH ?{filtro_grupos} ORDER BY bm25(textos, {pesos}) LIMIT ? OFFSET ?",
+                [expressao, *parametros_grupos, por_pagina, (pagina - 1) * por_pagina],
+            ).fetchall()
+        return pd.DataFrame(linhas, columns=colunas), total
@@ -0,0 +1,163 @@
+"""
+Camada de consultas do dashboard.
+
+Reúne os agregados exibidos nas páginas (KPIs, top cidades, distribuições, vocabulários de
+tecnologias e áreas, contagem por missão), calculados de uma só vez por versão dos dados.
+O `app.py` memoriza o resultado com `st.cache_data`, usando a data de modificação dos arquivos
+como chave: as interações com os widgets reaproveitam os agregados em vez de recalculá-los.
+A Busca Avançada usa um índice invertido (`IndiceFacetas`), construído uma vez por versão.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+# Facetas da Busca Avançada: coluna -> se a coluna guarda vários valores separados por vírgula
+FACETAS_BUSCA = {
+    'tecnologias_disruptivas': True,
+    'categoria_organizacao': False,
+    'segmento_atuacao': False,
+    'cidade_sede': False,
+    'missoes_finais': True,
+}
+
+
+def versao_arquivo(caminho_csv):
+    """
+    Versão de uma tabela do dashboard: datas de modificação do CSV e da sua versão Parquet
+    (None para o que não existir). Muda sempre que um dos arquivos é regravado.
+    """
+    caminho_parquet = os.path.splitext(caminho_csv)[0] + '.parquet'
+    return tuple(
+        os.path.getmtime(caminho) if os.path.exists(caminho) else None
+        for caminho in (caminho_csv, caminho_parquet)
+    )
+
+
+def contar(serie):
+    """`value_counts` sem as categorias vazias (colunas categóricas lidas do Parquet)."""
+    contagem = serie.value_counts()
+    return contagem[contagem > 0]
+
+
+def explodir_lista(serie):
+    """Separa uma coluna de valores separados por vírgula em um item por linha (sem vazios)."""
+    itens = serie.dropna().astype(str).str.split(',').explode().str.strip()
+    return itens[itens != '']
+
+
+def valores_unicos(serie):
+    """Valores distintos de uma coluna, em ordem alfabética."""
+    return sorted(serie.dropna().astype(str).unique())
+
+
+def janela(df, pagina, por_pagina, ordenar_por=None, crescente=True, coluna_filtro=None, termo_filtro=''):
+    """
+    Filtra, ordena e recorta uma tabela no servidor, devolvendo apenas a página pedida
+    (começando em 1) e o total de linhas após o filtro. O filtro é por trecho de texto,
+    sem diferenciar maiúsculas de minúsculas.
+    """
+    if coluna_filtro and termo_filtro.strip():
+        valores = df[coluna_filtro].astype(str)
+        df = df[valores.str.contains(termo_filtro.strip(), case=False, regex=False, na=False)]
+    if ordenar_por:
+        # Colunas categóricas (lidas do Parquet) são ordenadas pelo valor, e não pela ordem das categorias
+        df = df.sort_values(
+            ordenar_por, ascending=crescente, na_position='last', kind='stable',
+            key=lambda serie: serie.astype(object) if isinstance(serie.dtype, pd.CategoricalDtype) else serie
+        )
+    inicio = (pagina - 1) * por_pagina
+    return df.iloc[inicio:inicio + por_pagina], len(df)
+
+
+def agregados_executores(df):
+    """Agregados das páginas de Executores (Visão Geral e Busca Avançada)."""
+    return {
+        'total_orgs': len(df),
+        'total_cidades': df['cidade_sede'].nunique(),
+        'total_missoes': df['missoes_finais'].nunique(),
+        'top_cidades': contar(df['cidade_sede']).nlargest(10).sort_values(ascending=True),
+        'fases': contar(df['fase_negocio']),
+        'missoes': contar(explodir_lista(df['missoes_finais'])).sort_index(),
+        'organizacoes': valores_unicos(df['nome_organizacao']),
+    }
+
+
+def agregados_pesquisa(df):
+    """Agregados da página Base de Conhecimento e P&D (já filtrada por tipo de organização)."""
+    total_com_nit = 0
+    if 'possui_nit' in df.columns:
+        total_com_nit = int((df['possui_nit'].astype(str).str.upper() == 'SIM').sum())
+
+    top_areas = None
+    if 'areas_expertise_x' in df.columns:
+        top_areas = contar(explodir_lista(df['areas_expertise_x'])).nlargest(10).sort_values(ascending=True)
+
+    return {
+        'total_inst': len(df),
+        'total_cidades': df['cidade_sede'].nunique(),
+        'total_com_nit': total_com_nit,
+        'top_cidades': contar(df['cidade_sede']).nlargest(10).sort_values(ascending=True),
+        'top_areas': top_areas,
+        'instituicoes': valores_unicos(df['nome_organizacao']),
+    }
+
+
+class IndiceFacetas:
+    """
+    Índice invertido das facetas da Busca Avançada: para cada valor de cada faceta, a lista
+    ordenada das posições (linhas) das organizações que o possuem. Dentro de uma faceta os
+    valores selecionados são combinados com OU (união) e entre facetas com E (interseção),
+    sem varrer a tabela a cada interação.
+    """
+
+    def __init__(self, df, facetas=FACETAS_BUSCA):
+        self.n_linhas = len(df)
+        self._pares = {}     # coluna -> (linhas, códigos): um par por ocorrência de valor
+        self._valores = {}   # coluna -> valores distintos, em ordem alfabética
+        self._postings = {}  # coluna -> {valor: posições ordenadas}
+        for coluna, multivalorada in facetas.items():
+            serie = df[coluna].reset_index(drop=True)
+            valores = explodir_lista(serie) if multivalorada else serie.dropna().astype(str)
+            pares = pd.DataFrame({'linha': valores.index, 'valor': valores.values}).drop_duplicates()
+            codigos, distintos = pd.factorize(pares['valor'], sort=True)
+            linhas = pares['linha'].to_numpy(dtype=np.int64)
+
+            ordem = np.lexsort((linhas, codigos))
+            cortes = np.cumsum(np.bincount(codigos, minlength=len(distintos)))[:-1]
+            self._pares[coluna] = (linhas, codigos)
+            self._valores[coluna] = list(distintos)
+            self._postings[coluna] = dict(zip(distintos, np.split(linhas[ordem], cortes)))
+
+    def valores(self, coluna):
+        return self._valores[coluna]
+
+    def _mascara(self, filtros):
+        """Máscara booleana das linhas que atendem a todos os filtros (None se não houver filtro)."""
+        mascara = None
+        for coluna, selecionados in filtros.items():
+            if not selecionados:
+                continue
+            postings = self._postings[coluna]
+            mascara_faceta = np.zeros(self.n_linhas, dtype=bool)
+            for valor in selecionados:
+                mascara_faceta[postings.get(valor, [])] = True
+            mascara = mascara_faceta if mascara is None else mascara & mascara_faceta
+        return mascara
+
+    def filtrar(self, filtros):
+        """Posições das linhas que atendem a todos os filtros (`{coluna: valores selecionados}`)."""
+        mascara = self._mascara(filtros)
+        return np.arange(self.n_linhas) if mascara is None else np.flatnonzero(mascara)
+
+    def contagens(self, coluna, filtros):
+        """
+        Quantas organizações cada valor de `coluna` teria, dados os filtros das demais facetas
+        (a seleção da própria faceta é ignorada, para que as outras opções continuem visíveis).
+        """
+        linhas, codigos = self._pares[coluna]
+        mascara = self._mascara({c: selecionados for c, selecionados in filtros.items() if c != coluna})
+        if mascara is not None:
+            codigos = codigos[mascara[linhas]]
+        contagem = np.bincount(codigos, minlength=len(self._valores[coluna]))
+        return dict(zip(self._valores[coluna], contagem.tolist()))
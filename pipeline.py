@@ -0,0 +1,355 @@
+# Arquivo: pipeline.py
+
+import os
+import ast
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# 1. DEFINIÇÃO DAS ETAPAS DO PIPELINE
+# Cada etapa declara o script que a executa, seus parâmetros, os arquivos que lê e os que produz.
+# As dependências entre etapas são deduzidas automaticamente: uma etapa depende de outra quando
+# lê um arquivo que a outra produz. O código de cada etapa inclui o script e todos os módulos
+# locais que ele importa (detectados automaticamente).
+# Arquivos que nenhuma etapa produz (e.g. `df_executores.csv`, gerado nos notebooks) são fontes
+# externas e precisam estar declarados em EXTERNAL_INPUTS.
+# `resources` (opcional) lista recursos compartilhados: duas etapas com um recurso em comum nunca
+# rodam ao mesmo tempo, mesmo com `--jobs` > 1. As etapas que usam `embed_texts` compartilham o
+# cache de embeddings; em paralelo, cada uma codificaria por conta própria os mesmos textos novos.
+STAGES = [
+    {
+        'name': 'preprocessamento',
+        'script': 'preprocess_data.py',
+        'params': [],
+        'inputs': ['data/raw/simi_data.js'],
+        'outputs': [
+            'data/processed/simi_data_processed.csv',
+            'data/processed/simi_data_processed.parquet',
+            'data/processed/simi_data_records.jsonl',
+        ],
+    },
+    {
+        'name': 'golden_dataset',
+        'script': 'src/create_golden_dataset.py',
+        'params': [],
+        'inputs': ['data/processed/rotulados.csv', 'data/processed/df_executores.csv'],
+        'outputs': ['data/processed/golden_dataset.csv'],
+    },
+    {
+        'name': 'classificacao_keywords',
+        'script': 'src/classify_by_keywords.py',
+        'params': [],
+        'inputs': ['data/processed/df_executores.csv'],
+        'outputs': ['reports/classificacao_missoes_keywords_v4.json'],
+    },
+    {
+        'name': 'treino_tfidf',
+        'script': 'src/train_evaluate_model_tfidf.py',
+        'params': [],
+        'inputs': ['data/processed/golden_dataset.csv'],
+        'outputs': ['reports/model_pipeline_v2_final.joblib'],
+    },
+    {
+        'name': 'treino_gridsearch',
+        'script': 'src/train_evaluate_model_gridsearch.py',
+        'params': [],
+        'inputs': ['data/processed/golden_dataset.csv'],
+        'outputs': ['reports/model_pipeline_v3.joblib'],
+    },
+    {
+        'name': 'treino_embeddings',
+        'script': 'src/train_evaluate_bert.py',
+        'params': [],
+        'inputs': ['data/processed/golden_dataset.csv'],
+        'outputs': ['reports/model_v4_embeddings.joblib'],
+        'resources': ['embedding_cache'],
+    },
+    {
+        # Comparação de todos os modelos nos mesmos folds (validação cruzada estratificada)
+        'name': 'avaliacao_modelos',
+        'script': 'src/evaluate_models.py',
+        'params': [],
+        'inputs': ['data/processed/golden_dataset.csv'],
+        'outputs': ['reports/avaliacao_modelos_cv.csv', 'reports/avaliacao_modelos_cv_folds.csv'],
+        'resources': ['embedding_cache'],
+    },
+    {
+        'name': 'predicao_embeddings',
+        'script': 'src/predict_full_dataset.py',
+        'params': [],
+        'inputs': ['data/processed/df_executores.csv', 'reports/model_v4_embeddings.joblib'],
+        'outputs': ['reports/classificacao_final_bert.csv', 'reports/classificacao_final_bert_embeddings.npz'],
+        'resources': ['embedding_cache'],
+    },
+    {
+        # O enriquecimento altera os CSVs de relatório no próprio lugar
+        'name': 'enriquecimento',
+        'script': 'scripts/enriquecer_dados.py',
+        'params': [],
+        'inputs': [
+            'data/processed/simi_data.json',
+            'reports/classificacao_final_revisada.csv',
+            'reports/base_conhecimento_pd.csv',
+            'reports/demais_organizacoes.csv',
+        ],
+        'outputs': [
+            'reports/classificacao_final_revisada.csv',
+            'reports/base_conhecimento_pd.csv',
+            'reports/demais_organizacoes.csv',
+        ],
+    },
+    {
+        'name': 'indice_similaridade',
+        'script': 'src/build_similarity_index.py',
+        'params': [],
+        'inputs': [
+            'reports/classificacao_final_revisada.csv',
+            'reports/base_conhecimento_pd.csv',
+            'reports/classificacao_final_bert_embeddings.npz',
+        ],
+        'outputs': ['reports/indice_similaridade.npz'],
+        'resources': ['embedding_cache'],
+    },
+]
+
+# Fontes externas: entradas produzidas fora do pipeline, com a sua origem. As das etapas
+# selecionadas são verificadas antes de qualquer execução. As CSVs de `reports` enriquecidas
+# no próprio lugar são entradas e saídas da mesma etapa e também precisam existir de antemão.
+EXTERNAL_INPUTS = {
+    'data/raw/simi_data.js': "exportação bruta da plataforma SIMI",
+    'data/processed/simi_data.json': "exportação completa da plataforma SIMI em JSON, a mesma lida em `notebooks/01_eda_simi.ipynb`",
+    'data/processed/df_executores.csv': "gerado em `notebooks/01_eda_simi.ipynb`",
+    'data/processed/rotulados.csv': "rotulação manual (`notebooks/02_rotulagem.ipynb`)",
+    'reports/classificacao_final_revisada.csv': "revisão manual da classificação (`notebooks/02_rotulagem.ipynb`)",
+    'reports/base_conhecimento_pd.csv': "gerado em `notebooks/01_eda_simi.ipynb`",
+    'reports/demais_organizacoes.csv': "gerado em `notebooks/01_eda_simi.ipynb`",
+}
+
+# Estado das execuções anteriores (impressão digital de cada etapa e hashes de arquivos)
+STATE_PATH = os.path.join('data', 'cache', 'pipeline_state.json')
+
+
+def file_hash(path, hash_cache):
+    """
+    SHA-256 do conteúdo de um arquivo. O resultado é reaproveitado enquanto o tamanho e a
+    data de modificação do arquivo não mudarem, para não reler modelos grandes a cada execução.
+    """
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    cached = hash_cache.get(path)
+    if cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime:
+        return cached['sha256']
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    hash_cache[path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': digest.hexdigest()}
+    return digest.hexdigest()
+
+
+def code_files(script):
+    """Script da etapa mais os módulos locais que ele importa, recursivamente."""
+    found, pending = [], [script]
+    while pending:
+        path = pending.pop()
+        if path in found or not os.path.exists(path):
+            continue
+        found.append(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                # Módulos irmãos (`from embeddings import ...`) ou do pacote `src` (`from src.data_io import ...`)
+                candidates = [os.path.join(os.path.dirname(path), name.replace('.', os.sep) + '.py'),
+                              name.replace('.', os.sep) + '.py']
+                pending.extend(c for c in candidates if os.path.exists(c))
+    return sorted(found)
+
+
+def stage_fingerprint(stage, hash_cache):
+    """Impressão digital de uma etapa: hash dos arquivos de entrada, do código e dos parâmetros."""
+    payload = {
+        'inputs': {path: file_hash(path, hash_cache) for path in stage['inputs']},
+        'code': {path: file_hash(path, hash_cache) for path in code_files(stage['script'])},
+        'params': stage['params'],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def stage_dependencies(stages):
+    """Mapeia cada etapa às etapas que produzem algum dos seus arquivos de entrada."""
+    producers = {}
+    for stage in stages:
+        for path in stage['outputs']:
+            producers.setdefault(path, []).append(stage['name'])
+    return {
+        stage['name']: {p for path in stage['inputs'] for p in producers.get(path, []) if p != stage['name']}
+        for stage in stages
+    }
+
+
+def missing_external_inputs(selected):
+    """
+    Fontes externas ausentes das etapas selecionadas: mapeia cada arquivo às etapas que o leem.
+    Uma entrada que nenhuma outra etapa produz e que não está em EXTERNAL_INPUTS é um erro de
+    configuração do pipeline.
+    """
+    produced = {path for stage in STAGES for path in stage['outputs']}
+    missing = {}
+    for stage in STAGES:
+        if stage['name'] not in selected:
+            continue
+        for path in stage['inputs']:
+            if path in produced and path not in stage['outputs']:
+                continue
+            if path not in EXTERNAL_INPUTS:
+                raise ValueError(f"[{stage['name']}] A entrada '{path}' não é produzida por nenhuma etapa "
+                                 f"nem está declarada em EXTERNAL_INPUTS.")
+            if not os.path.exists(path):
+                missing.setdefault(path, []).append(stage['name'])
+    return missing
+
+
+def select_stages(targets, dependencies):
+    """Etapas pedidas mais todas as etapas anteriores das quais elas dependem."""
+    selected, pending = set(), list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(dependencies[name])
+    return selected
+
+
+def ordered_stage_names(selected):
+    """Nomes das etapas selecionadas, na ordem em que foram declaradas."""
+    return [stage['name'] for stage in STAGES if stage['name'] in selected]
+
+
+def run_stage(stage):
+    """Executa o script de uma etapa a partir da raiz do projeto e retorna o código de saída."""
+    command = [sys.executable, stage['script']] + stage['params']
+    print(f"[{stage['name']}] Executando: {' '.join(command)}")
+    result = subprocess.run(command, capture_output=True, text=True)
+    log_path = os.path.join('data', 'cache', 'logs', f"{stage['name']}.log")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, 'w', encoding='utf-8') as f:
+        f.write(result.stdout + result.stderr)
+    print(f"[{stage['name']}] {'Concluída' if result.returncode == 0 else 'FALHOU'} (log em {log_path})")
+    return result.returncode
+
+
+def run_pipeline(targets=None, force=False, jobs=4, dry_run=False):
+    """
+    Executa as etapas em ordem de dependência, em paralelo quando independentes, pulando as
+    que não mudaram desde a última execução bem-sucedida.
+    """
+    stages = {stage['name']: stage for stage in STAGES}
+    dependencies = stage_dependencies(STAGES)
+    selected = select_stages(targets or list(stages), dependencies)
+
+    state = {'stages': {}, 'files': {}}
+    if os.path.exists(STATE_PATH):
+        with open(STATE_PATH, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+
+    done, failed, running = set(), set(), {}
+    # Etapas que a simulação (`dry_run`) executaria: as que dependem delas também seriam executadas
+    would_run = set()
+
+    # Fontes externas ausentes são informadas antes de qualquer execução; as etapas que as leem
+    # (e as posteriores) não são executadas
+    for path, names in missing_external_inputs(selected).items():
+        print(f"ERRO: fonte externa '{path}' não encontrada ({EXTERNAL_INPUTS[path]}). "
+              f"Necessária para: {', '.join(names)}.")
+        failed.update(names)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while True:
+            # Etapas prontas: todas as dependências selecionadas já terminaram com sucesso
+            for name in [n for n in ordered_stage_names(selected) if n not in done | failed and n not in running]:
+                deps = dependencies[name] & selected
+                if deps & failed:
+                    print(f"[{name}] Pulada: uma etapa anterior falhou.")
+                    failed.add(name)
+                    continue
+                if not deps <= done:
+                    continue
+                # Espera a etapa que está usando o mesmo recurso compartilhado terminar
+                busy = {resource for n in running for resource in stages[n].get('resources', [])}
+                if busy & set(stages[name].get('resources', [])):
+                    continue
+
+                stage = stages[name]
+                if dry_run and deps & would_run:
+                    # As saídas das etapas anteriores mudariam: esta etapa também seria executada
+                    print(f"[{name}] Seria executada (depende de {', '.join(sorted(deps & would_run))}).")
+                    would_run.add(name)
+                    done.add(name)
+                    continue
+                fingerprint = stage_fingerprint(stage, state['files'])
+                outputs_exist = all(os.path.exists(path) for path in stage['outputs'])
+                if not force and outputs_exist and state['stages'].get(name) == fingerprint:
+                    print(f"[{name}] Sem alterações desde a última execução. Pulando.")
+                    done.add(name)
+                    continue
+                missing_inputs = [path for path in stage['inputs'] if not os.path.exists(path)]
+                if missing_inputs:
+                    print(f"[{name}] ERRO: arquivos de entrada não encontrados: {missing_inputs}")
+                    failed.add(name)
+                    continue
+                if dry_run:
+                    print(f"[{name}] Seria executada (entradas, código ou parâmetros mudaram).")
+                    would_run.add(name)
+                    done.add(name)
+                    continue
+                running[name] = executor.submit(run_stage, stage)
+
+            if not running:
+                break
+            finished, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+            for name in [n for n, future in running.items() if future in finished]:
+                if running.pop(name).result() == 0:
+                    # A impressão digital é recalculada após a execução, para que etapas que
+                    # alteram suas próprias entradas (e.g. enriquecimento) não rodem de novo à toa.
+                    state['stages'][name] = stage_fingerprint(stages[name], state['files'])
+                    done.add(name)
+                else:
+                    failed.add(name)
+                # Salva o estado a cada etapa concluída, para não perder progresso em caso de falha
+                if not dry_run:
+                    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+                    with open(STATE_PATH, 'w', encoding='utf-8') as f:
+                        json.dump(state, f, indent=2)
+
+    print("-" * 50)
+    if dry_run:
+        print(f"Simulação: {len(would_run)} etapas seriam executadas, {len(done - would_run)} em dia, "
+              f"{len(failed)} com falha.")
+        return not failed
+    print(f"Pipeline finalizado: {len(done)} etapas em dia, {len(failed)} com falha.")
+    return not failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa o pipeline do projeto, pulando etapas que não mudaram.")
+    parser.add_argument('etapas', nargs='*', help="Etapas a executar (com suas dependências). Padrão: todas.")
+    parser.add_argument('--force', action='store_true', help="Executa as etapas mesmo sem alterações.")
+    parser.add_argument('--jobs', type=int, default=4, help="Número máximo de etapas em paralelo.")
+    parser.add_argument('--dry-run', action='store_true', help="Apenas mostra o que seria executado.")
+    args = parser.parse_args()
+    unknown = [name for name in args.etapas if name not in {stage['name'] for stage in STAGES}]
+    if unknown:
+        parser.error(f"Etapas desconhecidas: {unknown}. Opções: {[stage['name'] for stage in STAGES]}")
+    success = run_pipeline(args.etapas, force=args.force, jobs=args.jobs, dry_run=args.dry_run)
+    sys.exit(0 if success else 1)
@@ -5,6 +5,8 @@ import re
 import pandas as pd
 from pathlib import Path
 
+from src.data_io import open_parquet_writer, to_arrow_table
+
 # 1. DEFINIÇÃO DO MAPA DE RENOMEAÇÃO (sem alterações)
 RENAME_MAP = {
   # ... (mapa completo como antes) ...
@@ -43,74 +45,314 @@ RENAME_MAP = {
   "Exige equity?": "exige_equity",
 }
 
+# Tamanho dos blocos de leitura do arquivo bruto e de escrita do CSV
+READ_BLOCK_SIZE = 1 << 16
+CSV_CHUNK_ROWS = 5000
+
+# Literais "soltos" (sem aspas) aceitos como valores no arquivo .js
+JS_LITERALS = {'true': True, 'false': False, 'null': None, 'undefined': None}
+
+
+class SimiJsParser:
+    """
+    Tokenizador incremental para o formato de objeto literal JavaScript do export do SIMI.
+
+    Lê o arquivo em blocos de tamanho fixo e produz um registro (dicionário) por vez, em uma
+    única passada, tolerando:
+    - chaves sem aspas (e.g. `Segmento: "..."`) e strings com aspas simples ou duplas;
+    - quebras de linha e tabulações cruas dentro das strings (convertidas em espaço);
+    - vírgulas finais, comentários `//` e `/* */` e qualquer prefixo antes do primeiro `[`
+      (e.g. `module.exports = [`).
+    """
+
+    _STRING_SPECIALS = {'"': re.compile(r'["\\\n\t]'), "'": re.compile(r"['\\\n\t]")}
+    _ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '/': '/', '\\': '\\', '"': '"', "'": "'"}
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = ''
+        self.pos = 0
+
+    # --- Leitura do buffer ---
+    def _fill(self):
+        """Lê mais um bloco do arquivo, descartando a parte já consumida do buffer."""
+        block = self.file.read(READ_BLOCK_SIZE)
+        self.buffer = self.buffer[self.pos:] + block
+        self.pos = 0
+        return bool(block)
+
+    def _ensure(self, n):
+        """Garante (enquanto houver arquivo) que os próximos `n` caracteres estão no buffer."""
+        while self.pos + n > len(self.buffer) and self._fill():
+            pass
+
+    def _peek(self):
+        if self.pos >= len(self.buffer) and not self._fill():
+            return ''
+        return self.buffer[self.pos]
+
+    def _next(self):
+        char = self._peek()
+        self.pos += 1
+        return char
+
+    def _error(self, message):
+        raise ValueError(f"{message} (próximo trecho: {self.buffer[self.pos:self.pos + 60]!r})")
+
+    def _skip_whitespace(self):
+        """Ignora espaços, quebras de linha e comentários."""
+        while True:
+            char = self._peek()
+            if char and char.isspace():
+                self.pos += 1
+            elif char == '/':
+                self._ensure(2)
+                following = self.buffer[self.pos + 1:self.pos + 2]
+                if following == '/':
+                    while self._peek() not in ('\n', ''):
+                        self.pos += 1
+                elif following == '*':
+                    self.pos += 2
+                    # O `*/` pode estar dividido entre dois blocos: sempre lê os dois caracteres antes de comparar
+                    self._ensure(2)
+                    while self.buffer[self.pos:self.pos + 2] != '*/':
+                        if self._next() == '':
+                            self._error("Comentário não terminado")
+                        self._ensure(2)
+                    self.pos += 2
+                else:
+                    return
+            else:
+                return
+
+    # --- Valores ---
+    def _read_string(self):
+        quote = self._next()
+        specials = self._STRING_SPECIALS[quote]
+        parts = []
+        while True:
+            match = specials.search(self.buffer, self.pos)
+            if match is None:
+                parts.append(self.buffer[self.pos:])
+                self.pos = len(self.buffer)
+                if not self._fill():
+                    self._error("String não terminada")
+                continue
+            parts.append(self.buffer[self.pos:match.start()])
+            self.pos = match.end()
+            char = match.group()
+            if char == quote:
+                return ''.join(parts)
+            if char in '\n\t':
+                # Quebras de linha e tabulações cruas dentro do texto viram espaço
+                parts.append(' ')
+                continue
+            # Sequência de escape
+            escaped = self._next()
+            if escaped == 'u':
+                parts.append(chr(self._read_code_unit()))
+            elif escaped == '\n':
+                continue  # Continuação de linha do JavaScript
+            else:
+                parts.append(self._ESCAPES.get(escaped, escaped))
+
+    def _read_code_unit(self):
+        """
+        Lê os 4 dígitos hexadecimais de um escape `\\uXXXX`. Um par de surrogates
+        (`\\ud83d\\ude80`, e.g. emojis) é combinado em um único caractere, como no `json.loads`.
+        """
+        self._ensure(4)
+        digits = self.buffer[self.pos:self.pos + 4]
+        if len(digits) < 4:
+            self._error("Escape \\u incompleto")
+        code = int(digits, 16)
+        self.pos += 4
+        if 0xD800 <= code <= 0xDBFF:
+            self._ensure(6)
+            following = self.buffer[self.pos:self.pos + 6]
+            if following[:2] == '\\u' and len(following) == 6:
+                low = int(following[2:], 16)
+                if 0xDC00 <= low <= 0xDFFF:
+                    self.pos += 6
+                    return 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+        return code
+
+    def _read_bare(self):
+        """Lê um token sem aspas (chave, número ou literal) até um delimitador."""
+        chars = []
+        while True:
+            char = self._peek()
+            if char == '' or char in ',:]}' or char.isspace():
+                break
+            chars.append(char)
+            self.pos += 1
+        if not chars:
+            self._error("Valor inesperado")
+        return ''.join(chars)
+
+    def _read_value(self):
+        self._skip_whitespace()
+        char = self._peek()
+        if char == '{':
+            return self._read_object()
+        if char == '[':
+            return self._read_array()
+        if char in ('"', "'"):
+            return self._read_string()
+        token = self._read_bare()
+        if token in JS_LITERALS:
+            return JS_LITERALS[token]
+        try:
+            return int(token)
+        except ValueError:
+            pass
+        try:
+            return float(token)
+        except ValueError:
+            return token
+
+    def _read_array(self):
+        self.pos += 1  # '['
+        items = []
+        while True:
+            self._skip_whitespace()
+            if self._peek() == ']':
+                self.pos += 1
+                return items
+            items.append(self._read_value())
+            self._skip_separator(']')
+
+    def _read_object(self):
+        self.pos += 1  # '{'
+        record = {}
+        while True:
+            self._skip_whitespace()
+            char = self._peek()
+            if char == '}':
+                self.pos += 1
+                return record
+            key = self._read_string() if char in ('"', "'") else self._read_bare()
+            self._skip_whitespace()
+            if self._next() != ':':
+                self._error(f"Esperado ':' após a chave {key!r}")
+            record[key] = self._read_value()
+            self._skip_separator('}')
+
+    def _skip_separator(self, closing):
+        self._skip_whitespace()
+        char = self._peek()
+        if char == ',':
+            self.pos += 1
+        elif char != closing:
+            self._error(f"Esperado ',' ou '{closing}'")
+
+    def records(self):
+        """Gera os registros do array principal, um de cada vez."""
+        # Ignora qualquer prefixo (e.g. `module.exports =`) antes do início do array
+        while self._peek() not in ('[', ''):
+            self.pos += 1
+        if self._next() != '[':
+            self._error("Array de registros não encontrado")
+        while True:
+            self._skip_whitespace()
+            char = self._peek()
+            if char == ']' or char == '':
+                return
+            yield self._read_value()
+            self._skip_separator(']')
+
+
+def iter_simi_records(input_path):
+    """Abre o arquivo bruto do SIMI e gera seus registros um a um."""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        yield from SimiJsParser(f).records()
+
+
 def preprocess_simi_data():
     """
-    Lê os dados brutos do SIMI de um arquivo .js, corrige o formato,
-    renomeia as colunas e salva como um arquivo CSV processado.
+    Lê os dados brutos do SIMI de um arquivo .js em streaming, renomeia as colunas e salva
+    como um arquivo CSV processado, escrito em blocos.
+
+    Primeira passada: os registros são extraídos um a um do .js e gravados em um arquivo
+    JSON Lines intermediário, enquanto as colunas são coletadas na ordem em que aparecem.
+    Segunda passada: o JSON Lines é lido em blocos de CSV_CHUNK_ROWS registros, que são
+    escritos no CSV final com um cabeçalho único e, em paralelo, em um Parquet tipado
+    (colunas categóricas codificadas por dicionário). A memória usada não depende do
+    tamanho do export.
     """
-    # 2. DEFINIÇÃO DOS CAMINHOS DOS ARQUIVOS (sem alterações)
+    # 2. DEFINIÇÃO DOS CAMINHOS DOS ARQUIVOS
     input_path = Path("data/raw/simi_data.js")
     output_path = Path("data/processed/simi_data_processed.csv")
-    debug_path = Path("data/processed/debug_corrected_text.json")
+    parquet_path = output_path.with_suffix('.parquet')
+    # Registros já corrigidos, um JSON por linha (útil para inspeção manual)
+    records_path = Path("data/processed/simi_data_records.jsonl")
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
     print(f"Lendo dados brutos de: {input_path}")
-    
-    # 3. LEITURA E CORREÇÃO DO ARQUIVO (SEÇÃO ATUALIZADA)
-    with open(input_path, 'r', encoding='utf-8') as f:
-        raw_text = f.read()
-
-    # --- INÍCIO DAS NOVAS CORREÇÕES ---
-    # Passo 3.1: Proteger as quebras de linha estruturais (depois de vírgulas)
-    # Isso mantém a formatação geral do JSON.
-    text_no_newlines = raw_text.replace(',\n', '<COMMA_NEWLINE>')
-    text_no_newlines = text_no_newlines.replace('},\n', '}<COMMA_NEWLINE>')
-    
-    # Passo 3.2: Remover as quebras de linha restantes, que agora são as problemáticas dentro das strings.
-    # Também removemos o caractere de tabulação (\t) que pode causar problemas.
-    text_no_newlines = text_no_newlines.replace('\n', ' ').replace('\t', ' ')
-
-    # Passo 3.3: Restaurar as quebras de linha estruturais.
-    corrected_text = text_no_newlines.replace('<COMMA_NEWLINE>', ',\n')
-    # --- FIM DAS NOVAS CORREÇÕES ---
-    
-    # Passo 3.4: Aplicar a correção de chaves sem aspas (solução anterior)
-    corrected_text = re.sub(r'\b([a-zA-Z_][\w]*)\b:', r'"\1":', corrected_text)
-    
-    # Passo de depuração: Salvar o texto corrigido para inspeção manual
-    with open(debug_path, 'w', encoding='utf-8') as f:
-        f.write(corrected_text)
-    print(f"Arquivo de depuração salvo em: {debug_path}")
-
-    # 4. CARREGAMENTO DOS DADOS PARA O PANDAS (sem alterações)
+
+    # 3. LEITURA INCREMENTAL DO ARQUIVO .js
+    columns = {}
+    n_records = 0
     try:
-        data = json.loads(corrected_text)
-        df = pd.DataFrame(data)
-        print("Dados carregados com sucesso em um DataFrame.")
-    except json.JSONDecodeError as e:
-        print(f"\n--- ERRO! O JSON AINDA É INVÁLIDO ---")
-        print(f"Erro ao decodificar: {e}")
-        print(f"Verifique o arquivo '{debug_path}' na linha/coluna indicada pelo erro.")
+        with open(records_path, 'w', encoding='utf-8') as f:
+            for record in iter_simi_records(input_path):
+                if not isinstance(record, dict):
+                    continue
+                for key in record:
+                    columns.setdefault(key, None)
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                n_records += 1
+    except ValueError as e:
+        print(f"\n--- ERRO! O ARQUIVO .js NÃO PÔDE SER INTERPRETADO ---")
+        print(f"Erro após {n_records} registros: {e}")
         print("Causas comuns: aspas ( \" ) não escapadas dentro de um valor de texto.")
         return
+    print(f"{n_records} registros lidos com sucesso. Registros corrigidos salvos em: {records_path}")
 
-    # O restante do script (5 e 6) permanece o mesmo...
-    # 5. RENOMEAÇÃO DAS COLUNAS
-    original_cols = set(df.columns)
-    map_keys = set(RENAME_MAP.keys())
-    unmapped_cols = original_cols - map_keys
+    # 4. RENOMEAÇÃO DAS COLUNAS
+    unmapped_cols = [col for col in columns if col not in RENAME_MAP]
     if unmapped_cols:
         print("\nAtenção! As seguintes colunas não foram encontradas no mapa e não serão renomeadas:")
         for col in unmapped_cols:
             print(f"- {col}")
-    
-    df.rename(columns=RENAME_MAP, inplace=True)
-    print("\nColunas renomeadas com sucesso.")
+    output_columns = [RENAME_MAP.get(col, col) for col in columns]
+
+    # 5. ESCRITA DO CSV E DO PARQUET EM BLOCOS
+    try:
+        parquet_writer = open_parquet_writer(parquet_path, output_columns)
+    except ImportError:
+        parquet_writer = None
+        print("AVISO: pyarrow não está instalado; apenas o CSV será gerado.")
 
-    # 6. SALVANDO O ARQUIVO PROCESSADO EM CSV
-    df.to_csv(output_path, index=False, encoding='utf-8-sig')
+    # dtype=object mantém os valores como vieram do .js, sem inferência de tipos diferente por bloco
+    with open(records_path, 'r', encoding='utf-8') as f_in, open(output_path, 'w', encoding='utf-8-sig', newline='') as f_out:
+        chunk = []
+        write_header = True
+        for line in f_in:
+            chunk.append(json.loads(line))
+            if len(chunk) == CSV_CHUNK_ROWS:
+                _write_chunk(chunk, list(columns), output_columns, f_out, write_header, parquet_writer)
+                chunk, write_header = [], False
+        if chunk or write_header:
+            _write_chunk(chunk, list(columns), output_columns, f_out, write_header, parquet_writer)
+    if parquet_writer is not None:
+        parquet_writer.close()
+    print("\nColunas renomeadas com sucesso.")
     print(f"\nDados processados e salvos com sucesso em: {output_path}")
+    if parquet_writer is not None:
+        print(f"Versão Parquet (tipada e comprimida) salva em: {parquet_path}")
+
+
+def _write_chunk(records, columns, output_columns, f_out, write_header, parquet_writer=None):
+    """Escreve um bloco de registros no CSV (e no Parquet) de saída, com as colunas já renomeadas."""
+    # dtype=object na construção: sem inferência, um número vem igual em todos os blocos (e.g. "3", nunca "3.0")
+    df = pd.DataFrame(records, columns=columns, dtype=object)
+    df.columns = output_columns
+    df.to_csv(f_out, index=False, header=write_header)
+    if parquet_writer is not None:
+        parquet_writer.write_table(to_arrow_table(df, parquet_writer.schema))
+
 
 if __name__ == "__main__":
-    preprocess_simi_data()
\ No newline at end of file
+    preprocess_simi_data()
@@ -1,7 +1,11 @@
 import pandas as pd
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
-print("Iniciando script de enriquecimento de dados...")
+# Permite importar os módulos de `src` ao executar o script a partir da raiz do projeto
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.entity_resolution import EntityIndex, normalize_name
 
 # --- 1. Definir os Caminhos ---
 # Caminhos relativos à localização do script (dentro da pasta 'scripts')
@@ -15,48 +19,107 @@ arquivos_csv_para_enriquecer = [
     'demais_organizacoes.csv'
 ]
 
-# --- 2. Carregar o DataFrame "Fonte da Verdade" (o JSON) ---
-try:
+# Colunas que já sabemos que estão nos CSVs e não devem ser trazidas da fonte
+colunas_para_evitar_duplicar = ['descricao_organizacao', 'categoria_organizacao', 'segmento_atuacao', 'tecnologias_disruptivas', 'fase_negocio']
+
+
+def carregar_fonte():
+    """
+    Carrega o DataFrame "Fonte da Verdade" (o JSON) uma única vez e o indexa pelo ID canônico
+    da organização (nome normalizado). Retorna a fonte indexada e o índice de entidades usado
+    para resolver os nomes dos CSVs.
+    """
     # O JSON parece ser uma lista de registros (dicionários)
     df_fonte = pd.read_json(JSON_COMPLETO_PATH, orient='records')
     print(f"Fonte de dados '{os.path.basename(JSON_COMPLETO_PATH)}' carregada. Contém {df_fonte.shape[0]} registros e {df_fonte.shape[1]} colunas.")
-except Exception as e:
-    print(f"ERRO ao carregar o arquivo JSON: {e}")
-    exit() # Interrompe o script se não conseguir carregar a fonte principal
-
-# Selecionar apenas as colunas que queremos adicionar, mais a chave de junção.
-# Isso evita duplicar colunas que já existem no CSV.
-colunas_fonte = list(df_fonte.columns)
-# Vamos remover colunas que já sabemos que estão no CSV para evitar conflitos no merge
-colunas_para_evitar_duplicar = ['descricao_organizacao', 'categoria_organizacao', 'segmento_atuacao', 'tecnologias_disruptivas', 'fase_negocio']
-colunas_para_adicionar = [col for col in colunas_fonte if col not in colunas_para_evitar_duplicar or col == 'nome_organizacao']
-df_fonte_selecionada = df_fonte[colunas_para_adicionar]
+
+    colunas_fonte = [col for col in df_fonte.columns if col not in colunas_para_evitar_duplicar]
+    df_indexada = df_fonte[colunas_fonte].copy()
+    # Os nomes são resolvidos para um ID canônico (normalizado, sem acentos e sufixos societários),
+    # com correspondência aproximada para grafias diferentes. Um registro por organização na fonte.
+    df_indexada.index = df_indexada['nome_organizacao'].map(normalize_name)
+    df_indexada = df_indexada[~df_indexada.index.duplicated(keep='first')].drop(columns=['nome_organizacao'])
+    return df_indexada, EntityIndex(df_fonte['nome_organizacao'])
 
 
-# --- 3. Fazer o Loop, Enriquecer e Salvar cada CSV ---
-for nome_arquivo in arquivos_csv_para_enriquecer:
+def colunas_ausentes(df_alvo, colunas_fonte):
+    """
+    Colunas da fonte que ainda não existem no CSV. Uma coluna conta como existente também se
+    estiver com os sufixos `_x`/`_y` deixados por merges de execuções antigas deste script.
+    """
+    existentes = set(df_alvo.columns)
+    return [
+        col for col in colunas_fonte
+        if col not in existentes and f"{col}_x" not in existentes and f"{col}_y" not in existentes
+    ]
+
+
+def salvar_csv_atomico(df, caminho_csv):
+    """Grava o CSV em um arquivo temporário e o troca pelo original de uma só vez."""
+    caminho_tmp = caminho_csv + '.tmp'
+    df.to_csv(caminho_tmp, index=False)
+    os.replace(caminho_tmp, caminho_csv)
+
+
+def enriquecer_arquivo(nome_arquivo, df_fonte, indice_entidades):
+    """Adiciona a um CSV apenas as colunas da fonte que ele ainda não tem. Retorna uma mensagem de resultado."""
     caminho_csv = os.path.join(PASTA_REPORTS, nome_arquivo)
-    print(f"\nProcessando arquivo: {nome_arquivo}...")
-    
     try:
         df_alvo = pd.read_csv(caminho_csv)
     except FileNotFoundError:
-        print(f"-> AVISO: Arquivo '{nome_arquivo}' não encontrado. Pulando.")
-        continue
-
-    # A mágica acontece aqui: pd.merge()
-    # Usamos 'how="left"' para garantir que todas as organizações do nosso CSV
-    # de alvo sejam mantidas, mesmo que não encontrem uma correspondência no JSON.
-    df_enriquecido = pd.merge(
-        left=df_alvo,                 # O DataFrame que queremos enriquecer
-        right=df_fonte_selecionada,    # O DataFrame com as colunas extras
-        on='nome_organizacao',       # A coluna chave para a junção
-        how='left'                   # Tipo de junção
+        return f"-> AVISO: Arquivo '{nome_arquivo}' não encontrado. Pulando."
+
+    novas_colunas = colunas_ausentes(df_alvo, df_fonte.columns)
+    if not novas_colunas:
+        return f"-> '{nome_arquivo}' já está enriquecido. Nenhuma alteração necessária."
+
+    # Busca por chave (hash) na fonte indexada, em vez de um merge completo:
+    # as linhas do CSV ficam na mesma ordem e nunca são duplicadas.
+    resolvidos = indice_entidades.resolve(df_alvo['nome_organizacao'])
+    entity_ids = resolvidos['entity_id']
+    valores = df_fonte[novas_colunas].reindex(entity_ids.values)
+    df_enriquecido = pd.concat([df_alvo, valores.set_index(df_alvo.index)], axis=1)
+
+    salvar_csv_atomico(df_enriquecido, caminho_csv)
+
+    mensagem = (
+        f"-> Sucesso! '{nome_arquivo}' foi atualizado com {len(novas_colunas)} novas colunas. "
+        f"Novas dimensões: {df_enriquecido.shape[0]} linhas, {df_enriquecido.shape[1]} colunas."
     )
+    nao_encontrados = entity_ids.isna().sum()
+    if nao_encontrados:
+        mensagem += f"\n-> AVISO: {nao_encontrados} organizações de '{nome_arquivo}' não foram encontradas na fonte de dados."
+    # Correspondências aproximadas (nome diferente do da fonte), listadas para conferência
+    aproximados = resolvidos[resolvidos['entity_id'].notna() & (resolvidos['score'] < 1.0)]
+    if not aproximados.empty:
+        mensagem += f"\n-> {len(aproximados)} organizações de '{nome_arquivo}' foram associadas por similaridade de nome:"
+        for _, match in aproximados.iterrows():
+            mensagem += f"\n   - '{match['nome']}' -> '{match['entity_id']}' (similaridade {match['score']:.2f})"
+    return mensagem
+
+
+def main():
+    print("Iniciando script de enriquecimento de dados...")
+
+    # --- 2. Carregar e indexar a fonte uma única vez ---
+    try:
+        df_fonte, indice_entidades = carregar_fonte()
+    except Exception as e:
+        print(f"ERRO ao carregar o arquivo JSON: {e}")
+        return # Interrompe o script se não conseguir carregar a fonte principal
+
+    # --- 3. Enriquecer e salvar os CSVs em paralelo ---
+    with ThreadPoolExecutor(max_workers=len(arquivos_csv_para_enriquecer)) as executor:
+        resultados = executor.map(
+            lambda nome_arquivo: enriquecer_arquivo(nome_arquivo, df_fonte, indice_entidades),
+            arquivos_csv_para_enriquecer
+        )
+        for nome_arquivo, mensagem in zip(arquivos_csv_para_enriquecer, resultados):
+            print(f"\nProcessando arquivo: {nome_arquivo}...")
+            print(mensagem)
+
+    print("\nProcesso de enriquecimento concluído com sucesso!")
 
-    # Sobrescreve o arquivo CSV original com a versão enriquecida
-    df_enriquecido.to_csv(caminho_csv, index=False)
-    
-    print(f"-> Sucesso! '{nome_arquivo}' foi atualizado. Novas dimensões: {df_enriquecido.shape[0]} linhas, {df_enriquecido.shape[1]} colunas.")
 
-print("\nProcesso de enriquecimento concluído com sucesso!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,17 @@ import pandas as pd
 import numpy as np
 import os
 import joblib # Usado para salvar e carregar o modelo treinado
+import argparse
 
 from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.multioutput import MultiOutputClassifier
 from sklearn.pipeline import Pipeline
 import nltk
 from nltk.corpus import stopwords
 
+from data_io import read_table
+from multilabel import CLASSIFIER_KINDS, make_mission_classifier
+
 # --- CONFIGURAÇÃO (deve ser idêntica à do script de treino) ---
 GOLDEN_DATASET_PATH = os.path.join('data', 'processed', 'golden_dataset.csv')
 TEXT_FEATURES = ['nome_organizacao', 'descricao_organizacao', 'segmento_atuacao', 'tecnologias_disruptivas']
@@ -32,7 +34,7 @@ def load_and_prepare_data(filepath):
     if not os.path.exists(filepath):
         print(f"ERRO: Golden Dataset não encontrado em '{filepath}'")
         return None, None, None
-    df = pd.read_csv(filepath)
+    df = read_table(filepath, columns=TEXT_FEATURES + TARGET_LABELS)
     for col in TEXT_FEATURES:
         df[col] = df[col].fillna('')
     df['combined_text'] = df[TEXT_FEATURES].apply(lambda row: ' '.join(row.values.astype(str)), axis=1)
@@ -40,8 +42,8 @@ def load_and_prepare_data(filepath):
     y = df[TARGET_LABELS]
     return X, y, df
 
-def train_and_save_pipeline_if_not_exists(X_train, y_train):
-    """Treina e salva o pipeline se ele ainda não existir."""
+def train_and_save_pipeline_if_not_exists(X_train, y_train, classifier='multioutput'):
+    """Treina e salva o pipeline (com o classificador `classifier`) se ele ainda não existir."""
     if os.path.exists(MODEL_PIPELINE_PATH):
         print(f"Carregando modelo existente de '{MODEL_PIPELINE_PATH}'...")
         return joblib.load(MODEL_PIPELINE_PATH)
@@ -50,7 +52,7 @@ def train_and_save_pipeline_if_not_exists(X_train, y_train):
     portuguese_stopwords = stopwords.words('portuguese')
     pipeline = Pipeline([
         ('tfidf', TfidfVectorizer(stop_words=portuguese_stopwords, ngram_range=(1, 2), max_features=3000)),
-        ('clf', MultiOutputClassifier(LogisticRegression(solver='liblinear', class_weight='balanced', random_state=RANDOM_STATE)))
+        ('clf', make_mission_classifier(classifier, random_state=RANDOM_STATE))
     ])
     pipeline.fit(X_train, y_train)
     
@@ -59,7 +61,7 @@ def train_and_save_pipeline_if_not_exists(X_train, y_train):
     print(f"Modelo salvo em '{MODEL_PIPELINE_PATH}'.")
     return pipeline
 
-def main():
+def main(classifier='multioutput'):
     """
     Função principal que carrega o modelo, faz previsões e analisa os erros.
     """
@@ -74,7 +76,7 @@ def main():
     )
 
     # Garante que o modelo esteja treinado e salvo
-    pipeline = train_and_save_pipeline_if_not_exists(X_train, y_train)
+    pipeline = train_and_save_pipeline_if_not_exists(X_train, y_train, classifier)
 
     # Faz previsões no conjunto de teste
     y_pred_array = pipeline.predict(X_test)
@@ -106,5 +108,11 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Análise dos erros de classificação do modelo v2.")
+    parser.add_argument(
+        '--classifier', choices=CLASSIFIER_KINDS, default='multioutput',
+        help="Classificador usado se o modelo ainda precisar ser treinado (padrão: %(default)s)."
+    )
+    args = parser.parse_args()
+    main(classifier=args.classifier)
 
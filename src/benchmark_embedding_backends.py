@@ -0,0 +1,91 @@
+import numpy as np
+import os
+import time
+import joblib
+import argparse
+
+from embeddings import EMBEDDING_MODEL_NAME, EMBEDDING_BACKENDS, get_embedding_model, encode_bucketed, trained_max_seq_length
+from data_io import read_table
+
+# --- CONFIGURAÇÃO ---
+FULL_DATASET_PATH = os.path.join('data', 'processed', 'df_executores.csv')
+CLASSIFIER_MODEL_PATH = os.path.join('reports', 'model_v4_embeddings.joblib')
+TEXT_FEATURES = ['nome_organizacao', 'descricao_organizacao', 'segmento_atuacao', 'tecnologias_disruptivas']
+SAMPLE_SIZE = 500
+RANDOM_STATE = 42
+
+# Tolerâncias para aceitar um backend alternativo no lugar do fp32:
+# - similaridade de cosseno média mínima entre os embeddings dos dois backends;
+# - fração máxima de rótulos (organização x missão) cuja previsão do classificador v4 muda.
+MIN_MEAN_COSINE = 0.99
+MAX_LABEL_DISAGREEMENT = 0.01
+
+
+def load_sample_texts(n_samples):
+    """Carrega uma amostra reprodutível dos textos combinados do dataset completo."""
+    # Usa a versão Parquet do arquivo, se existir e estiver atualizada
+    df = read_table(FULL_DATASET_PATH, columns=TEXT_FEATURES)
+    df = df.sample(n=min(n_samples, len(df)), random_state=RANDOM_STATE)
+    for col in TEXT_FEATURES:
+        df[col] = df[col].fillna('')
+    return df[TEXT_FEATURES].apply(lambda row: ' '.join(row.values.astype(str)), axis=1).tolist()
+
+
+def encode_timed(backend, texts, max_seq_length=None):
+    """
+    Codifica os textos sem o cache em disco, pelo mesmo caminho da produção (`encode_bucketed`:
+    lotes por orçamento de tokens), e retorna os embeddings e a vazão em textos/segundo.
+    """
+    model = get_embedding_model(EMBEDDING_MODEL_NAME, backend)
+    encode_bucketed(model, texts[:8], max_seq_length=max_seq_length, show_progress_bar=False)  # Aquecimento (alocação de memória, compilação de grafos)
+    start = time.perf_counter()
+    embeddings = encode_bucketed(model, texts, max_seq_length=max_seq_length, show_progress_bar=False)
+    elapsed = time.perf_counter() - start
+    return np.asarray(embeddings, dtype=np.float32), len(texts) / elapsed
+
+
+def cosine_similarities(a, b):
+    """Similaridade de cosseno linha a linha entre duas matrizes."""
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def main(backends, n_samples):
+    """
+    Compara os backends de inferência com o modelo fp32 original: vazão, desvio de cosseno
+    dos embeddings e concordância das previsões do classificador `model_v4_embeddings.joblib`.
+    """
+    print(f"Comparando backends de embedding em uma amostra de até {n_samples} organizações...")
+    texts = load_sample_texts(n_samples)
+    classifier = joblib.load(CLASSIFIER_MODEL_PATH)
+    # Mesmo truncamento usado nos embeddings de treino do classificador
+    max_seq_length = trained_max_seq_length(classifier)
+
+    X_reference, reference_throughput = encode_timed('torch', texts, max_seq_length)
+    y_reference = classifier.predict(X_reference)
+    print(f"\n[torch/fp32] {reference_throughput:.1f} textos/s (referência)")
+
+    for backend in backends:
+        if backend == 'torch':
+            continue
+        X_backend, throughput = encode_timed(backend, texts, max_seq_length)
+        cosines = cosine_similarities(X_reference, X_backend)
+        disagreement = np.mean(classifier.predict(X_backend) != y_reference)
+        within_tolerance = cosines.mean() >= MIN_MEAN_COSINE and disagreement <= MAX_LABEL_DISAGREEMENT
+
+        print(f"\n[{backend}] {throughput:.1f} textos/s ({throughput / reference_throughput:.2f}x em relação ao fp32)")
+        print(f"  - Similaridade de cosseno com fp32: média {cosines.mean():.4f}, mínima {cosines.min():.4f}")
+        print(f"  - Rótulos com previsão diferente do fp32: {disagreement:.2%}")
+        if within_tolerance:
+            print("  - Dentro da tolerância: pode ser usado em produção.")
+        else:
+            print(f"  - FORA da tolerância (cosseno médio >= {MIN_MEAN_COSINE}, divergência <= {MAX_LABEL_DISAGREEMENT:.0%}).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos backends de inferência do modelo de embedding.")
+    parser.add_argument('--backends', nargs='+', choices=EMBEDDING_BACKENDS, default=['int8', 'onnx'])
+    parser.add_argument('--samples', type=int, default=SAMPLE_SIZE)
+    args = parser.parse_args()
+    main(args.backends, args.samples)
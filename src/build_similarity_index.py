@@ -0,0 +1,110 @@
+import os
+import pandas as pd
+
+import numpy as np
+
+from embeddings import EMBEDDING_MODEL_NAME, embed_texts, cache_namespace
+from similarity_index import SimilarityIndex
+from predict_full_dataset import EMBEDDINGS_OUTPUT_PATH
+
+# --- CONFIGURAÇÃO ---
+# Grupos de organizações indexados (mesmos nomes das seções do dashboard) e seus relatórios
+INDEXED_GROUPS = {
+    "Executores": os.path.join('reports', 'classificacao_final_revisada.csv'),
+    "Base de Conhecimento e P&D": os.path.join('reports', 'base_conhecimento_pd.csv'),
+}
+
+# Grupos cujos vetores vêm da matriz salva por `predict_full_dataset.py` (busca pelo nome da
+# organização). Os demais grupos, e organizações ausentes da matriz, são codificados com
+# `embed_texts` (que reaproveita o cache em disco).
+SAVED_EMBEDDINGS_GROUPS = ["Executores"]
+
+# Modelo/backend/truncamento dos vetores do índice (os padrões de `embed_texts`). A matriz salva
+# só é usada se tiver sido gerada com as mesmas opções: vetores int8/onnx ou com outro
+# `max_seq_length` não são comparáveis com os demais.
+INDEX_NAMESPACE = cache_namespace()
+
+# Mesmas features de texto do treino/predição
+TEXT_FEATURES = ['nome_organizacao', 'descricao_organizacao', 'segmento_atuacao', 'tecnologias_disruptivas']
+
+SIMILARITY_INDEX_PATH = os.path.join('reports', 'indice_similaridade.npz')
+
+
+def load_group_texts():
+    """Nomes, grupos e textos combinados de todas as organizações a indexar."""
+    names, groups, texts = [], [], []
+    for group, path in INDEXED_GROUPS.items():
+        try:
+            df = pd.read_csv(path, usecols=lambda col: col in TEXT_FEATURES)
+        except FileNotFoundError:
+            print(f"AVISO: Arquivo '{path}' não encontrado. Grupo '{group}' não será indexado.")
+            continue
+        for col in TEXT_FEATURES:
+            df[col] = df[col].fillna('') if col in df.columns else ''
+        df = df.drop_duplicates(subset=['nome_organizacao'])
+        names.extend(df['nome_organizacao'].astype(str))
+        groups.extend([group] * len(df))
+        texts.extend(df[TEXT_FEATURES].apply(lambda row: ' '.join(row.values.astype(str)), axis=1))
+        print(f"Grupo '{group}': {len(df)} organizações.")
+    return names, groups, texts
+
+
+def load_saved_embeddings():
+    """
+    Vetores salvos pela predição, indexados pelo nome da organização (primeira ocorrência).
+    Se tiverem sido gerados com outras opções de codificação que as do índice, não são usados.
+    """
+    if not os.path.exists(EMBEDDINGS_OUTPUT_PATH):
+        print(f"AVISO: '{EMBEDDINGS_OUTPUT_PATH}' não encontrado; todos os grupos serão codificados.")
+        return None, {}
+    with np.load(EMBEDDINGS_OUTPUT_PATH) as data:
+        namespace = str(data['namespace']) if 'namespace' in data else None
+        if namespace != INDEX_NAMESPACE:
+            print(f"AVISO: os vetores de '{EMBEDDINGS_OUTPUT_PATH}' foram gerados com '{namespace}', e o índice "
+                  f"usa '{INDEX_NAMESPACE}'; todos os grupos serão codificados.")
+            return None, {}
+        vectors, names = data['vectors'], data['names']
+    rows = {}
+    for row, name in enumerate(names):
+        rows.setdefault(str(name), row)
+    return vectors, rows
+
+
+def group_vectors(names, groups, texts):
+    """Embeddings de todas as organizações a indexar, na ordem das listas."""
+    saved_vectors, saved_rows = load_saved_embeddings()
+    positions = [
+        saved_rows.get(name) if group in SAVED_EMBEDDINGS_GROUPS else None
+        for name, group in zip(names, groups)
+    ]
+    missing = [i for i, position in enumerate(positions) if position is None]
+    print(f"{len(names) - len(missing)} vetores reaproveitados da predição, {len(missing)} a obter com o modelo.")
+
+    encoded = embed_texts([texts[i] for i in missing]) if missing else None
+    dim = saved_vectors.shape[1] if saved_vectors is not None else encoded.shape[1]
+    vectors = np.empty((len(names), dim), dtype=np.float32)
+    found = [i for i, position in enumerate(positions) if position is not None]
+    if found:
+        vectors[found] = saved_vectors[[positions[i] for i in found]]
+    if missing:
+        vectors[missing] = encoded
+    return vectors
+
+
+def main():
+    print("Construindo o índice de organizações semelhantes...")
+    names, groups, texts = load_group_texts()
+    if not texts:
+        print("ERRO: Nenhuma organização para indexar.")
+        return
+
+    print(f"Obtendo os embeddings com o modelo '{EMBEDDING_MODEL_NAME}'...")
+    vectors = group_vectors(names, groups, texts)
+
+    index = SimilarityIndex.build(vectors, names, groups)
+    index.save(SIMILARITY_INDEX_PATH)
+    print(f"Índice com {len(names)} organizações e {len(index.centroids)} listas salvo em '{SIMILARITY_INDEX_PATH}'.")
+
+
+if __name__ == "__main__":
+    main()
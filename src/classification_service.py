@@ -0,0 +1,202 @@
+"""
+Serviço local de classificação de organizações nas 6 Missões (modelo v4, embeddings).
+
+O classificador `model_v4_embeddings.joblib` e o modelo de embedding são carregados uma
+única vez, quando o serviço sobe. Requisições concorrentes são agrupadas em micro-lotes:
+o primeiro pedido que chega abre uma janela de poucos milissegundos, e todos os pedidos
+recebidos nessa janela são codificados e classificados juntos.
+
+Como usar (a partir da raiz do projeto):
+    python src/classification_service.py --port 8000
+
+    curl -X POST http://localhost:8000/classificar \\
+         -H 'Content-Type: application/json' \\
+         -d '{"nome_organizacao": "AgroTech X", "descricao_organizacao": "Bioinsumos para soja"}'
+
+O corpo pode ser um único objeto ou uma lista de objetos com os campos de TEXT_FEATURES.
+A resposta traz, para cada organização, as flags (0/1) e as probabilidades de cada missão.
+"""
+
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+
+from embeddings import EMBEDDING_BACKEND, EMBEDDING_BACKENDS, get_embedding_model, encode_bucketed, trained_max_seq_length
+
+# --- CONFIGURAÇÃO ---
+CLASSIFIER_MODEL_PATH = os.path.join('reports', 'model_v4_embeddings.joblib')
+TEXT_FEATURES = ['nome_organizacao', 'descricao_organizacao', 'segmento_atuacao', 'tecnologias_disruptivas']
+TARGET_LABELS = ['M1_Agro', 'M2_Saude', 'M3_Infra_Mobilidade', 'M4_Transformacao_Digital', 'M5_Bioeconomia_Energia', 'M6_Defesa_Soberania']
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+MAX_BATCH_SIZE = 64      # Máximo de organizações por micro-lote
+MAX_WAIT_SECONDS = 0.01  # Janela de espera para agrupar requisições concorrentes
+
+
+def combine_text(record):
+    """Monta o texto combinado de uma organização, assim como foi feito no treino."""
+    values = []
+    for col in TEXT_FEATURES:
+        value = record.get(col)
+        values.append('' if value is None else str(value))
+    return ' '.join(values)
+
+
+class MicroBatcher:
+    """
+    Agrupa pedidos concorrentes em micro-lotes processados por uma única thread.
+    Cada chamada a `submit` recebe uma lista de textos e devolve um Future com o resultado.
+    """
+
+    def __init__(self, classifier, embedding_model, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT_SECONDS):
+        self.classifier = classifier
+        self.embedding_model = embedding_model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, texts):
+        future = Future()
+        self._queue.put((texts, future))
+        return future
+
+    def _collect(self):
+        """Bloqueia até o primeiro pedido e agrupa os que chegarem dentro da janela de espera."""
+        pending = [self._queue.get()]
+        n_texts = len(pending[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while n_texts < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            n_texts += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            texts = [text for item_texts, _ in pending for text in item_texts]
+            try:
+                results = self._classify(texts) if texts else []
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            # Devolve a cada pedido a sua fatia dos resultados
+            start = 0
+            for item_texts, future in pending:
+                future.set_result(results[start:start + len(item_texts)])
+                start += len(item_texts)
+
+    def _classify(self, texts):
+        # Mesmo truncamento usado nos embeddings de treino do classificador
+        X = encode_bucketed(self.embedding_model, texts, max_seq_length=trained_max_seq_length(self.classifier),
+                            show_progress_bar=False)
+        flags = self.classifier.predict(X)
+        # MultiOutputClassifier.predict_proba devolve uma matriz (n, 2) por missão
+        probabilities = np.column_stack([proba[:, 1] for proba in self.classifier.predict_proba(X)])
+        return [
+            {
+                'missoes': {label: int(flag) for label, flag in zip(TARGET_LABELS, row_flags)},
+                'probabilidades': {label: round(float(p), 4) for label, p in zip(TARGET_LABELS, row_probas)},
+            }
+            for row_flags, row_probas in zip(flags, probabilities)
+        ]
+
+
+def make_handler(batcher):
+    """Cria a classe de handler HTTP ligada ao micro-batcher do serviço."""
+
+    class ClassificationHandler(BaseHTTPRequestHandler):
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/saude':
+                self._send_json(200, {'status': 'ok'})
+            else:
+                self._send_json(404, {'erro': 'Rota não encontrada.'})
+
+        def do_POST(self):
+            if self.path != '/classificar':
+                self._send_json(404, {'erro': 'Rota não encontrada.'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'null')
+            except (ValueError, json.JSONDecodeError) as e:
+                self._send_json(400, {'erro': f"JSON inválido: {e}"})
+                return
+
+            single = isinstance(payload, dict)
+            records = [payload] if single else payload
+            if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                self._send_json(400, {'erro': "Envie um objeto ou uma lista de objetos com os campos da organização."})
+                return
+
+            try:
+                results = batcher.submit([combine_text(r) for r in records]).result()
+            except Exception as e:
+                self._send_json(500, {'erro': f"Falha na classificação: {e}"})
+                return
+            self._send_json(200, results[0] if single else results)
+
+        def log_message(self, format, *args):
+            # Silencia o log padrão por requisição do http.server
+            pass
+
+    return ClassificationHandler
+
+
+def main(host, port, backend):
+    """Carrega os modelos uma única vez e inicia o servidor HTTP."""
+    print("Iniciando o serviço de classificação (modelo v4, embeddings)...")
+    try:
+        classifier = joblib.load(CLASSIFIER_MODEL_PATH)
+        print(f"Classificador carregado com sucesso de '{CLASSIFIER_MODEL_PATH}'.")
+    except FileNotFoundError as e:
+        print(f"ERRO: Arquivo de modelo não encontrado: {e}")
+        print("Por favor, execute o script 'train_evaluate_bert.py' primeiro.")
+        return
+    embedding_model = get_embedding_model(backend=backend)
+
+    batcher = MicroBatcher(classifier, embedding_model)
+    server = ThreadingHTTPServer((host, port), make_handler(batcher))
+    print(f"Serviço disponível em http://{host}:{port}/classificar (Ctrl+C para encerrar).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nEncerrando o serviço...")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço local de classificação de organizações nas 6 Missões.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--backend', choices=EMBEDDING_BACKENDS, default=EMBEDDING_BACKEND,
+                        help="Backend de inferência do modelo de embedding (padrão: %(default)s).")
+    args = parser.parse_args()
+    main(args.host, args.port, args.backend)
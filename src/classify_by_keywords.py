@@ -23,18 +23,49 @@ Como usar:
 1. Certifique-se de ter o arquivo `df_executores.csv` no diretório `data/processed/`.
 2. Execute este script a partir da raiz do seu projeto (e.g., `python src/classify_by_keywords.py`).
 3. O resultado será salvo em `reports/classificacao_missoes_keywords_v4.json`.
+
+Modo streaming (para exportações grandes do SIMI):
+`python src/classify_by_keywords.py --chunksize 50000` lê o CSV em blocos de tamanho fixo,
+classifica cada bloco e o acrescenta a `reports/classificacao_missoes_keywords_v4.jsonl`
+(um objeto JSON por linha). O uso de memória fica constante e o arquivo de saída pode ser
+lido por outros processos enquanto o job ainda está em execução.
+
+Modo incremental:
+`--incremental` mantém em `reports/classificacao_missoes_keywords_v4.manifest.npz` o hash das
+colunas de texto de cada linha e as missões atribuídas na última execução. Apenas
+organizações novas ou alteradas são classificadas novamente; se o dicionário de
+palavras-chave mudar, tudo é reclassificado. O arquivo de saída continua sendo regravado
+por inteiro a cada execução (o JSON é uma única lista indentada, e no modo streaming o
+`.jsonl` é refeito bloco a bloco): o ganho está em não reclassificar as linhas inalteradas,
+não em gravar apenas as linhas alteradas.
+
+Modo paralelo:
+`--workers N` divide o DataFrame (ou cada bloco do modo streaming) entre N processos.
+Cada processo constrói seu `KeywordMatcher` uma única vez e devolve apenas a matriz de
+flags, que é recombinada na ordem original das linhas.
 """
 
 import pandas as pd
+import numpy as np
 import os
 import re
 import json
+import argparse
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from incremental import IncrementalScorer
+from data_io import read_table
 
 # --- CONFIGURAÇÃO ---
 # Define os caminhos de entrada e saída com base na estrutura do projeto
 INPUT_FILE_PATH = os.path.join('data', 'processed', 'df_executores.csv')
 OUTPUT_DIR = 'reports'
 OUTPUT_FILE_PATH = os.path.join(OUTPUT_DIR, 'classificacao_missoes_keywords_v4.json')
+# Saída do modo streaming: JSON Lines (um registro por linha), que pode ser escrita e lida incrementalmente
+OUTPUT_JSONL_PATH = os.path.join(OUTPUT_DIR, 'classificacao_missoes_keywords_v4.jsonl')
+# Manifesto do modo incremental (hash de cada linha -> missões atribuídas na última execução)
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, 'classificacao_missoes_keywords_v4.manifest.npz')
 
 # Colunas a serem analisadas para a classificação
 TEXT_COLUMNS_TO_ANALYZE = [
@@ -113,54 +144,242 @@ def clean_text(text):
     return text
 
 
-def classify_organization(row, mission_keywords):
+class KeywordMatcher:
+    """
+    Motor de busca de palavras-chave construído uma única vez a partir de `MISSION_KEYWORDS`.
+
+    Como `clean_text` reduz o texto a tokens alfanuméricos separados por um único espaço,
+    a busca `\\b<palavra>\\b` equivale a encontrar a sequência de tokens da palavra-chave
+    dentro da sequência de tokens do texto. As palavras-chave são organizadas em uma trie de
+    tokens (variante do Aho-Corasick por tokens) e o texto é percorrido em uma única passada,
+    encontrando todas as ocorrências (inclusive sobrepostas, e.g. 'solar' dentro de
+    'energia solar fotovoltaica') de todas as missões ao mesmo tempo.
+    """
+
+    _END = object()  # Marcador de fim de palavra-chave dentro da trie
+
+    def __init__(self, mission_keywords):
+        self.missions = list(mission_keywords.keys())
+        self._trie = {}
+        for mission, keywords in mission_keywords.items():
+            for keyword in keywords:
+                node = self._trie
+                for token in keyword.split():
+                    node = node.setdefault(token, {})
+                node.setdefault(self._END, []).append((mission, keyword))
+
+    def find_all(self, cleaned_text):
+        """
+        Percorre o texto já limpo uma única vez e retorna um dicionário
+        {missão: [palavras-chave encontradas]} apenas com as missões encontradas.
+        """
+        tokens = cleaned_text.split(' ')
+        matches = {}
+        for start in range(len(tokens)):
+            node = self._trie
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                for mission, keyword in node.get(self._END, ()):
+                    found = matches.setdefault(mission, [])
+                    if keyword not in found:
+                        found.append(keyword)
+        return matches
+
+    def flags(self, cleaned_text):
+        """Retorna um dicionário {missão: 0 ou 1} para todas as missões."""
+        matches = self.find_all(cleaned_text)
+        return {mission: int(mission in matches) for mission in self.missions}
+
+
+def classify_organization(row, matcher):
     """
     Classifica uma única organização (uma linha do DataFrame) com base nos dicionários.
     Retorna um dicionário com o resultado da classificação (1 para sim, 0 para não).
     """
     combined_text = ' '.join([str(row.get(col, '')) for col in TEXT_COLUMNS_TO_ANALYZE])
     cleaned_text = clean_text(combined_text)
-    classification = {mission: 0 for mission in mission_keywords.keys()}
-    
-    for mission, keywords in mission_keywords.items():
-        for keyword in keywords:
-            if re.search(r'\b' + re.escape(keyword) + r'\b', cleaned_text):
-                classification[mission] = 1
-                break
-                
-    return classification
+    return matcher.flags(cleaned_text)
+
+def combine_text_columns(df):
+    """
+    Versão colunar de `' '.join(str(row.get(col, '')) ...)`: concatena as colunas de
+    `TEXT_COLUMNS_TO_ANALYZE` com operações vetorizadas do pandas. Valores nulos viram
+    'nan' e colunas ausentes viram '', exatamente como na versão linha a linha.
+    """
+    parts = []
+    for col in TEXT_COLUMNS_TO_ANALYZE:
+        if col in df.columns:
+            # dtype object garante que os métodos `.str` usem o módulo `re` do Python,
+            # preservando a semântica unicode de `\w` usada em `clean_text`.
+            parts.append(df[col].astype(object).fillna('nan').astype(str).astype(object))
+        else:
+            parts.append(pd.Series('', index=df.index, dtype=object))
+    return parts[0].str.cat(parts[1:], sep=' ')
+
 
-def main():
+def clean_text_series(texts):
+    """Versão vetorizada de `clean_text` para uma Series de strings."""
+    return (
+        texts.str.lower()
+        .str.replace(r'[^\w\s]', '', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+    )
+
+
+def classify_dataframe(df, matcher):
+    """
+    Classifica todas as organizações de um DataFrame de uma só vez.
+    Retorna uma matriz NumPy uint8 de formato (n_linhas, n_missões), na ordem de `matcher.missions`.
+    """
+    cleaned_texts = clean_text_series(combine_text_columns(df))
+    flags = np.zeros((len(df), len(matcher.missions)), dtype=np.uint8)
+    mission_index = {mission: j for j, mission in enumerate(matcher.missions)}
+    for i, cleaned_text in enumerate(cleaned_texts):
+        for mission in matcher.find_all(cleaned_text):
+            flags[i, mission_index[mission]] = 1
+    return flags
+
+
+def assigned_missions_labels(flags, mission_names):
+    """
+    Monta a coluna `missoes_atribuidas` sem `apply` linha a linha: cada combinação de
+    missões é codificada como uma máscara de bits e o rótulo é buscado em uma tabela
+    pré-calculada com as 2^n combinações possíveis.
+    """
+    readable_names = [mission.replace('_', ' ') for mission in mission_names]
+    lookup = np.array([
+        ', '.join(name for j, name in enumerate(readable_names) if mask & (1 << j))
+        for mask in range(1 << len(mission_names))
+    ], dtype=object)
+    masks = flags.astype(np.int64) @ (1 << np.arange(len(mission_names), dtype=np.int64))
+    return lookup[masks]
+
+
+# Matcher de cada processo do pool, construído uma única vez pelo inicializador
+_worker_matcher = None
+
+
+def _init_worker(mission_keywords):
+    """Inicializador dos processos do pool: constrói o matcher do processo."""
+    global _worker_matcher
+    _worker_matcher = KeywordMatcher(mission_keywords)
+
+
+def _classify_part(df_part):
+    """Classifica uma fatia do DataFrame dentro de um processo do pool."""
+    return classify_dataframe(df_part, _worker_matcher)
+
+
+def classify_dataframe_parallel(df, executor, workers):
+    """
+    Divide as colunas de texto do DataFrame em `workers` fatias contíguas, classifica cada
+    uma em um processo do pool e concatena as matrizes de flags na ordem original das linhas.
+    """
+    columns = [col for col in TEXT_COLUMNS_TO_ANALYZE if col in df.columns]
+    bounds = np.linspace(0, len(df), workers + 1, dtype=int)
+    parts = [df.iloc[start:end][columns] for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+    # `executor.map` devolve os resultados na mesma ordem das fatias enviadas
+    return np.concatenate(list(executor.map(_classify_part, parts)))
+
+
+def keywords_version(mission_keywords):
+    """Hash do dicionário de palavras-chave, usado para invalidar o manifesto incremental."""
+    payload = json.dumps([TEXT_COLUMNS_TO_ANALYZE, mission_keywords], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def create_incremental_scorer():
+    """Cria o `IncrementalScorer` do classificador por palavras-chave."""
+    return IncrementalScorer(MANIFEST_PATH, keywords_version(MISSION_KEYWORDS), TEXT_COLUMNS_TO_ANALYZE)
+
+
+def classify_chunk(df, matcher, executor=None, workers=1, scorer=None):
+    """
+    Classifica um DataFrame (completo ou um bloco do CSV) e retorna uma cópia com as
+    colunas de missão e a coluna de resumo `missoes_atribuidas`.
+    Se um `executor` for informado, a classificação é distribuída entre `workers` processos.
+    Se um `scorer` incremental for informado, apenas as linhas novas ou alteradas são classificadas.
+    """
+    def compute_flags(df_part):
+        if executor is not None and len(df_part) > 0:
+            return classify_dataframe_parallel(df_part, executor, workers)
+        return classify_dataframe(df_part, matcher)
+
+    flags = scorer.score(df, compute_flags) if scorer is not None else compute_flags(df)
+    df_final = pd.concat([df, pd.DataFrame(flags, columns=matcher.missions, index=df.index)], axis=1)
+    df_final['missoes_atribuidas'] = assigned_missions_labels(flags, matcher.missions)
+    return df_final
+
+
+def run_streaming(chunksize, executor=None, workers=1, incremental=False):
+    """
+    Modo streaming: lê o CSV em blocos de `chunksize` linhas, classifica cada bloco e o
+    acrescenta ao arquivo JSON Lines de saída, liberando a memória do bloco em seguida.
+    """
+    print(f"Modo streaming ativado: blocos de {chunksize} linhas -> '{OUTPUT_JSONL_PATH}'")
+    matcher = KeywordMatcher(MISSION_KEYWORDS)
+    scorer = create_incremental_scorer() if incremental else None
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    total_rows = 0
+    try:
+        with open(OUTPUT_JSONL_PATH, 'w', encoding='utf-8') as f:
+            for chunk in pd.read_csv(INPUT_FILE_PATH, chunksize=chunksize):
+                records = classify_chunk(chunk, matcher, executor, workers, scorer).to_json(orient='records', lines=True, force_ascii=False)
+                f.write(records if records.endswith('\n') else records + '\n')
+                # Descarrega o bloco no disco para que consumidores possam lê-lo imediatamente
+                f.flush()
+                total_rows += len(chunk)
+                print(f"-> {total_rows} linhas classificadas até o momento.")
+    except Exception as e:
+        print(f"ERRO: Falha durante a classificação em streaming. Detalhes: {e}")
+        return
+
+    if scorer is not None:
+        scorer.save()
+    print(f"Classificação concluída. {total_rows} registros salvos em '{OUTPUT_JSONL_PATH}'")
+
+
+def main(chunksize=None, workers=1, incremental=False):
     """
     Função principal que orquestra o processo de carga, classificação e salvamento.
     """
+    if workers > 1:
+        print(f"Modo paralelo ativado com {workers} processos.")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(MISSION_KEYWORDS,)) as executor:
+            _run(chunksize, executor, workers, incremental)
+    else:
+        _run(chunksize, incremental=incremental)
+
+
+def _run(chunksize=None, executor=None, workers=1, incremental=False):
+    """Executa o fluxo de carga, classificação e salvamento (sequencial ou com um pool de processos)."""
     print("Iniciando o script de classificação por palavras-chave (v4.0)...")
 
     if not os.path.exists(INPUT_FILE_PATH):
         print(f"ERRO: Arquivo de entrada não encontrado em '{INPUT_FILE_PATH}'")
         return
 
+    if chunksize:
+        run_streaming(chunksize, executor, workers, incremental)
+        return
+
     # Carrega o dataset a partir do arquivo CSV
     try:
         print(f"Carregando dados do arquivo CSV: {INPUT_FILE_PATH}")
-        df = pd.read_csv(INPUT_FILE_PATH)
+        # Usa a versão Parquet do arquivo, se existir e estiver atualizada
+        df = read_table(INPUT_FILE_PATH)
         print(f"Dataset carregado com sucesso. {len(df)} linhas encontradas.")
     except Exception as e:
         print(f"ERRO: Falha ao carregar ou processar o arquivo CSV. Detalhes: {e}")
         return
 
-    print("Aplicando a lógica de classificação em cada organização...")
-    classifications = df.apply(lambda row: classify_organization(row, MISSION_KEYWORDS), axis=1)
-    
-    classifications_df = pd.DataFrame(list(classifications))
-    
-    df_final = pd.concat([df, classifications_df], axis=1)
-    
-    mission_names = list(MISSION_KEYWORDS.keys())
-    df_final['missoes_atribuidas'] = df_final[mission_names].apply(
-        lambda row: ', '.join([mission.replace('_', ' ') for mission, assigned in row.items() if assigned]),
-        axis=1
-    )
+    print("Aplicando a lógica de classificação em todas as organizações...")
+    scorer = create_incremental_scorer() if incremental else None
+    df_final = classify_chunk(df, KeywordMatcher(MISSION_KEYWORDS), executor, workers, scorer)
     print("Classificação concluída.")
 
     os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -176,6 +395,25 @@ def main():
         print(f"Resultados salvos com sucesso em formato JSON em '{OUTPUT_FILE_PATH}'")
     except Exception as e:
         print(f"ERRO: Falha ao salvar o arquivo de saída JSON. Detalhes: {e}")
+        return
+
+    # O manifesto só é atualizado depois que a saída foi gravada com sucesso
+    if scorer is not None:
+        scorer.save()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Classificação de organizações por palavras-chave.")
+    parser.add_argument(
+        '--chunksize', type=int, default=None,
+        help="Ativa o modo streaming: lê o CSV em blocos deste tamanho e grava JSON Lines."
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help="Número de processos usados na classificação (padrão: 1, sequencial)."
+    )
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help="Classifica apenas as organizações novas ou alteradas desde a última execução."
+    )
+    args = parser.parse_args()
+    main(chunksize=args.chunksize, workers=args.workers, incremental=args.incremental)
@@ -2,6 +2,9 @@ import pandas as pd
 import re
 import os
 
+from data_io import read_table, write_parquet, parquet_path_for
+from entity_resolution import EntityIndex, normalize_name
+
 def process_mission_labels(df, mission_col_name):
     """
     Processa a coluna de texto das missões para criar colunas binárias (0 ou 1) para cada missão.
@@ -46,19 +49,32 @@ def main():
         print(f"ERRO: Dataset original não encontrado em '{original_data_path}'")
         return
         
-    df_original = pd.read_csv(original_data_path)
+    # Seleciona as colunas relevantes do df_original para evitar duplicatas
+    cols_to_merge = ['join_key', 'descricao_organizacao', 'segmento_atuacao', 'tecnologias_disruptivas', 'fase_negocio']
+
+    # Lê apenas as colunas necessárias (da versão Parquet, se existir e estiver atualizada)
+    df_original = read_table(original_data_path, columns=['nome_organizacao'] + cols_to_merge[1:])
     print(f"Dataset original com {len(df_original)} empresas carregado.")
 
     # 4. Preparar para a junção (merge)
-    # Criamos chaves de junção normalizadas para evitar problemas com maiúsculas/minúsculas ou espaços
+    # Os nomes são resolvidos para um ID canônico (nome normalizado, sem acentos, pontuação e
+    # sufixos societários). Nomes rotulados que não coincidem exatamente são associados ao
+    # nome mais parecido do dataset original (MinHash/LSH sobre trigramas), se bem pontuados.
     # Mantemos o nome original em uma coluna separada para a verificação de erros
     df_labels['nome_organizacao_original_rotulada'] = df_labels['nome_organizacao'] 
-    df_labels['join_key'] = df_labels['nome_organizacao'].str.lower().str.strip()
-    df_original['join_key'] = df_original['nome_organizacao'].str.lower().str.strip()
+    df_original['join_key'] = df_original['nome_organizacao'].map(normalize_name)
+    # Organizações cadastradas mais de uma vez (e.g. "X Ltda" e "X") têm o mesmo ID canônico;
+    # mantemos um único registro por organização para não duplicar linhas no Golden Dataset
+    df_original = df_original.drop_duplicates(subset='join_key', keep='first')
+    resolved = EntityIndex(df_original['nome_organizacao']).resolve(df_labels['nome_organizacao'])
+    df_labels['join_key'] = resolved['entity_id'].values
+
+    fuzzy_matches = resolved[resolved['entity_id'].notna() & (resolved['score'] < 1.0)]
+    if not fuzzy_matches.empty:
+        print(f"\n{len(fuzzy_matches)} empresas rotuladas foram associadas por similaridade de nome:")
+        for _, match in fuzzy_matches.iterrows():
+            print(f"- '{match['nome']}' -> '{match['entity_id']}' (similaridade {match['score']:.2f})")
 
-    # Seleciona as colunas relevantes do df_original para evitar duplicatas
-    cols_to_merge = ['join_key', 'descricao_organizacao', 'segmento_atuacao', 'tecnologias_disruptivas', 'fase_negocio']
-    
     # 5. Juntar os datasets
     # Usamos um 'left merge' para manter todas as empresas do dataset rotulado
     # e trazer as informações do dataset original.
@@ -94,6 +110,11 @@ def main():
     output_path = os.path.join(output_dir, 'golden_dataset.csv')
     
     df_golden.to_csv(output_path, index=False, encoding='utf-8-sig')
+    try:
+        # Versão Parquet tipada, lida pelos scripts de treino com projeção de colunas
+        write_parquet(df_golden, parquet_path_for(output_path))
+    except ImportError:
+        print("AVISO: pyarrow não está instalado; apenas o CSV foi gerado.")
     
     print("-" * 50)
     print("Golden Dataset criado com sucesso!")
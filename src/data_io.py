@@ -0,0 +1,137 @@
+"""
+Leitura e escrita das tabelas do projeto em formato colunar (Parquet).
+
+Cada CSV do pipeline pode ter uma versão Parquet ao lado (mesmo nome, extensão `.parquet`),
+com tipos definidos, colunas categóricas codificadas por dicionário e compressão zstd.
+`read_table` usa essa versão quando ela existe e está atualizada em relação ao CSV, lendo
+apenas as colunas pedidas (projeção); caso contrário, cai de volta para o CSV.
+
+Para gerar as versões Parquet de CSVs já existentes (e.g. `df_executores.csv`, criado nos
+notebooks), execute a partir da raiz do projeto:
+    python src/data_io.py data/processed/df_executores.csv data/processed/golden_dataset.csv
+"""
+
+import os
+import sys
+import pandas as pd
+
+# Colunas com poucos valores distintos, armazenadas com codificação por dicionário
+CATEGORICAL_COLUMNS = [
+    'uf_sede', 'cidade_sede', 'categoria_organizacao', 'tipo_organizacao', 'fase_negocio',
+    'numero_funcionarios', 'busca_investimento', 'fase_investimento_captada', 'fase_investimento_busca',
+    'cadastro_aprovado', 'autorizacao_divulgacao', 'possui_nit', 'exige_equity', 'papel_no_ecossistema',
+]
+# Colunas numéricas (valores inválidos viram nulos)
+NUMERIC_COLUMNS = ['num_startups_investidas']
+# Rótulos binários das missões
+LABEL_COLUMNS = [
+    'M1_Agro', 'M2_Saude', 'M3_Infra_Mobilidade', 'M4_Transformacao_Digital',
+    'M5_Bioeconomia_Energia', 'M6_Defesa_Soberania',
+]
+
+
+def parquet_path_for(csv_path):
+    """Caminho da versão Parquet de um CSV."""
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+
+def arrow_schema(columns):
+    """Esquema Arrow das colunas informadas, a partir das listas de tipos deste módulo."""
+    import pyarrow as pa
+    fields = []
+    for col in columns:
+        if col in CATEGORICAL_COLUMNS:
+            fields.append(pa.field(col, pa.dictionary(pa.int32(), pa.string())))
+        elif col in NUMERIC_COLUMNS:
+            fields.append(pa.field(col, pa.float64()))
+        elif col in LABEL_COLUMNS:
+            fields.append(pa.field(col, pa.int8()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+def to_arrow_table(df, schema=None):
+    """Converte um DataFrame para uma tabela Arrow tipada, de acordo com `arrow_schema`."""
+    import pyarrow as pa
+    schema = schema or arrow_schema(list(df.columns))
+    arrays = []
+    for field in schema:
+        values = df[field.name]
+        if pa.types.is_floating(field.type) or pa.types.is_integer(field.type):
+            values = pd.to_numeric(values, errors='coerce')
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+            continue
+        # Valores não textuais (booleanos, números, listas) são gravados como texto, assim como no CSV
+        values = values.astype(object)
+        values = values.where(values.isna(), values.astype(str))
+        array = pa.array(values, type=pa.string(), from_pandas=True)
+        arrays.append(array.dictionary_encode() if pa.types.is_dictionary(field.type) else array)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def write_parquet(df, path):
+    """Grava um DataFrame em Parquet tipado e comprimido."""
+    import pyarrow.parquet as pq
+    pq.write_table(to_arrow_table(df), path, compression='zstd')
+
+
+def open_parquet_writer(path, columns):
+    """Abre um escritor Parquet para gravar um arquivo em blocos (ver `to_arrow_table`)."""
+    import pyarrow.parquet as pq
+    return pq.ParquetWriter(path, arrow_schema(columns), compression='zstd')
+
+
+def use_parquet(csv_path):
+    """Se a versão Parquet de um CSV existe e é mais recente que ele (ou o CSV não existe)."""
+    parquet_path = parquet_path_for(csv_path)
+    return os.path.exists(parquet_path) and (
+        not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+    )
+
+
+def read_table(csv_path, columns=None):
+    """
+    Lê uma tabela do projeto, apenas com as colunas pedidas (ou todas, se `columns` for None).
+    Usa a versão Parquet se ela existir e for mais recente que o CSV; senão, lê o CSV.
+    Lança FileNotFoundError se nenhuma das duas existir.
+    """
+    if use_parquet(csv_path):
+        return pd.read_parquet(parquet_path_for(csv_path), columns=columns)
+    return pd.read_csv(csv_path, usecols=columns)
+
+
+def table_columns(csv_path):
+    """Nomes das colunas de uma tabela, lidos apenas do cabeçalho (CSV) ou do esquema (Parquet)."""
+    if use_parquet(csv_path):
+        import pyarrow.parquet as pq
+        return pq.read_schema(parquet_path_for(csv_path)).names
+    return list(pd.read_csv(csv_path, nrows=0).columns)
+
+
+def read_matching_rows(csv_path, column, value, chunksize=10000):
+    """
+    Linhas de uma tabela em que `column == value`, sem carregar a tabela inteira na memória:
+    filtro aplicado na leitura do Parquet, ou leitura do CSV em blocos.
+    """
+    if use_parquet(csv_path):
+        return pd.read_parquet(parquet_path_for(csv_path), filters=[(column, '==', value)])
+    chunks = [chunk[chunk[column] == value] for chunk in pd.read_csv(csv_path, chunksize=chunksize)]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def main(csv_paths):
+    """Gera a versão Parquet de cada CSV informado."""
+    for csv_path in csv_paths:
+        try:
+            df = pd.read_csv(csv_path)
+        except FileNotFoundError:
+            print(f"AVISO: Arquivo '{csv_path}' não encontrado. Pulando.")
+            continue
+        write_parquet(df, parquet_path_for(csv_path))
+        csv_size, parquet_size = os.path.getsize(csv_path), os.path.getsize(parquet_path_for(csv_path))
+        print(f"-> '{parquet_path_for(csv_path)}' gravado ({parquet_size / 1024:.0f} KB; CSV: {csv_size / 1024:.0f} KB).")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,180 @@
+"""
+Cache em disco de embeddings, compartilhado por todas as etapas que codificam textos.
+
+Cada modelo (ou namespace, ver `embeddings.cache_namespace`) tem um subdiretório em
+EMBEDDING_CACHE_DIR com quatro arquivos:
+- `vectors.f32`: matriz float32 (n_textos x dim) sem cabeçalho, gravada linha a linha e lida
+  via memory-map;
+- `index.txt`:   um hash (`text_key`) por linha; a linha i corresponde ao vetor i;
+- `meta.json`:   nome do modelo e dimensão dos vetores, gravado depois de os dois arquivos
+  acima existirem (sem ele, o diretório é tratado como um cache vazio);
+- `.lock`:       trava exclusiva (`fcntl.flock`) mantida durante cada leitura e escrita, para
+  que processos diferentes acrescentem linhas sem se sobrepor.
+Os arquivos só crescem: uma escrita interrompida é reparada na leitura seguinte, truncando
+os dois arquivos de dados para as linhas presentes em ambos.
+"""
+
+import os
+import re
+import json
+import hashlib
+import numpy as np
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: sem trava entre processos (não execute etapas que gravam embeddings em paralelo)
+    fcntl = None
+
+# --- CONFIGURAÇÃO ---
+# Diretório onde os embeddings já calculados ficam armazenados (um subdiretório por modelo)
+EMBEDDING_CACHE_DIR = os.path.join('data', 'cache', 'embeddings')
+
+VECTORS_FILENAME = 'vectors.f32'  # Matriz float32 (n_textos x dim), gravada linha a linha
+INDEX_FILENAME = 'index.txt'      # Um hash por linha; a linha i corresponde ao vetor i
+META_FILENAME = 'meta.json'       # Nome do modelo e dimensão dos vetores
+LOCK_FILENAME = '.lock'           # Trava de escrita entre processos
+
+
+def text_key(text, model_name):
+    """Chave de cache de um texto: hash SHA-1 do nome do modelo concatenado ao texto."""
+    return hashlib.sha1(f"{model_name}\x1f{text}".encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Armazenamento em disco de embeddings, indexado pelo hash do texto + nome do modelo.
+
+    Os vetores ficam em um arquivo binário float32 que é lido via memory-map (sem carregar
+    tudo na memória) e o índice é um arquivo texto com um hash por linha. Ambos são apenas
+    acrescidos (append-only): textos novos ou alterados geram novas linhas, e os vetores
+    já calculados nunca são recodificados. As escritas são serializadas por uma trava de
+    arquivo, para que várias etapas do pipeline possam compartilhar o mesmo cache.
+    """
+
+    def __init__(self, model_name, cache_dir=EMBEDDING_CACHE_DIR):
+        self.model_name = model_name
+        self.path = os.path.join(cache_dir, re.sub(r'[^\w.-]', '_', model_name))
+        self.dim = None
+        self._index = {}
+        self._vectors = None
+        self._load()
+
+    @contextmanager
+    def _locked(self):
+        """
+        Trava exclusiva do armazenamento (arquivo LOCK_FILENAME), mantida durante a
+        reconciliação e a escrita: várias etapas do pipeline podem gravar no mesmo cache
+        ao mesmo tempo, e cada uma precisa ver as linhas acrescentadas pelas outras.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, LOCK_FILENAME), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _sync(self):
+        """
+        Relê o índice e o tamanho do arquivo de vetores (com a trava adquirida) e atualiza o
+        mapeamento. Se uma escrita anterior foi interrompida entre os vetores e o índice, os
+        dois arquivos são truncados para as linhas presentes em ambos, para que a próxima
+        linha acrescentada fique na mesma posição nos dois arquivos. Arquivos de dados
+        ausentes (e.g. apagados à mão) contam como vazios e são recriados.
+        """
+        meta_path = os.path.join(self.path, META_FILENAME)
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            self.dim = json.load(f)['dim']
+
+        index_path = os.path.join(self.path, INDEX_FILENAME)
+        vectors_path = os.path.join(self.path, VECTORS_FILENAME)
+        for path in (index_path, vectors_path):
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+        with open(index_path, 'r', encoding='utf-8') as f:
+            keys = f.read().split()
+        vector_bytes = os.path.getsize(vectors_path)
+        n_rows = min(len(keys), vector_bytes // (4 * self.dim))
+
+        if vector_bytes != n_rows * self.dim * 4:
+            os.truncate(vectors_path, n_rows * self.dim * 4)
+        if len(keys) != n_rows:
+            with open(index_path, 'w', encoding='utf-8') as f:
+                f.write(''.join(f"{key}\n" for key in keys[:n_rows]))
+
+        self._index = {key: row for row, key in enumerate(keys[:n_rows])}
+        self._vectors = None
+        if n_rows:
+            self._vectors = np.memmap(vectors_path, dtype=np.float32, mode='r', shape=(n_rows, self.dim))
+
+    def _load(self):
+        """Carrega o índice e mapeia o arquivo de vetores em memória (somente leitura)."""
+        if not os.path.exists(os.path.join(self.path, META_FILENAME)):
+            return
+        with self._locked():
+            self._sync()
+
+    def __len__(self):
+        return len(self._index)
+
+    def add(self, keys, vectors):
+        """
+        Acrescenta novos vetores ao final do armazenamento e atualiza o índice. As posições
+        das novas linhas são calculadas a partir dos arquivos, relidos com a trava adquirida.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._locked():
+            self._sync()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                # Cache criado do zero: arquivos de dados vazios primeiro, meta.json por último,
+                # para que um meta.json nunca exista sem os arquivos que ele descreve
+                open(os.path.join(self.path, VECTORS_FILENAME), 'wb').close()
+                open(os.path.join(self.path, INDEX_FILENAME), 'w').close()
+                with open(os.path.join(self.path, META_FILENAME), 'w', encoding='utf-8') as f:
+                    json.dump({'model_name': self.model_name, 'dim': self.dim}, f)
+
+            # Textos gravados por outro processo desde a última leitura não são repetidos
+            new_rows = [i for i, key in enumerate(keys) if key not in self._index]
+            new_keys = [keys[i] for i in new_rows]
+            if new_keys:
+                first_row = len(self._index)
+                # Vetores primeiro, índice depois: um índice nunca aponta para um vetor inexistente
+                with open(os.path.join(self.path, VECTORS_FILENAME), 'ab') as f:
+                    f.write(vectors[new_rows].tobytes())
+                with open(os.path.join(self.path, INDEX_FILENAME), 'a', encoding='utf-8') as f:
+                    f.write(''.join(f"{key}\n" for key in new_keys))
+                self._index.update({key: first_row + i for i, key in enumerate(new_keys)})
+
+            # Reabre o memory-map para enxergar as novas linhas
+            self._vectors = np.memmap(
+                os.path.join(self.path, VECTORS_FILENAME), dtype=np.float32, mode='r', shape=(len(self._index), self.dim)
+            )
+
+    def get_or_encode(self, texts, encode_fn):
+        """
+        Retorna uma matriz float32 contígua com um embedding por texto, na ordem de `texts`.
+        Apenas os textos que ainda não estão no cache (deduplicados) são passados para
+        `encode_fn`, que recebe uma lista de strings e devolve uma matriz de embeddings.
+        """
+        keys = [text_key(text, self.model_name) for text in texts]
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self._index and key not in missing:
+                missing[key] = text
+
+        print(f"Cache de embeddings: {len(texts) - len(missing)} textos reaproveitados, {len(missing)} a codificar.")
+        if missing:
+            self.add(list(missing.keys()), encode_fn(list(missing.values())))
+
+        rows = np.fromiter((self._index[key] for key in keys), dtype=np.int64, count=len(keys))
+        if not len(rows):
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.ascontiguousarray(self._vectors[rows])
@@ -0,0 +1,180 @@
+"""
+Módulo compartilhado de geração de embeddings.
+
+Usado por `train_evaluate_bert.py` e `predict_full_dataset.py` para que:
+- o modelo SentenceTransformer seja carregado no máximo uma vez por processo (e só se necessário);
+- o mesmo texto nunca seja codificado duas vezes, nem entre etapas diferentes do pipeline,
+  graças ao cache em disco de `embedding_cache.py`.
+
+Backends de inferência (EMBEDDING_BACKEND):
+- 'torch': modelo PyTorch original em precisão total (fp32), padrão;
+- 'int8':  o mesmo modelo com as camadas lineares quantizadas dinamicamente para int8
+           (`torch.quantization.quantize_dynamic`), bem mais rápido em CPU;
+- 'onnx':  modelo exportado para ONNX e executado com o ONNX Runtime
+           (requer `pip install sentence-transformers[onnx]`).
+Os backends alternativos produzem vetores ligeiramente diferentes, por isso cada um tem
+seu próprio cache. Use `src/benchmark_embedding_backends.py` para medir o ganho de
+desempenho e o desvio em relação ao fp32 antes de trocar o backend em produção.
+
+Agendamento dos lotes:
+Os textos a codificar são ordenados pelo número de tokens e agrupados em lotes limitados
+por um orçamento de tokens (tamanho do lote x maior sequência do lote). Assim, textos
+curtos não são preenchidos (padding) até o tamanho das descrições longas, o que reduz o
+tempo e o pico de memória em CPU. Os vetores são devolvidos na ordem original.
+O tamanho máximo do lote, o orçamento de tokens e o truncamento (`max_seq_length`) podem
+ser passados a cada chamada de `embed_texts`/`encode_bucketed`. Os dois primeiros só mudam o
+agendamento; o truncamento muda os vetores, por isso faz parte do nome do cache (ver
+`cache_namespace`) e é gravado junto do classificador treinado (`embedding_options_`, ver
+`train_evaluate_bert.py`), para que a predição use o mesmo (`trained_max_seq_length`).
+"""
+
+import threading
+from contextlib import contextmanager
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from embedding_cache import EmbeddingCache
+
+# Modelo de embedding usado no treino e na predição (deve ser o mesmo nas duas etapas)
+EMBEDDING_MODEL_NAME = 'paraphrase-multilingual-mpnet-base-v2'
+
+# Backend de inferência usado por padrão ('torch', 'int8' ou 'onnx')
+EMBEDDING_BACKEND = 'torch'
+EMBEDDING_BACKENDS = ['torch', 'int8', 'onnx']
+
+# Parâmetros do agendamento dos lotes de codificação
+EMBEDDING_BATCH_SIZE = 32        # Número máximo de textos por lote
+EMBEDDING_TOKEN_BUDGET = 4096    # Máximo de tokens (com padding) por lote
+EMBEDDING_MAX_SEQ_LENGTH = None  # Truncamento dos textos; None mantém o padrão do modelo
+
+# Modelos e caches já carregados neste processo, indexados por (modelo, backend)
+_models = {}
+_caches = {}
+# Uma trava por modelo carregado: o truncamento de uma chamada não afeta as demais
+_model_locks = {}
+
+
+def _load_model(model_name, backend):
+    """Carrega o SentenceTransformer no backend de inferência solicitado."""
+    if backend == 'torch':
+        return SentenceTransformer(model_name)
+    if backend == 'int8':
+        import torch
+        model = SentenceTransformer(model_name, device='cpu')
+        # Quantização dinâmica: pesos das camadas lineares em int8, ativações quantizadas em tempo de execução
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    if backend == 'onnx':
+        # O sentence-transformers exporta o modelo para ONNX automaticamente se necessário
+        return SentenceTransformer(model_name, device='cpu', backend='onnx')
+    raise ValueError(f"Backend de embedding desconhecido: '{backend}'. Opções: {EMBEDDING_BACKENDS}")
+
+
+def get_embedding_model(model_name=EMBEDDING_MODEL_NAME, backend=EMBEDDING_BACKEND):
+    """Retorna o modelo SentenceTransformer, carregando-o apenas na primeira chamada."""
+    if (model_name, backend) not in _models:
+        # O download do modelo (aprox. 1.1GB) ocorrerá automaticamente na primeira vez.
+        print(f"Carregando o modelo de embedding '{model_name}' (backend: {backend})...")
+        _models[(model_name, backend)] = _load_model(model_name, backend)
+        print("Modelo de embedding carregado.")
+    return _models[(model_name, backend)]
+
+
+def cache_namespace(model_name=EMBEDDING_MODEL_NAME, backend=EMBEDDING_BACKEND, max_seq_length=EMBEDDING_MAX_SEQ_LENGTH):
+    """Nome sob o qual os vetores de um modelo/backend/truncamento são armazenados no cache."""
+    namespace = model_name if backend == 'torch' else f"{model_name}@{backend}"
+    return namespace if max_seq_length is None else f"{namespace}@len{max_seq_length}"
+
+
+def get_embedding_cache(model_name=EMBEDDING_MODEL_NAME, backend=EMBEDDING_BACKEND, max_seq_length=EMBEDDING_MAX_SEQ_LENGTH):
+    """Retorna o cache em disco de embeddings do modelo, aberto uma única vez por processo."""
+    namespace = cache_namespace(model_name, backend, max_seq_length)
+    if namespace not in _caches:
+        _caches[namespace] = EmbeddingCache(namespace)
+    return _caches[namespace]
+
+
+def trained_max_seq_length(classifier):
+    """Truncamento com que os embeddings de treino do classificador foram gerados."""
+    # Classificadores salvos antes de `embedding_options_` usaram o truncamento padrão
+    return getattr(classifier, 'embedding_options_', {}).get('max_seq_length', EMBEDDING_MAX_SEQ_LENGTH)
+
+
+def plan_batches(lengths, token_budget=EMBEDDING_TOKEN_BUDGET, max_batch_size=EMBEDDING_BATCH_SIZE):
+    """
+    Agrupa os índices dos textos em lotes, do mais longo para o mais curto, de forma que
+    cada lote respeite `max_batch_size` e o orçamento `token_budget` (lote x maior sequência).
+    Retorna uma lista de arrays de índices.
+    """
+    order = np.argsort(-np.asarray(lengths), kind='stable')
+    batches, start = [], 0
+    while start < len(order):
+        # Como os textos estão em ordem decrescente, o primeiro do lote é o mais longo
+        longest = max(int(lengths[order[start]]), 1)
+        size = max(1, min(max_batch_size, token_budget // longest))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+
+@contextmanager
+def _sequence_length(model, max_seq_length):
+    """
+    Usa `max_seq_length` (None: o padrão do modelo) apenas durante uma chamada. O modelo é
+    compartilhado no processo (e.g. pelas threads do `classification_service.py`): a trava
+    garante que nenhuma outra chamada codifique com o truncamento desta.
+    """
+    lock = _model_locks.setdefault(id(model), threading.Lock())
+    with lock:
+        previous = model.max_seq_length
+        if max_seq_length is not None:
+            model.max_seq_length = max_seq_length
+        try:
+            yield
+        finally:
+            model.max_seq_length = previous
+
+
+def encode_bucketed(model, texts, batch_size=EMBEDDING_BATCH_SIZE, token_budget=EMBEDDING_TOKEN_BUDGET,
+                    max_seq_length=EMBEDDING_MAX_SEQ_LENGTH, show_progress_bar=True):
+    """
+    Codifica os textos em lotes de comprimento semelhante (ver `plan_batches`) e devolve
+    uma matriz float32 na ordem original de `texts`. `max_seq_length` vale só para esta chamada.
+    """
+    with _sequence_length(model, max_seq_length):
+        return _encode_batches(model, texts, batch_size, token_budget, show_progress_bar)
+
+
+def _encode_batches(model, texts, batch_size, token_budget, show_progress_bar):
+    lengths = [
+        len(ids) for ids in
+        model.tokenizer(texts, truncation=True, max_length=model.max_seq_length)['input_ids']
+    ]
+    batches = plan_batches(lengths, token_budget, batch_size)
+
+    embeddings = None
+    for i, batch in enumerate(batches):
+        vectors = model.encode([texts[j] for j in batch], batch_size=len(batch), show_progress_bar=False)
+        if embeddings is None:
+            embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        # Devolve cada vetor à posição original do seu texto
+        embeddings[batch] = vectors
+        if show_progress_bar and (i + 1) % 50 == 0:
+            print(f"-> {i + 1}/{len(batches)} lotes codificados.")
+    return embeddings
+
+
+def embed_texts(texts, model_name=EMBEDDING_MODEL_NAME, backend=EMBEDDING_BACKEND, batch_size=EMBEDDING_BATCH_SIZE,
+                token_budget=EMBEDDING_TOKEN_BUDGET, max_seq_length=EMBEDDING_MAX_SEQ_LENGTH):
+    """
+    Retorna uma matriz float32 contígua (len(texts) x dim) alinhada à lista de textos.
+    Os vetores já presentes no cache são reaproveitados e apenas os textos ausentes são
+    codificados, em lote. Cada `max_seq_length` tem o seu próprio cache.
+    """
+    def encode_missing(missing_texts):
+        print("Gerando embeddings para os textos novos... (Isso pode levar alguns minutos)")
+        return encode_bucketed(
+            get_embedding_model(model_name, backend), missing_texts,
+            batch_size=batch_size, token_budget=token_budget, max_seq_length=max_seq_length
+        )
+
+    return get_embedding_cache(model_name, backend, max_seq_length).get_or_encode(list(texts), encode_missing)
@@ -0,0 +1,109 @@
+"""
+Resolução de entidades por nome de organização.
+
+Os nomes vêm de fontes diferentes (rótulos manuais, export do SIMI, relatórios) e raramente
+coincidem letra a letra: "Universidade Federal de Minas Gerais" x "UNIVERSIDADE FEDERAL DE
+MINAS GERAIS - UFMG", "São João" x "Sao Joao", "Empresa X Ltda." x "Empresa X". Este módulo:
+
+1. Normaliza os nomes (minúsculas, sem acentos, sem pontuação e sem sufixos societários como
+   "ltda", "s/a", "eireli"). O nome normalizado é o ID canônico da organização.
+2. Indexa os IDs canônicos com MinHash sobre trigramas de caracteres e LSH por bandas
+   (blocking), de forma que cada consulta só é comparada com poucos candidatos, em vez de
+   com todos os nomes (custo subquadrático).
+3. Pontua os candidatos com a similaridade de Jaccard dos trigramas e devolve o melhor.
+"""
+
+import re
+import zlib
+import unicodedata
+import numpy as np
+import pandas as pd
+
+# Sufixos e termos societários que não ajudam a identificar a organização
+LEGAL_TOKENS = {'ltda', 'me', 'epp', 'eireli', 'sa', 'ss', 'mei', 'cia', 'limitada'}
+
+# Parâmetros do MinHash/LSH: 16 bandas de 4 linhas detectam pares com Jaccard acima de ~0.5
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+MIN_SCORE = 0.8  # Similaridade mínima para aceitar uma correspondência aproximada
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = np.random.RandomState(42)
+_HASH_A = _rng.randint(1, 1 << 32, size=NUM_BANDS * ROWS_PER_BAND).astype(np.uint64)
+_HASH_B = _rng.randint(0, 1 << 32, size=NUM_BANDS * ROWS_PER_BAND).astype(np.uint64)
+
+
+def normalize_name(name):
+    """Nome normalizado (ID canônico): minúsculo, sem acentos, pontuação e sufixos societários."""
+    if not isinstance(name, str):
+        return ''
+    text = unicodedata.normalize('NFKD', name.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r'\bs\s*[./]\s*a\b', ' ', text)  # "S/A", "S.A", "S / A"
+    text = re.sub(r'[^\w\s]', ' ', text)
+    tokens = [token for token in text.split() if token not in LEGAL_TOKENS]
+    return ' '.join(tokens)
+
+
+def trigrams(key):
+    """Conjunto de trigramas de caracteres do nome normalizado (com bordas)."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def minhash_signature(shingles):
+    """Assinatura MinHash (NUM_BANDS * ROWS_PER_BAND valores) de um conjunto de trigramas."""
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # h_i(x) = (a_i * x + b_i) mod p, calculado para todas as funções de uma só vez
+    values = (np.outer(_HASH_A, hashes) + _HASH_B[:, None]) % _MERSENNE_PRIME
+    return values.min(axis=1)
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class EntityIndex:
+    """Índice de nomes de referência, consultável por nomes possivelmente escritos de outra forma."""
+
+    def __init__(self, names):
+        self.keys = sorted({normalize_name(name) for name in names} - {''})
+        self._key_set = set(self.keys)
+        self._shingles = [trigrams(key) for key in self.keys]
+        self._buckets = [{} for _ in range(NUM_BANDS)]
+        for key_id, shingles in enumerate(self._shingles):
+            for band, bucket_key in enumerate(self._band_keys(minhash_signature(shingles))):
+                self._buckets[band].setdefault(bucket_key, []).append(key_id)
+
+    @staticmethod
+    def _band_keys(signature):
+        return [signature[i * ROWS_PER_BAND:(i + 1) * ROWS_PER_BAND].tobytes() for i in range(NUM_BANDS)]
+
+    def candidates(self, name, top_k=5):
+        """Lista de (ID canônico, similaridade) dos candidatos mais parecidos com `name`."""
+        key = normalize_name(name)
+        if not key:
+            return []
+        if key in self._key_set:
+            return [(key, 1.0)]
+        shingles = trigrams(key)
+        candidate_ids = set()
+        for band, bucket_key in enumerate(self._band_keys(minhash_signature(shingles))):
+            candidate_ids.update(self._buckets[band].get(bucket_key, ()))
+        scored = [(self.keys[i], jaccard(shingles, self._shingles[i])) for i in candidate_ids]
+        return sorted(scored, key=lambda item: -item[1])[:top_k]
+
+    def resolve(self, names, min_score=MIN_SCORE):
+        """
+        Resolve cada nome para o ID canônico mais parecido do índice.
+        Retorna um DataFrame com as colunas `nome`, `entity_id` (None se não houver
+        correspondência acima de `min_score`) e `score`, alinhado a `names`.
+        """
+        rows = []
+        for name in names:
+            best = self.candidates(name, top_k=1)
+            if best and best[0][1] >= min_score:
+                rows.append((name, best[0][0], best[0][1]))
+            else:
+                rows.append((name, None, best[0][1] if best else 0.0))
+        return pd.DataFrame(rows, columns=['nome', 'entity_id', 'score'])
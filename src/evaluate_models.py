@@ -0,0 +1,235 @@
+"""
+Avaliação comparativa dos modelos de missões por validação cruzada.
+
+Cada script de treino avalia o seu modelo em uma única divisão treino/teste (80/20) do
+Golden Dataset, o que deixa as métricas ruidosas e os modelos difíceis de comparar. Este
+script avalia todos os modelos nas mesmas divisões de um k-fold estratificado para
+multilabel (repetido `--repeats` vezes) e gera uma única tabela de precisão, revocação e
+F1 por missão, com a média entre os folds e o intervalo de confiança de 95% (t de Student).
+
+Modelos avaliados (mesmas features e classificadores dos scripts de treino):
+- 'keywords':   dicionário de palavras-chave (`classify_by_keywords.py`, não treinado);
+- 'tfidf_v2':   TF-IDF + Regressão Logística (`train_evaluate_model_tfidf.py`);
+- 'rf_v3':      TF-IDF + RandomForest (`train_evaluate_model_gridsearch.py`), com os
+                parâmetros fixos de V3_PARAMS em vez da busca de hiperparâmetros;
+- 'bert_v4':    embeddings semânticos + Regressão Logística (`train_evaluate_bert.py`).
+
+Estratificação: os folds são montados por estratificação iterativa (Sechidis et al., 2011),
+que distribui os positivos de cada missão, começando pelas mais raras, de forma equilibrada
+entre os folds. Com uma divisão aleatória, missões com poucos exemplos (e.g. M6) ficariam
+sem positivos em alguns folds.
+
+Desempenho: os folds são avaliados em paralelo (`--workers` processos). Em cada fold, o
+TF-IDF é ajustado uma única vez e compartilhado pelos modelos v2 e v3, com cache em disco
+(joblib.Memory) entre execuções; os embeddings do v4 são calculados uma única vez para todo
+o dataset (com o cache de `embeddings.py`) e apenas o classificador é ajustado por fold.
+
+Como usar:
+`python src/evaluate_models.py --folds 5 --repeats 2 --workers 4`
+O resumo é salvo em `reports/avaliacao_modelos_cv.csv` e as métricas de cada fold em
+`reports/avaliacao_modelos_cv_folds.csv`.
+"""
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import joblib
+from concurrent.futures import ProcessPoolExecutor
+from scipy import stats
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.metrics import precision_recall_fscore_support
+from nltk.corpus import stopwords
+
+from data_io import read_table
+from classify_by_keywords import MISSION_KEYWORDS, TEXT_COLUMNS_TO_ANALYZE, KeywordMatcher, classify_dataframe
+from train_evaluate_model_tfidf import GOLDEN_DATASET_PATH, TEXT_FEATURES, TARGET_LABELS, RANDOM_STATE, download_nltk_resources
+from train_evaluate_model_gridsearch import FEATURE_CACHE_DIR
+from multilabel import CLASSIFIER_KINDS, make_mission_classifier, iterative_stratified_folds
+
+# --- CONFIGURAÇÃO ---
+MODELS = ['keywords', 'tfidf_v2', 'rf_v3', 'bert_v4']
+N_FOLDS = 5
+N_REPEATS = 1
+CONFIDENCE = 0.95
+
+# TF-IDF compartilhado pelos modelos v2 e v3 (configuração do v2)
+TFIDF_PARAMS = {'ngram_range': (1, 2), 'max_features': 3000}
+# Parâmetros do RandomForest do v3 (os da grade de `train_evaluate_model_gridsearch.py`)
+V3_PARAMS = {'n_estimators': 200, 'max_depth': None}
+
+SUMMARY_OUTPUT_PATH = os.path.join('reports', 'avaliacao_modelos_cv.csv')
+FOLDS_OUTPUT_PATH = os.path.join('reports', 'avaliacao_modelos_cv_folds.csv')
+
+
+def fit_tfidf(train_texts, test_texts, portuguese_stopwords):
+    """Ajusta o TF-IDF no treino do fold e devolve as matrizes de treino e de teste."""
+    vectorizer = TfidfVectorizer(stop_words=portuguese_stopwords, **TFIDF_PARAMS)
+    return vectorizer.fit_transform(train_texts), vectorizer.transform(test_texts)
+
+
+# Dados compartilhados pelos processos do pool, carregados uma única vez pelo inicializador
+_worker_data = None
+
+
+def _init_worker(data):
+    global _worker_data
+    _worker_data = data
+
+
+def _evaluate_fold(task):
+    """Ajusta os modelos pedidos no treino de um fold e devolve as previsões de cada um no teste."""
+    repeat, fold, train_idx, test_idx = task
+    data = _worker_data
+    Y = data['Y']
+    predictions = {}
+
+    if 'keywords' in data['models']:
+        predictions['keywords'] = data['keyword_flags'][test_idx]
+
+    if 'tfidf_v2' in data['models'] or 'rf_v3' in data['models']:
+        memory = joblib.Memory(data['feature_cache'], verbose=0) if data['feature_cache'] else None
+        tfidf = memory.cache(fit_tfidf) if memory is not None else fit_tfidf
+        X_train, X_test = tfidf(data['texts'][train_idx], data['texts'][test_idx], data['stopwords'])
+        if 'tfidf_v2' in data['models']:
+            clf = make_mission_classifier(data['classifier'], random_state=RANDOM_STATE).fit(X_train, Y[train_idx])
+            predictions['tfidf_v2'] = clf.predict(X_test)
+        if 'rf_v3' in data['models']:
+            clf = MultiOutputClassifier(
+                RandomForestClassifier(class_weight='balanced', random_state=RANDOM_STATE, **V3_PARAMS)
+            ).fit(X_train, Y[train_idx])
+            predictions['rf_v3'] = clf.predict(X_test)
+
+    if 'bert_v4' in data['models']:
+        X = data['embeddings']
+        clf = make_mission_classifier(data['classifier'], random_state=RANDOM_STATE).fit(X[train_idx], Y[train_idx])
+        predictions['bert_v4'] = clf.predict(X[test_idx])
+
+    return repeat, fold, test_idx, predictions
+
+
+def fold_metrics(model, repeat, fold, y_true, y_pred):
+    """Linhas de métricas (por missão e médias) de um modelo em um fold."""
+    rows = []
+    precision, recall, f1, support = precision_recall_fscore_support(y_true, y_pred, average=None, zero_division=0)
+    for j, label in enumerate(TARGET_LABELS):
+        rows.append((model, repeat, fold, label, precision[j], recall[j], f1[j], support[j]))
+    for average in ['micro', 'macro', 'weighted']:
+        precision, recall, f1, _ = precision_recall_fscore_support(y_true, y_pred, average=average, zero_division=0)
+        rows.append((model, repeat, fold, f"{average} avg", precision, recall, f1, int(y_true.sum())))
+    return rows
+
+
+def summarize(df_folds, confidence=CONFIDENCE):
+    """Média de cada métrica entre os folds e a meia-largura do intervalo de confiança."""
+    summary = []
+    for (model, label), group in df_folds.groupby(['modelo', 'rotulo'], sort=False):
+        row = {'modelo': model, 'rotulo': label, 'suporte_medio': group['suporte'].mean()}
+        for metric in ['precisao', 'revocacao', 'f1']:
+            values = group[metric].to_numpy()
+            half_width = 0.0
+            if len(values) > 1:
+                half_width = stats.t.ppf((1 + confidence) / 2, len(values) - 1) * values.std(ddof=1) / np.sqrt(len(values))
+            row[metric] = values.mean()
+            row[f"{metric}_ic"] = half_width
+        summary.append(row)
+    return pd.DataFrame(summary)
+
+
+def load_dataset(filepath):
+    """Golden Dataset com os textos combinados (mesmo preparo dos scripts de treino)."""
+    df = read_table(filepath, columns=list(dict.fromkeys(TEXT_FEATURES + TEXT_COLUMNS_TO_ANALYZE + TARGET_LABELS)))
+    print(f"Golden Dataset carregado com sucesso. {len(df)} linhas encontradas.")
+    keyword_flags = classify_dataframe(df, KeywordMatcher(MISSION_KEYWORDS))
+    # As colunas do matcher estão na ordem de MISSION_KEYWORDS; reordena para TARGET_LABELS
+    keyword_flags = keyword_flags[:, [list(MISSION_KEYWORDS).index(label) for label in TARGET_LABELS]]
+    for col in TEXT_FEATURES:
+        df[col] = df[col].fillna('')
+    texts = df[TEXT_FEATURES].apply(lambda row: ' '.join(row.values.astype(str)), axis=1).to_numpy()
+    return texts, df[TARGET_LABELS].to_numpy(dtype=int), keyword_flags
+
+
+def main(models=MODELS, n_folds=N_FOLDS, n_repeats=N_REPEATS, workers=1, classifier='multioutput', feature_cache=True):
+    """
+    Avalia os modelos pedidos nos mesmos folds e salva as métricas por fold e o resumo.
+    """
+    print(f"Iniciando a avaliação por validação cruzada ({n_folds} folds x {n_repeats} repetições): {', '.join(models)}")
+    if not os.path.exists(GOLDEN_DATASET_PATH):
+        print(f"ERRO: Golden Dataset não encontrado em '{GOLDEN_DATASET_PATH}'")
+        return
+    download_nltk_resources()
+    texts, Y, keyword_flags = load_dataset(GOLDEN_DATASET_PATH)
+
+    data = {
+        'models': models, 'texts': texts, 'Y': Y, 'keyword_flags': keyword_flags,
+        'stopwords': stopwords.words('portuguese'), 'classifier': classifier,
+        'feature_cache': FEATURE_CACHE_DIR if feature_cache else None, 'embeddings': None,
+    }
+    if 'bert_v4' in models:
+        # Importado só aqui: sentence-transformers/PyTorch não são necessários para os outros modelos
+        from embeddings import embed_texts
+        # Os embeddings não dependem dos rótulos: podem ser calculados uma vez para todos os folds
+        print("Obtendo os embeddings de todo o dataset...")
+        data['embeddings'] = embed_texts(list(texts))
+
+    tasks = []
+    for repeat in range(n_repeats):
+        folds = iterative_stratified_folds(Y, n_folds, random_state=RANDOM_STATE + repeat)
+        for fold in range(n_folds):
+            tasks.append((repeat, fold, np.flatnonzero(folds != fold), np.flatnonzero(folds == fold)))
+
+    rows = []
+    if workers > 1:
+        print(f"Avaliando {len(tasks)} folds em {workers} processos...")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as executor:
+            results = list(executor.map(_evaluate_fold, tasks))
+    else:
+        _init_worker(data)
+        results = [_evaluate_fold(task) for task in tasks]
+    for repeat, fold, test_idx, predictions in results:
+        for model in models:
+            rows.extend(fold_metrics(model, repeat, fold, Y[test_idx], predictions[model]))
+
+    df_folds = pd.DataFrame(rows, columns=['modelo', 'repeticao', 'fold', 'rotulo', 'precisao', 'revocacao', 'f1', 'suporte'])
+    df_summary = summarize(df_folds)
+
+    os.makedirs(os.path.dirname(SUMMARY_OUTPUT_PATH), exist_ok=True)
+    df_folds.to_csv(FOLDS_OUTPUT_PATH, index=False)
+    df_summary.to_csv(SUMMARY_OUTPUT_PATH, index=False)
+
+    print(f"\n--- F1 por missão (média ± IC {CONFIDENCE:.0%} em {len(tasks)} folds) ---\n")
+    f1_table = df_summary.assign(
+        valor=[f"{f1:.3f} ± {ic:.3f}" for f1, ic in zip(df_summary['f1'], df_summary['f1_ic'])]
+    ).pivot(index='rotulo', columns='modelo', values='valor')
+    print(f1_table.loc[df_summary['rotulo'].unique(), models].to_string())
+    print(f"\nResumo salvo em '{SUMMARY_OUTPUT_PATH}' e métricas por fold em '{FOLDS_OUTPUT_PATH}'.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avaliação dos modelos de missões por validação cruzada estratificada.")
+    parser.add_argument(
+        '--models', nargs='+', choices=MODELS, default=MODELS,
+        help="Modelos a avaliar (padrão: todos)."
+    )
+    parser.add_argument('--folds', type=int, default=N_FOLDS, help="Número de folds (padrão: %(default)s).")
+    parser.add_argument(
+        '--repeats', type=int, default=N_REPEATS,
+        help="Repetições do k-fold com sementes diferentes (padrão: %(default)s)."
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help="Número de processos que avaliam os folds em paralelo (padrão: 1, sequencial)."
+    )
+    parser.add_argument(
+        '--classifier', choices=CLASSIFIER_KINDS, default='multioutput',
+        help="Classificador dos modelos v2 e v4 (padrão: %(default)s)."
+    )
+    parser.add_argument(
+        '--no-feature-cache', action='store_true',
+        help="Reajusta o TF-IDF de cada fold, sem o cache em disco."
+    )
+    args = parser.parse_args()
+    main(models=args.models, n_folds=args.folds, n_repeats=args.repeats, workers=args.workers,
+         classifier=args.classifier, feature_cache=not args.no_feature_cache)
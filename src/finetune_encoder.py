@@ -0,0 +1,286 @@
+"""
+Fine-tuning de um encoder multilíngue pequeno para as 6 Missões (modelo v5).
+
+O modelo v4 (`train_evaluate_bert.py`) mantém o `paraphrase-multilingual-mpnet-base-v2`
+congelado e treina apenas uma Regressão Logística sobre os embeddings. Aqui, um encoder
+menor da família MiniLM (FINETUNE_MODEL_NAME, ~3x mais rápido que o mpnet em CPU) é
+ajustado de ponta a ponta junto com uma camada linear de 6 saídas, com perda de entropia
+cruzada binária por missão (ponderada como o `class_weight='balanced'` dos outros modelos).
+
+Treino pensado para CPU:
+- acumulação de gradientes: lotes pequenos (`--batch-size`) cabem na memória e o passo do
+  otimizador é dado a cada `--accumulation-steps` lotes (lote efetivo = produto dos dois);
+- threads: `--threads` define as threads das operações (intra-op) e `--interop-threads` as
+  que executam operações independentes em paralelo (inter-op);
+- `--bf16`: autocast em bfloat16 nas CPUs que o suportam (AVX-512 BF16/AMX);
+- `--gradient-checkpointing`: recalcula as ativações do transformer no backward em vez de
+  guardá-las, trocando tempo por memória;
+- checkpoints: o estado completo (encoder, camada de saída, otimizador e agendador) é salvo
+  ao fim de cada época em CHECKPOINT_PATH; `--resume` continua um treino interrompido.
+
+Ao final, o modelo é avaliado na mesma divisão treino/teste do v4 e comparado com ele:
+F1 e latência de inferência (textos/s, sem cache de embeddings) dos dois modelos, salvos em
+`reports/finetune_tradeoff.csv`. O encoder ajustado e a camada de saída ficam em
+FINETUNED_MODEL_DIR.
+
+Como usar: `python src/finetune_encoder.py --epochs 4 --threads 8`
+O `train_evaluate_bert.py` treina apenas o v4; o fine-tuning é sempre executado por este script.
+"""
+
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import torch
+from sentence_transformers import SentenceTransformer
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import classification_report, f1_score
+
+from embeddings import EMBEDDING_MODEL_NAME, embed_texts, get_embedding_model, plan_batches
+from multilabel import make_mission_classifier
+from data_io import read_table
+
+# --- CONFIGURAÇÃO ---
+GOLDEN_DATASET_PATH = os.path.join('data', 'processed', 'golden_dataset.csv')
+TEXT_FEATURES = ['nome_organizacao', 'descricao_organizacao', 'segmento_atuacao', 'tecnologias_disruptivas']
+TARGET_LABELS = ['M1_Agro', 'M2_Saude', 'M3_Infra_Mobilidade', 'M4_Transformacao_Digital', 'M5_Bioeconomia_Energia', 'M6_Defesa_Soberania']
+TEST_SET_SIZE = 0.2
+RANDOM_STATE = 42
+
+# Encoder destilado (MiniLM, 12 camadas de dimensão 384) treinado nas mesmas paráfrases do mpnet
+FINETUNE_MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+FINETUNED_MODEL_DIR = os.path.join('reports', 'model_v5_finetuned')
+HEAD_FILENAME = 'classifier_head.pt'
+CHECKPOINT_PATH = os.path.join('data', 'cache', 'finetune', 'checkpoint.pt')
+TRADEOFF_OUTPUT_PATH = os.path.join('reports', 'finetune_tradeoff.csv')
+
+# Hiperparâmetros do treino
+EPOCHS = 4
+BATCH_SIZE = 8              # Textos por lote (forward/backward)
+ACCUMULATION_STEPS = 4      # Lotes acumulados por passo do otimizador (lote efetivo de 32)
+ENCODER_LR = 2e-5
+HEAD_LR = 1e-3
+WARMUP_FRACTION = 0.1       # Fração dos passos com taxa de aprendizado crescente
+MAX_SEQ_LENGTH = 256
+THRESHOLD = 0.5             # Probabilidade mínima para atribuir uma missão
+
+
+def load_and_prepare_data(filepath):
+    """Carrega o Golden Dataset e prepara os textos combinados e os rótulos."""
+    if not os.path.exists(filepath):
+        print(f"ERRO: Golden Dataset não encontrado em '{filepath}'")
+        return None, None
+    df = read_table(filepath, columns=TEXT_FEATURES + TARGET_LABELS)
+    print(f"Golden Dataset carregado com sucesso. {len(df)} linhas encontradas.")
+    for col in TEXT_FEATURES:
+        df[col] = df[col].fillna('')
+    texts = df[TEXT_FEATURES].apply(lambda row: ' '.join(row.values.astype(str)), axis=1).tolist()
+    return texts, df[TARGET_LABELS].to_numpy(dtype=np.float32)
+
+
+def configure_threads(threads=None, interop_threads=None):
+    """Define as threads intra-op e inter-op do PyTorch (antes de qualquer operação paralela)."""
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Só pode ser definido uma vez por processo, antes do primeiro uso do pool inter-op
+            print("AVISO: Threads inter-op já inicializadas; mantendo o valor atual.")
+    print(f"PyTorch usando {torch.get_num_threads()} threads intra-op e {torch.get_num_interop_threads()} inter-op.")
+
+
+def positive_weights(labels):
+    """Peso dos positivos de cada missão na BCE, equivalente ao `class_weight='balanced'`."""
+    n_positive = np.clip(labels.sum(axis=0), 1, len(labels) - 1)
+    return torch.tensor((len(labels) - n_positive) / n_positive, dtype=torch.float32)
+
+
+def forward(encoder, head, texts):
+    """Logits (n, 6) de uma lista de textos."""
+    features = encoder.tokenize(texts)
+    embeddings = encoder(features)['sentence_embedding']
+    return head(embeddings)
+
+
+def save_checkpoint(path, encoder, head, optimizer, scheduler, epoch):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    torch.save({
+        'model_name': FINETUNE_MODEL_NAME,
+        'epoch': epoch,
+        'encoder': encoder.state_dict(),
+        'head': head.state_dict(),
+        'optimizer': optimizer.state_dict(),
+        'scheduler': scheduler.state_dict(),
+    }, path)
+
+
+def train(encoder, head, texts, labels, epochs=EPOCHS, batch_size=BATCH_SIZE, accumulation_steps=ACCUMULATION_STEPS,
+          bf16=False, resume=False):
+    """Ajusta o encoder e a camada de saída com acumulação de gradientes e checkpoint por época."""
+    loss_fn = torch.nn.BCEWithLogitsLoss(pos_weight=positive_weights(labels))
+    optimizer = torch.optim.AdamW([
+        {'params': encoder.parameters(), 'lr': ENCODER_LR},
+        {'params': head.parameters(), 'lr': HEAD_LR},
+    ])
+    batches_per_epoch = int(np.ceil(len(texts) / batch_size))
+    total_steps = max(1, epochs * int(np.ceil(batches_per_epoch / accumulation_steps)))
+    warmup_steps = max(1, int(WARMUP_FRACTION * total_steps))
+    # Aquecimento linear seguido de decaimento linear até zero
+    scheduler = torch.optim.lr_scheduler.LambdaLR(
+        optimizer, lambda step: min((step + 1) / warmup_steps, max(0.0, (total_steps - step) / (total_steps - warmup_steps + 1)))
+    )
+
+    start_epoch = 0
+    if resume and os.path.exists(CHECKPOINT_PATH):
+        checkpoint = torch.load(CHECKPOINT_PATH, map_location='cpu')
+        if checkpoint['model_name'] == FINETUNE_MODEL_NAME:
+            encoder.load_state_dict(checkpoint['encoder'])
+            head.load_state_dict(checkpoint['head'])
+            optimizer.load_state_dict(checkpoint['optimizer'])
+            scheduler.load_state_dict(checkpoint['scheduler'])
+            start_epoch = checkpoint['epoch'] + 1
+            print(f"Retomando o treino a partir do checkpoint da época {start_epoch}.")
+
+    labels = torch.from_numpy(labels)
+    for epoch in range(start_epoch, epochs):
+        encoder.train()
+        head.train()
+        # Ordem dos textos determinística por época, para que um treino retomado seja igual ao contínuo
+        order = np.random.default_rng(RANDOM_STATE + epoch).permutation(len(texts))
+        epoch_loss, started = 0.0, time.perf_counter()
+        optimizer.zero_grad()
+        for i in range(batches_per_epoch):
+            batch = order[i * batch_size:(i + 1) * batch_size]
+            with torch.autocast('cpu', dtype=torch.bfloat16, enabled=bf16):
+                logits = forward(encoder, head, [texts[j] for j in batch])
+            loss = loss_fn(logits.float(), labels[torch.from_numpy(batch)])
+            # A perda é dividida para que a soma acumulada equivalha à média do lote efetivo
+            (loss / accumulation_steps).backward()
+            epoch_loss += loss.item()
+            if (i + 1) % accumulation_steps == 0 or i + 1 == batches_per_epoch:
+                torch.nn.utils.clip_grad_norm_(list(encoder.parameters()) + list(head.parameters()), 1.0)
+                optimizer.step()
+                scheduler.step()
+                optimizer.zero_grad()
+        print(f"Época {epoch + 1}/{epochs}: perda média {epoch_loss / batches_per_epoch:.4f} "
+              f"({time.perf_counter() - started:.0f}s).")
+        save_checkpoint(CHECKPOINT_PATH, encoder, head, optimizer, scheduler, epoch)
+
+
+@torch.inference_mode()
+def predict_proba(encoder, head, texts, bf16=False):
+    """Probabilidades (n, 6), com os textos agrupados em lotes de comprimento semelhante."""
+    encoder.eval()
+    head.eval()
+    lengths = [len(ids) for ids in encoder.tokenizer(texts, truncation=True, max_length=encoder.max_seq_length)['input_ids']]
+    probabilities = np.empty((len(texts), len(TARGET_LABELS)), dtype=np.float32)
+    for batch in plan_batches(lengths):
+        with torch.autocast('cpu', dtype=torch.bfloat16, enabled=bf16):
+            logits = forward(encoder, head, [texts[j] for j in batch])
+        probabilities[batch] = torch.sigmoid(logits.float()).numpy()
+    return probabilities
+
+
+def timed(function, texts):
+    """Executa `function(texts)` após um aquecimento e retorna (resultado, textos por segundo)."""
+    function(texts[:8])
+    start = time.perf_counter()
+    result = function(texts)
+    return result, len(texts) / (time.perf_counter() - start)
+
+
+def tradeoff_row(name, y_true, y_pred, throughput):
+    return {
+        'modelo': name,
+        'f1_micro': f1_score(y_true, y_pred, average='micro', zero_division=0),
+        'f1_macro': f1_score(y_true, y_pred, average='macro', zero_division=0),
+        'f1_ponderado': f1_score(y_true, y_pred, average='weighted', zero_division=0),
+        'textos_por_segundo': throughput,
+        'ms_por_texto': 1000.0 / throughput,
+    }
+
+
+def main(epochs=EPOCHS, batch_size=BATCH_SIZE, accumulation_steps=ACCUMULATION_STEPS, threads=None,
+         interop_threads=None, bf16=False, gradient_checkpointing=False, resume=False):
+    """
+    Ajusta o encoder pequeno, avalia-o no conjunto de teste do v4 e compara F1 e latência
+    com o mpnet congelado + Regressão Logística.
+    """
+    print(f"Iniciando o fine-tuning do modelo v5 ('{FINETUNE_MODEL_NAME}')...")
+    configure_threads(threads, interop_threads)
+    torch.manual_seed(RANDOM_STATE)
+
+    texts, labels = load_and_prepare_data(GOLDEN_DATASET_PATH)
+    if texts is None:
+        return
+    # Mesma divisão do `train_evaluate_bert.py`, para que os modelos sejam comparáveis
+    texts_train, texts_test, y_train, y_test = train_test_split(
+        texts, labels, test_size=TEST_SET_SIZE, random_state=RANDOM_STATE
+    )
+    print(f"Dados divididos em {len(texts_train)} para treino e {len(texts_test)} para teste.")
+
+    # 1. Fine-tuning
+    encoder = SentenceTransformer(FINETUNE_MODEL_NAME, device='cpu')
+    encoder.max_seq_length = MAX_SEQ_LENGTH
+    if gradient_checkpointing:
+        encoder[0].auto_model.gradient_checkpointing_enable()
+    head = torch.nn.Linear(encoder.get_sentence_embedding_dimension(), len(TARGET_LABELS))
+    print(f"Treinando por {epochs} épocas (lote de {batch_size} x {accumulation_steps} passos acumulados)...")
+    train(encoder, head, texts_train, y_train, epochs, batch_size, accumulation_steps, bf16, resume)
+
+    os.makedirs(FINETUNED_MODEL_DIR, exist_ok=True)
+    encoder.save(FINETUNED_MODEL_DIR)
+    torch.save({'head': head.state_dict(), 'labels': TARGET_LABELS, 'threshold': THRESHOLD},
+               os.path.join(FINETUNED_MODEL_DIR, HEAD_FILENAME))
+    print(f"Modelo ajustado salvo em '{FINETUNED_MODEL_DIR}'.")
+
+    # 2. Avaliação do modelo ajustado
+    probabilities, finetuned_throughput = timed(lambda t: predict_proba(encoder, head, t, bf16), texts_test)
+    y_pred = (probabilities >= THRESHOLD).astype(int)
+    print("\n--- Relatório de Classificação do Modelo v5 (Encoder Ajustado) ---\n")
+    print(classification_report(y_test, y_pred, target_names=TARGET_LABELS, zero_division=0))
+
+    # 3. Referência: mpnet congelado + Regressão Logística (modelo v4), no mesmo conjunto de teste
+    print(f"Treinando a referência v4 ('{EMBEDDING_MODEL_NAME}' congelado + Regressão Logística)...")
+    baseline = make_mission_classifier('multioutput', random_state=RANDOM_STATE).fit(embed_texts(texts_train), y_train)
+    # A latência é medida sem o cache de embeddings, como na inferência de textos novos
+    mpnet = get_embedding_model(EMBEDDING_MODEL_NAME)
+    y_baseline, baseline_throughput = timed(
+        lambda t: baseline.predict(mpnet.encode(t, show_progress_bar=False)), texts_test
+    )
+
+    tradeoff = pd.DataFrame([
+        tradeoff_row(f"v4: {EMBEDDING_MODEL_NAME} congelado + LR", y_test, y_baseline, baseline_throughput),
+        tradeoff_row(f"v5: {FINETUNE_MODEL_NAME} ajustado", y_test, y_pred, finetuned_throughput),
+    ])
+    tradeoff.to_csv(TRADEOFF_OUTPUT_PATH, index=False)
+    print("\n--- Precisão x latência (conjunto de teste, CPU) ---\n")
+    print(tradeoff.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    print(f"\nO modelo v5 é {finetuned_throughput / baseline_throughput:.2f}x mais rápido na inferência; "
+          f"F1 ponderado {tradeoff['f1_ponderado'].iloc[1] - tradeoff['f1_ponderado'].iloc[0]:+.3f} em relação ao v4.")
+    print(f"Comparação salva em '{TRADEOFF_OUTPUT_PATH}'.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fine-tuning de um encoder MiniLM para as 6 missões (modelo v5).")
+    parser.add_argument('--epochs', type=int, default=EPOCHS, help="Número de épocas (padrão: %(default)s).")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Textos por lote (padrão: %(default)s).")
+    parser.add_argument(
+        '--accumulation-steps', type=int, default=ACCUMULATION_STEPS,
+        help="Lotes acumulados por passo do otimizador (padrão: %(default)s)."
+    )
+    parser.add_argument('--threads', type=int, default=None, help="Threads intra-op do PyTorch (padrão: automático).")
+    parser.add_argument('--interop-threads', type=int, default=None, help="Threads inter-op do PyTorch (padrão: automático).")
+    parser.add_argument('--bf16', action='store_true', help="Treino e inferência com autocast em bfloat16.")
+    parser.add_argument(
+        '--gradient-checkpointing', action='store_true',
+        help="Recalcula as ativações no backward para reduzir o uso de memória."
+    )
+    parser.add_argument('--resume', action='store_true', help=f"Retoma o treino a partir de '{CHECKPOINT_PATH}'.")
+    args = parser.parse_args()
+    main(epochs=args.epochs, batch_size=args.batch_size, accumulation_steps=args.accumulation_steps,
+         threads=args.threads, interop_threads=args.interop_threads, bf16=args.bf16,
+         gradient_checkpointing=args.gradient_checkpointing, resume=args.resume)
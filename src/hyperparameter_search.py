@@ -0,0 +1,263 @@
+"""
+Estratégias de busca de hiperparâmetros para os classificadores de missões.
+
+Todas recebem um estimador (e.g. o Pipeline TF-IDF + RandomForest ou o MultiOutputClassifier
+sobre os embeddings) e um espaço de busca no formato `{parametro: [valores]}`, e devolvem um
+objeto já ajustado com `best_params_`, `best_score_` e `best_estimator_`, como o GridSearchCV.
+
+- 'grid':           GridSearchCV, avalia todas as combinações até o fim;
+- 'halving-grid':   successive halving: todas as combinações começam avaliadas em poucas
+                    amostras e só o melhor terço de cada rodada segue para a próxima, com o
+                    triplo de amostras, até usar o conjunto de treino inteiro. Se a grade
+                    tiver mais de `budget` combinações, `budget` delas são sorteadas;
+- 'halving-random': o mesmo, sempre a partir de `budget` combinações sorteadas;
+- 'tpe':            otimizador sequencial no estilo TPE (Tree-structured Parzen Estimator):
+                    após algumas combinações sorteadas, cada nova combinação é escolhida onde a
+                    razão entre a frequência dos valores nas melhores avaliações e nas demais é
+                    máxima. Avalia no máximo `budget` combinações e para antes se o melhor
+                    resultado não melhorar em `patience` avaliações ou se o tempo acabar.
+
+O halving é implementado aqui (`HalvingSearchCV`) porque o HalvingGridSearchCV do
+scikit-learn não aceita rótulos multilabel (as 6 missões). O orçamento de tempo
+(`time_budget`) vale para o halving e para o 'tpe': ao esgotá-lo, a busca termina com a
+melhor combinação já avaliada.
+
+Nas rodadas do halving, a amostra é sorteada com pelo menos `cv` positivos de cada missão
+(ou todos, se a missão tiver menos) e os folds são montados por estratificação iterativa:
+com uma amostra aleatória de 30 linhas, missões raras (e.g. M6) ficariam sem positivos e o
+score da combinação seria NaN. Scores NaN são ordenados como -inf, e uma rodada em que
+todas as combinações falham interrompe a busca com erro.
+"""
+
+import time
+import math
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import GridSearchCV, ParameterGrid, ParameterSampler, PredefinedSplit, cross_val_score
+from sklearn.utils import _safe_indexing
+
+from multilabel import iterative_stratified_folds
+
+SEARCH_STRATEGIES = ['grid', 'halving-grid', 'halving-random', 'tpe']
+
+DEFAULT_BUDGET = 30     # Máximo de combinações avaliadas (halving e 'tpe')
+HALVING_FACTOR = 3      # A cada rodada do halving, 1/3 das combinações seguem adiante
+HALVING_MIN_SAMPLES_PER_FOLD = 10  # Amostras por fold na primeira rodada do halving
+TPE_STARTUP = 8         # Combinações sorteadas antes de o TPE passar a guiar a busca
+TPE_GAMMA = 0.25        # Fração das avaliações consideradas "boas" pelo TPE
+TPE_CANDIDATES = 24     # Combinações sorteadas de l(x) a cada passo, das quais a melhor é avaliada
+TPE_PATIENCE = 10       # Avaliações sem melhora antes da parada antecipada
+
+
+def _rank_score(score):
+    """Score usado para ordenar as combinações: NaN (falha na validação cruzada) conta como -inf."""
+    return -np.inf if np.isnan(score) else score
+
+
+def stratified_subsample(Y, size, min_positives, rng):
+    """
+    Sorteia `size` linhas de `Y` (n x missões, 0/1) com pelo menos `min_positives` positivos de
+    cada missão (ou todos os que existirem), começando pelas mais raras; as demais linhas são
+    sorteadas ao acaso. Retorna os índices das linhas em ordem crescente.
+    """
+    Y = np.asarray(Y, dtype=bool)
+    if Y.ndim == 1:
+        Y = Y[:, np.newaxis]
+    chosen = np.zeros(len(Y), dtype=bool)
+    for label in np.argsort(Y.sum(axis=0), kind='stable'):
+        missing = min_positives - Y[chosen, label].sum()
+        pool = np.flatnonzero(Y[:, label] & ~chosen)
+        if missing > 0 and len(pool):
+            chosen[rng.choice(pool, size=min(missing, len(pool)), replace=False)] = True
+    n_fill = size - chosen.sum()
+    if n_fill > 0:
+        chosen[rng.choice(np.flatnonzero(~chosen), size=n_fill, replace=False)] = True
+    return np.flatnonzero(chosen)
+
+
+class HalvingSearchCV:
+    """Successive halving sobre uma lista de combinações de parâmetros, com rótulos multilabel."""
+
+    def __init__(self, estimator, candidates, factor=HALVING_FACTOR, time_budget=None,
+                 cv=3, scoring=None, n_jobs=None, random_state=None, verbose=0):
+        self.estimator = estimator
+        self.candidates = list(candidates)
+        self.factor = factor
+        self.time_budget = time_budget
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.verbose = verbose
+
+    def fit(self, X, y):
+        rng = np.random.default_rng(self.random_state)
+        n_samples = len(y)
+        # A primeira rodada usa HALVING_MIN_SAMPLES_PER_FOLD amostras por fold, e cada rodada
+        # seguinte `factor` vezes mais, até que reste uma combinação ou se chegue ao total
+        min_resources = min(n_samples, HALVING_MIN_SAMPLES_PER_FOLD * self.cv)
+        n_rounds = max(1, min(
+            math.ceil(math.log(len(self.candidates), self.factor)),
+            int(math.log(n_samples / min_resources, self.factor)) + 1,
+        ))
+        started = time.monotonic()
+        remaining = list(range(len(self.candidates)))
+        self.cv_results_ = {'params': [], 'mean_test_score': [], 'n_resources': []}
+
+        for round_ in range(n_rounds):
+            # A última rodada usa todas as amostras de treino
+            resources = n_samples if round_ == n_rounds - 1 else min_resources * self.factor ** round_
+            if resources < n_samples:
+                rows = stratified_subsample(y, resources, self.cv, rng)
+            else:
+                rows = np.arange(n_samples)
+            X_round, y_round = _safe_indexing(X, rows), _safe_indexing(y, rows)
+            # Folds estratificados por missão: todos os folds de treino e de teste têm positivos
+            cv = PredefinedSplit(iterative_stratified_folds(y_round, self.cv, random_state=int(rng.integers(2**31))))
+            scores = []
+            for i in remaining:
+                estimator = clone(self.estimator).set_params(**self.candidates[i])
+                score = cross_val_score(estimator, X_round, y_round, cv=cv, scoring=self.scoring, n_jobs=self.n_jobs).mean()
+                scores.append(score)
+                self.cv_results_['params'].append(self.candidates[i])
+                self.cv_results_['mean_test_score'].append(score)
+                self.cv_results_['n_resources'].append(len(rows))
+            ranking_scores = np.array([_rank_score(score) for score in scores])
+            if np.isneginf(ranking_scores).all():
+                raise ValueError(
+                    f"[Halving] Rodada {round_ + 1}: a validação cruzada falhou (score NaN) para todas as "
+                    f"{len(remaining)} combinações com {len(rows)} amostras."
+                )
+            if self.verbose and np.isneginf(ranking_scores).any():
+                print(f"[Halving] AVISO: {int(np.isneginf(ranking_scores).sum())} combinações com score NaN "
+                      f"na rodada {round_ + 1} foram descartadas.")
+            ranked = [remaining[j] for j in np.argsort(-ranking_scores, kind='stable')]
+            self.best_score_ = float(ranking_scores.max())
+            if self.verbose:
+                print(f"[Halving] Rodada {round_ + 1}/{n_rounds}: {len(remaining)} combinações com {len(rows)} amostras "
+                      f"(melhor={self.best_score_:.4f}).")
+
+            remaining = ranked[:max(1, math.ceil(len(remaining) / self.factor))]
+            if self.time_budget is not None and time.monotonic() - started > self.time_budget:
+                if self.verbose:
+                    print(f"[Halving] Orçamento de tempo esgotado após a rodada {round_ + 1}.")
+                break
+
+        self.cv_results_ = {key: np.array(values) if key != 'params' else values for key, values in self.cv_results_.items()}
+        self.best_params_ = self.candidates[ranked[0]]
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+        return self
+
+
+class TPESearchCV:
+    """Busca sequencial no estilo TPE sobre um espaço de valores discretos (ver docstring do módulo)."""
+
+    def __init__(self, estimator, param_space, budget=DEFAULT_BUDGET, time_budget=None, patience=TPE_PATIENCE,
+                 n_startup=TPE_STARTUP, gamma=TPE_GAMMA, n_candidates=TPE_CANDIDATES,
+                 cv=3, scoring=None, n_jobs=None, random_state=None, verbose=0):
+        self.estimator = estimator
+        self.param_space = {name: list(values) for name, values in param_space.items()}
+        self.budget = budget
+        self.time_budget = time_budget
+        self.patience = patience
+        self.n_startup = n_startup
+        self.gamma = gamma
+        self.n_candidates = n_candidates
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.verbose = verbose
+
+    def _sample_random(self, rng):
+        return {name: int(rng.integers(len(values))) for name, values in self.param_space.items()}
+
+    def _suggest(self, history, rng):
+        """Próxima combinação (em índices dos valores) que maximiza l(x) / g(x)."""
+        ranked = sorted(history, key=lambda item: -_rank_score(item[1]))
+        n_good = max(1, math.ceil(self.gamma * len(ranked)))
+        good, bad = [c for c, _ in ranked[:n_good]], [c for c, _ in ranked[n_good:]]
+
+        # Distribuição de cada parâmetro entre as boas (l) e as demais (g), com suavização de Laplace
+        densities = {}
+        for name, values in self.param_space.items():
+            l = np.bincount([c[name] for c in good], minlength=len(values)) + 1.0
+            g = np.bincount([c[name] for c in bad], minlength=len(values)) + 1.0
+            densities[name] = (l / l.sum(), g / g.sum())
+
+        best, best_ratio = None, -np.inf
+        for _ in range(self.n_candidates):
+            candidate = {name: int(rng.choice(len(l), p=l)) for name, (l, _) in densities.items()}
+            ratio = sum(np.log(densities[name][0][i]) - np.log(densities[name][1][i]) for name, i in candidate.items())
+            if ratio > best_ratio:
+                best, best_ratio = candidate, ratio
+        return best
+
+    def _params(self, candidate):
+        return {name: self.param_space[name][i] for name, i in candidate.items()}
+
+    def fit(self, X, y):
+        rng = np.random.default_rng(self.random_state)
+        n_combinations = math.prod(len(values) for values in self.param_space.values())
+        started = time.monotonic()
+        history, seen = [], set()
+        best_score, since_improvement = -np.inf, 0
+
+        while len(history) < min(self.budget, n_combinations):
+            if self.time_budget is not None and time.monotonic() - started > self.time_budget:
+                if self.verbose:
+                    print(f"[TPE] Orçamento de tempo esgotado após {len(history)} avaliações.")
+                break
+            if since_improvement >= self.patience:
+                if self.verbose:
+                    print(f"[TPE] Parada antecipada: {self.patience} avaliações sem melhora.")
+                break
+
+            candidate = self._sample_random(rng) if len(history) < self.n_startup else self._suggest(history, rng)
+            # Combinações repetidas não são reavaliadas: sorteia outra ainda não vista
+            while tuple(sorted(candidate.items())) in seen:
+                candidate = self._sample_random(rng)
+            seen.add(tuple(sorted(candidate.items())))
+
+            params = self._params(candidate)
+            estimator = clone(self.estimator).set_params(**params)
+            score = cross_val_score(estimator, X, y, cv=self.cv, scoring=self.scoring, n_jobs=self.n_jobs).mean()
+            history.append((candidate, score))
+            if score > best_score:
+                best_score, since_improvement = score, 0
+            else:
+                since_improvement += 1
+            if self.verbose:
+                print(f"[TPE] {len(history)}/{self.budget} score={score:.4f} (melhor={best_score:.4f}) {params}")
+
+        best_candidate, self.best_score_ = max(history, key=lambda item: _rank_score(item[1]))
+        self.best_params_ = self._params(best_candidate)
+        self.cv_results_ = {
+            'params': [self._params(c) for c, _ in history],
+            'mean_test_score': np.array([score for _, score in history]),
+        }
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+        return self
+
+
+def make_search(strategy, estimator, param_space, budget=DEFAULT_BUDGET, time_budget=None,
+                cv=3, scoring='f1_weighted', n_jobs=-1, random_state=None, verbose=1):
+    """Cria o objeto de busca da estratégia pedida (ainda não ajustado)."""
+    if strategy == 'grid':
+        return GridSearchCV(estimator, param_space, cv=cv, scoring=scoring, n_jobs=n_jobs, verbose=verbose)
+    if strategy in ('halving-grid', 'halving-random'):
+        n_combinations = len(ParameterGrid(param_space))
+        if strategy == 'halving-grid' and n_combinations <= budget:
+            candidates = list(ParameterGrid(param_space))
+        else:
+            # O custo da última rodada (no treino inteiro) cresce com o número de candidatos:
+            # nunca mais que `budget` combinações, mesmo com uma grade grande
+            if strategy == 'halving-grid' and verbose:
+                print(f"[Halving] Grade com {n_combinations} combinações; sorteando {budget} (--budget).")
+            candidates = list(ParameterSampler(param_space, n_iter=min(budget, n_combinations), random_state=random_state))
+        return HalvingSearchCV(estimator, candidates, time_budget=time_budget, cv=cv, scoring=scoring,
+                               n_jobs=n_jobs, random_state=random_state, verbose=verbose)
+    if strategy == 'tpe':
+        return TPESearchCV(estimator, param_space, budget=budget, time_budget=time_budget, cv=cv, scoring=scoring,
+                           n_jobs=n_jobs, random_state=random_state, verbose=verbose)
+    raise ValueError(f"Estratégia de busca desconhecida: '{strategy}'. Opções: {SEARCH_STRATEGIES}")
@@ -0,0 +1,118 @@
+"""
+Reclassificação incremental: apenas organizações novas ou alteradas são classificadas.
+
+Cada execução salva um manifesto (`.npz`) com a impressão digital (hash) das colunas de
+texto usadas na classificação de cada linha e as flags de missão obtidas para ela. Na
+execução seguinte, as linhas cujo hash já está no manifesto reaproveitam as flags
+anteriores; as demais (inseridas ou alteradas) são classificadas, e as organizações que
+saíram do `df_executores.csv` simplesmente não entram no novo manifesto.
+
+O manifesto também guarda uma "versão" do classificador (hash das palavras-chave ou do
+arquivo do modelo). Se ela mudar, todas as linhas são reclassificadas.
+"""
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+def fingerprint_rows(df, columns):
+    """
+    Hash de 64 bits (vetorizado) das colunas informadas de cada linha. Valores ausentes contam
+    como texto vazio, como na classificação: NaN, None e '' geram o mesmo hash, em qualquer bloco.
+    """
+    return pd.util.hash_pandas_object(df[columns].fillna('').astype(str), index=False).to_numpy(dtype=np.uint64)
+
+
+def file_version(path, extra=''):
+    """Versão de um arquivo de modelo: hash SHA-1 do seu conteúdo (mais um texto opcional)."""
+    digest = hashlib.sha1(extra.encode('utf-8'))
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IncrementalScorer:
+    """
+    Aplica uma função de classificação apenas às linhas ausentes do manifesto anterior.
+    Pode ser usado com o DataFrame completo ou bloco a bloco (modo streaming); o novo
+    manifesto é gravado ao chamar `save()`.
+    """
+
+    def __init__(self, manifest_path, version, columns):
+        self.manifest_path = manifest_path
+        self.version = version
+        self.columns = columns
+        self._prev_fingerprints = np.empty(0, dtype=np.uint64)
+        self._prev_flags = None
+        self._fingerprints = []
+        self._flags = []
+        self.n_reused = 0
+        self.n_scored = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.manifest_path):
+            print("Modo incremental: nenhum manifesto anterior encontrado, todas as linhas serão classificadas.")
+            return
+        manifest = np.load(self.manifest_path)
+        if str(manifest['version']) != self.version:
+            print("Modo incremental: o classificador mudou desde a última execução, todas as linhas serão classificadas.")
+            return
+        # Ordena os hashes para buscá-los com `np.searchsorted`
+        order = np.argsort(manifest['fingerprints'])
+        self._prev_fingerprints = manifest['fingerprints'][order]
+        self._prev_flags = manifest['flags'][order]
+
+    def score(self, df, score_fn):
+        """
+        Retorna a matriz de flags de `df`, chamando `score_fn` apenas com as linhas
+        inseridas ou alteradas desde a execução anterior.
+        """
+        fingerprints = fingerprint_rows(df, self.columns)
+
+        positions = np.searchsorted(self._prev_fingerprints, fingerprints)
+        positions = np.minimum(positions, max(len(self._prev_fingerprints) - 1, 0))
+        found = np.zeros(len(df), dtype=bool)
+        if len(self._prev_fingerprints):
+            found = self._prev_fingerprints[positions] == fingerprints
+
+        to_score = ~found
+        new_flags = score_fn(df[to_score]) if to_score.any() else None
+
+        if self._prev_flags is not None:
+            n_labels = self._prev_flags.shape[1]
+            dtype = self._prev_flags.dtype
+        else:
+            n_labels = new_flags.shape[1] if new_flags is not None else 0
+            dtype = new_flags.dtype if new_flags is not None else np.uint8
+        flags = np.zeros((len(df), n_labels), dtype=dtype)
+        if found.any():
+            flags[found] = self._prev_flags[positions[found]]
+        if new_flags is not None:
+            flags[to_score] = new_flags
+
+        self._fingerprints.append(fingerprints)
+        self._flags.append(flags)
+        self.n_reused += int(found.sum())
+        self.n_scored += int(to_score.sum())
+        return flags
+
+    def save(self):
+        """Grava o manifesto da execução atual e imprime o resumo do delta."""
+        fingerprints = np.concatenate(self._fingerprints) if self._fingerprints else np.empty(0, dtype=np.uint64)
+        n_deleted = int((~np.isin(self._prev_fingerprints, fingerprints)).sum())
+        print(
+            f"Modo incremental: {self.n_scored} linhas novas/alteradas classificadas, "
+            f"{self.n_reused} reaproveitadas e {n_deleted} entradas antigas descartadas "
+            f"(organizações removidas ou alteradas desde a última execução)."
+        )
+        flags = np.concatenate(self._flags) if self._flags else np.empty((0, 0), dtype=np.uint8)
+        os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+        # `np.savez` acrescenta '.npz' ao nome se ele não terminar assim, então gravamos via arquivo aberto
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, version=np.array(self.version), fingerprints=fingerprints, flags=flags)
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,173 @@
+"""
+Classificador multilabel nativo para as 6 Missões.
+
+O `MultiOutputClassifier` ajusta e aplica seis regressões logísticas independentes, cada
+uma percorrendo a matriz de features inteira. `MultiLabelLogisticRegression` guarda os
+seis modelos como uma única matriz de pesos (n_features x 6): o treino otimiza as seis
+perdas juntas (cada iteração faz um único produto X @ W e X.T @ erro para todas as
+missões) e a predição calcula os seis scores com uma única multiplicação.
+
+Otimizador (`solver`): com features esparsas (TF-IDF, milhares de colunas), o L-BFGS
+precisa de ~35 iterações e o custo da sua própria atualização sobre os 18 mil parâmetros
+domina o treino (3x mais lento que as seis LogisticRegression do liblinear). Nesse caso,
+'auto' usa Newton-CG com o produto Hessiana-vetor exato (o mesmo custo de um gradiente),
+que converge em ~10 iterações e fica mais rápido que o MultiOutputClassifier. Com
+features densas (embeddings, 768 colunas), o L-BFGS continua mais rápido e é o usado.
+
+A regularização (L2, `C`) e o `class_weight='balanced'` (por missão) seguem a
+`LogisticRegression` do scikit-learn. `predict_proba` devolve o mesmo formato do
+MultiOutputClassifier (uma matriz (n, 2) por missão), para que o modelo possa ser usado
+no lugar dele sem mudanças em quem o consome (e.g. `classification_service.py`).
+
+`iterative_stratified_folds` (estratificação iterativa, Sechidis et al., 2011) monta folds
+com positivos de todas as missões; é usada pela avaliação por validação cruzada
+(`evaluate_models.py`) e pelas rodadas do halving (`hyperparameter_search.py`).
+"""
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import minimize
+from scipy.special import expit
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.linear_model import LogisticRegression
+from sklearn.multioutput import MultiOutputClassifier
+
+# Tipos de classificador disponíveis nos scripts de treino
+CLASSIFIER_KINDS = ['multioutput', 'multilabel']
+# Otimizadores de `MultiLabelLogisticRegression` ('auto' escolhe pelo tipo da matriz de features)
+MULTILABEL_SOLVERS = ['newton-cg', 'lbfgs']
+
+
+class MultiLabelLogisticRegression(ClassifierMixin, BaseEstimator):
+    """Regressão logística one-vs-rest com os pesos de todas as missões em uma só matriz."""
+
+    def __init__(self, C=1.0, class_weight=None, solver='auto', max_iter=500, tol=1e-4):
+        self.C = C
+        self.class_weight = class_weight
+        self.solver = solver
+        self.max_iter = max_iter
+        self.tol = tol
+
+    def _sample_weights(self, Y):
+        """Peso de cada (amostra, missão): com 'balanced', positivos e negativos pesam o mesmo no total."""
+        if self.class_weight != 'balanced':
+            return np.ones_like(Y, dtype=np.float64)
+        n_samples = len(Y)
+        n_positive = np.clip(Y.sum(axis=0), 1, n_samples - 1)
+        positive_weight = n_samples / (2.0 * n_positive)
+        negative_weight = n_samples / (2.0 * (n_samples - n_positive))
+        return np.where(Y == 1, positive_weight, negative_weight)
+
+    def fit(self, X, y):
+        Y = np.asarray(y, dtype=np.float64)
+        n_features, n_labels = X.shape[1], Y.shape[1]
+        sample_weights = self._sample_weights(Y)
+        solver = self.solver
+        if solver == 'auto':
+            solver = 'newton-cg' if sparse.issparse(X) else 'lbfgs'
+        if solver not in MULTILABEL_SOLVERS:
+            raise ValueError(f"Solver desconhecido: '{self.solver}'. Opções: {['auto'] + MULTILABEL_SOLVERS}")
+        # A transposta em CSR é calculada uma única vez: X.T @ erro roda a cada iteração
+        X_T = X.T.tocsr() if sparse.issparse(X) else X.T
+        # Curvatura da perda no último ponto avaliado, usada pelo produto Hessiana-vetor
+        curvature = {}
+
+        def loss_and_gradient(params):
+            W = params[:n_features * n_labels].reshape(n_features, n_labels)
+            b = params[n_features * n_labels:]
+            Z = np.asarray(X @ W) + b
+            # Entropia cruzada binária de todas as missões, calculada de forma estável
+            loss = self.C * np.sum(sample_weights * (np.logaddexp(0, Z) - Y * Z)) + 0.5 * np.sum(W * W)
+            P = expit(Z)
+            error = self.C * sample_weights * (P - Y)
+            curvature['D'] = self.C * sample_weights * P * (1 - P)
+            grad_W = np.asarray(X_T @ error) + W
+            return loss, np.concatenate([grad_W.ravel(), error.sum(axis=0)])
+
+        def hessian_product(params, vector):
+            # As missões não interagem: a Hessiana é bloco-diagonal e o produto custa o mesmo que o gradiente
+            V = vector[:n_features * n_labels].reshape(n_features, n_labels)
+            R = curvature['D'] * (np.asarray(X @ V) + vector[n_features * n_labels:])
+            return np.concatenate([(np.asarray(X_T @ R) + V).ravel(), R.sum(axis=0)])
+
+        x0 = np.zeros(n_features * n_labels + n_labels)
+        if solver == 'newton-cg':
+            result = minimize(
+                loss_and_gradient, x0, jac=True, hessp=hessian_product, method='Newton-CG',
+                options={'maxiter': self.max_iter, 'xtol': self.tol},
+            )
+        else:
+            result = minimize(
+                loss_and_gradient, x0, jac=True, method='L-BFGS-B',
+                options={'maxiter': self.max_iter, 'gtol': self.tol},
+            )
+        self.coef_ = result.x[:n_features * n_labels].reshape(n_features, n_labels)
+        self.intercept_ = result.x[n_features * n_labels:]
+        self.n_iter_ = result.nit
+        self.classes_ = [np.array([0, 1]) for _ in range(n_labels)]
+        return self
+
+    def decision_function(self, X):
+        """Scores (n, 6) de todas as missões, com uma única multiplicação de matrizes."""
+        return np.asarray(X @ self.coef_) + self.intercept_
+
+    def predict(self, X):
+        return (self.decision_function(X) > 0).astype(int)
+
+    def predict_proba(self, X):
+        probabilities = expit(self.decision_function(X))
+        return [np.column_stack([1 - p, p]) for p in probabilities.T]
+
+
+def make_mission_classifier(kind='multioutput', random_state=None):
+    """
+    Classificador das 6 missões: 'multioutput' (seis LogisticRegression independentes, o padrão
+    histórico dos modelos v2/v4) ou 'multilabel' (`MultiLabelLogisticRegression`).
+    """
+    if kind == 'multioutput':
+        return MultiOutputClassifier(
+            LogisticRegression(solver='liblinear', class_weight='balanced', random_state=random_state)
+        )
+    if kind == 'multilabel':
+        return MultiLabelLogisticRegression(class_weight='balanced')
+    raise ValueError(f"Tipo de classificador desconhecido: '{kind}'. Opções: {CLASSIFIER_KINDS}")
+
+
+def iterative_stratified_folds(Y, n_splits, random_state=None):
+    """
+    Atribui cada linha de `Y` (n x missões, 0/1) a um de `n_splits` folds por estratificação
+    iterativa e retorna um array com o fold de cada linha.
+    """
+    rng = np.random.default_rng(random_state)
+    Y = np.asarray(Y, dtype=bool)
+    n_samples = len(Y)
+    folds = np.full(n_samples, -1)
+    # Quantos exemplos (no total e de cada missão) cada fold ainda deveria receber
+    desired_total = np.full(n_splits, n_samples / n_splits)
+    desired_label = np.tile(Y.sum(axis=0) / n_splits, (n_splits, 1))
+
+    def assign(rows, label=None):
+        for row in rows:
+            if label is None:
+                candidates = np.flatnonzero(desired_total == desired_total.max())
+            else:
+                # Fold que mais precisa desta missão; empates pelo total e depois ao acaso
+                candidates = np.flatnonzero(desired_label[:, label] == desired_label[:, label].max())
+                candidates = candidates[desired_total[candidates] == desired_total[candidates].max()]
+            fold = rng.choice(candidates)
+            folds[row] = fold
+            desired_total[fold] -= 1
+            desired_label[fold] -= Y[row]
+
+    remaining = Y.copy()
+    while remaining.any():
+        # Missão com menos positivos ainda não atribuídos
+        counts = remaining.sum(axis=0).astype(float)
+        counts[counts == 0] = np.inf
+        label = int(np.argmin(counts))
+        rows = rng.permutation(np.flatnonzero(remaining[:, label]))
+        assign(rows, label)
+        remaining[rows] = False
+    # Linhas sem nenhuma missão equilibram o tamanho dos folds
+    assign(rng.permutation(np.flatnonzero(folds == -1)))
+    return folds
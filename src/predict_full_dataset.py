@@ -1,7 +1,15 @@
 import pandas as pd
+import numpy as np
 import os
 import joblib
-from sentence_transformers import SentenceTransformer
+import argparse
+
+from embeddings import (
+    EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, EMBEDDING_BACKENDS, EMBEDDING_BATCH_SIZE, EMBEDDING_TOKEN_BUDGET,
+    embed_texts, cache_namespace, trained_max_seq_length,
+)
+from incremental import IncrementalScorer, file_version
+from data_io import read_table
 
 # --- CONFIGURAÇÃO ---
 # Caminho para o dataset completo que queremos classificar
@@ -10,20 +18,54 @@ FULL_DATASET_PATH = os.path.join('data', 'processed', 'df_executores.csv')
 # Caminho para o nosso melhor classificador treinado (que foi treinado sobre os embeddings)
 CLASSIFIER_MODEL_PATH = os.path.join('reports', 'model_v4_embeddings.joblib')
 
-# Nome do modelo de embedding que foi usado no treinamento (deve ser o mesmo)
-EMBEDDING_MODEL_NAME = 'paraphrase-multilingual-mpnet-base-v2'
-
 # Caminho para o arquivo de saída com a classificação final
 FINAL_OUTPUT_PATH = os.path.join('reports', 'classificacao_final_bert.csv')
 
+# Embeddings de todas as organizações (`vectors`, float32, na ordem das linhas da saída), o nome
+# de cada linha (`names`) e as opções de codificação (`namespace`, ver `cache_namespace`), lidos
+# pelo índice de organizações semelhantes (`build_similarity_index.py`)
+EMBEDDINGS_OUTPUT_PATH = os.path.join('reports', 'classificacao_final_bert_embeddings.npz')
+
+# Manifesto do modo incremental (hash dos textos de cada linha -> previsões da última execução)
+MANIFEST_PATH = os.path.join('reports', 'classificacao_final_bert.manifest.npz')
+
 # As features de texto e os nomes dos rótulos devem ser os mesmos do treinamento
 TEXT_FEATURES = ['nome_organizacao', 'descricao_organizacao', 'segmento_atuacao', 'tecnologias_disruptivas']
 TARGET_LABELS = ['M1_Agro', 'M2_Saude', 'M3_Infra_Mobilidade', 'M4_Transformacao_Digital', 'M5_Bioeconomia_Energia', 'M6_Defesa_Soberania']
 
 
-def predict_full_dataset():
+def collect_embeddings(texts, part_embeddings, embedding_options):
+    """
+    Matriz de embeddings de todas as linhas a partir dos vetores já calculados na predição.
+    No modo incremental, as linhas que não foram reclassificadas são buscadas no cache em disco.
+    """
+    covered = np.zeros(len(texts), dtype=bool)
+    embeddings = None
+    for index, vectors in part_embeddings:
+        positions = texts.index.get_indexer(index)
+        if embeddings is None:
+            embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        embeddings[positions] = vectors
+        covered[positions] = True
+    if covered.all():
+        return embeddings
+    missing = np.flatnonzero(~covered)
+    vectors = embed_texts(texts.iloc[missing].tolist(), **embedding_options)
+    if embeddings is None:
+        embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+    embeddings[missing] = vectors
+    return embeddings
+
+
+def predict_full_dataset(incremental=False, backend=EMBEDDING_BACKEND, batch_size=EMBEDDING_BATCH_SIZE,
+                         token_budget=EMBEDDING_TOKEN_BUDGET, max_seq_length=None):
     """
     Carrega o modelo treinado com embeddings e o utiliza para classificar o dataset completo.
+    No modo incremental, apenas as organizações novas ou com texto alterado desde a última
+    execução são classificadas; as demais reaproveitam as previsões anteriores.
+    `backend` escolhe o backend de inferência do modelo de embedding ('torch', 'int8' ou 'onnx');
+    `batch_size`, `token_budget` e `max_seq_length` controlam os lotes e o truncamento (ver
+    `embeddings.py`); sem `max_seq_length`, usa o truncamento gravado no classificador no treino.
     """
     print("Iniciando a classificação do dataset completo com o modelo BERT...")
 
@@ -32,20 +74,20 @@ def predict_full_dataset():
         # Carrega o classificador (e.g., Regressão Logística) que foi treinado
         classifier = joblib.load(CLASSIFIER_MODEL_PATH)
         print(f"Classificador carregado com sucesso de '{CLASSIFIER_MODEL_PATH}'.")
-        
-        # Carrega o modelo de embedding da biblioteca SentenceTransformer
-        print(f"Carregando o modelo de embedding '{EMBEDDING_MODEL_NAME}'...")
-        embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-        print("Modelo de embedding carregado.")
-        
     except FileNotFoundError as e:
         print(f"ERRO: Arquivo de modelo não encontrado: {e}")
         print("Por favor, execute o script 'train_evaluate_model_v4.py' primeiro.")
         return
+    trained_length = trained_max_seq_length(classifier)
+    if max_seq_length is None:
+        max_seq_length = trained_length
+    elif max_seq_length != trained_length:
+        print(f"AVISO: truncamento {max_seq_length} diferente do usado no treino ({trained_length or 'padrão do modelo'}).")
 
     # --- Etapa 2: Carregar e preparar o dataset completo ---
     try:
-        df_full = pd.read_csv(FULL_DATASET_PATH)
+        # Usa a versão Parquet do arquivo, se existir e estiver atualizada
+        df_full = read_table(FULL_DATASET_PATH)
         print(f"Dataset completo com {len(df_full)} empresas carregado.")
     except FileNotFoundError:
         print(f"ERRO: Dataset completo não encontrado em '{FULL_DATASET_PATH}'.")
@@ -54,16 +96,32 @@ def predict_full_dataset():
     # Prepara o campo de texto combinado, assim como foi feito no treino
     for col in TEXT_FEATURES:
         df_full[col] = df_full[col].fillna('')
-    texts_to_predict = df_full[TEXT_FEATURES].apply(lambda row: ' '.join(row.values.astype(str)), axis=1).tolist()
+    texts_to_predict = df_full[TEXT_FEATURES].apply(lambda row: ' '.join(row.values.astype(str)), axis=1)
+
+    embedding_options = {
+        'backend': backend, 'batch_size': batch_size, 'token_budget': token_budget, 'max_seq_length': max_seq_length,
+    }
+    # Vetores calculados em cada parte classificada, guardados para a saída de embeddings
+    part_embeddings = []
 
-    # --- Etapa 3: Gerar Embeddings para o dataset completo ---
-    print("\nGerando embeddings para todo o dataset... (Isso pode levar alguns minutos)")
-    X_embeddings_full = embedding_model.encode(texts_to_predict, show_progress_bar=True)
-    print("Embeddings gerados com sucesso.")
+    def predict(df_part):
+        # --- Etapa 3: Gerar Embeddings para as organizações a classificar ---
+        # Os embeddings vêm do módulo compartilhado `embeddings.py`: apenas organizações novas ou
+        # com texto alterado são codificadas, e o modelo só é carregado se houver algo a codificar.
+        X_embeddings = embed_texts(texts_to_predict.loc[df_part.index].tolist(), **embedding_options)
+        print("Embeddings gerados com sucesso.")
+        part_embeddings.append((df_part.index, X_embeddings))
 
-    # --- Etapa 4: Fazer as previsões usando o classificador ---
-    print("Realizando previsões...")
-    y_pred_full = classifier.predict(X_embeddings_full)
+        # --- Etapa 4: Fazer as previsões usando o classificador ---
+        print("Realizando previsões...")
+        return classifier.predict(X_embeddings)
+
+    if incremental:
+        version = file_version(CLASSIFIER_MODEL_PATH, extra=cache_namespace(EMBEDDING_MODEL_NAME, backend, max_seq_length))
+        scorer = IncrementalScorer(MANIFEST_PATH, version, TEXT_FEATURES)
+        y_pred_full = scorer.score(df_full, predict)
+    else:
+        y_pred_full = predict(df_full)
     print("Previsões concluídas.")
 
     # --- Etapa 5: Integrar as previsões e salvar o resultado ---
@@ -79,9 +137,41 @@ def predict_full_dataset():
     os.makedirs(os.path.dirname(FINAL_OUTPUT_PATH), exist_ok=True)
     df_final.to_csv(FINAL_OUTPUT_PATH, index=False, encoding='utf-8-sig')
 
+    embeddings = collect_embeddings(texts_to_predict, part_embeddings, embedding_options)
+    np.savez(EMBEDDINGS_OUTPUT_PATH, vectors=embeddings, names=df_full['nome_organizacao'].to_numpy(dtype=str),
+             namespace=cache_namespace(EMBEDDING_MODEL_NAME, backend, max_seq_length))
+
+    # O manifesto só é atualizado depois que a saída foi gravada com sucesso
+    if incremental:
+        scorer.save()
+
     print("-" * 50)
     print("Processo finalizado com sucesso!")
     print(f"O arquivo com a classificação completa de todas as empresas foi salvo em: '{FINAL_OUTPUT_PATH}'")
+    print(f"Os embeddings das empresas foram salvos em: '{EMBEDDINGS_OUTPUT_PATH}'")
 
 if __name__ == "__main__":
-    predict_full_dataset()
+    parser = argparse.ArgumentParser(description="Classificação do dataset completo com o modelo de embeddings.")
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help="Classifica apenas as organizações novas ou alteradas desde a última execução."
+    )
+    parser.add_argument(
+        '--backend', choices=EMBEDDING_BACKENDS, default=EMBEDDING_BACKEND,
+        help="Backend de inferência do modelo de embedding (padrão: %(default)s)."
+    )
+    parser.add_argument(
+        '--batch-size', type=int, default=EMBEDDING_BATCH_SIZE,
+        help="Máximo de textos por lote de codificação (padrão: %(default)s)."
+    )
+    parser.add_argument(
+        '--token-budget', type=int, default=EMBEDDING_TOKEN_BUDGET,
+        help="Máximo de tokens (com padding) por lote de codificação (padrão: %(default)s)."
+    )
+    parser.add_argument(
+        '--max-seq-length', type=int, default=None,
+        help="Truncamento dos textos, em tokens (padrão: o gravado no classificador pelo treino)."
+    )
+    args = parser.parse_args()
+    predict_full_dataset(incremental=args.incremental, backend=args.backend, batch_size=args.batch_size,
+                         token_budget=args.token_budget, max_seq_length=args.max_seq_length)
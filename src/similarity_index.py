@@ -0,0 +1,92 @@
+"""
+Índice de vizinhos mais próximos aproximados (ANN) sobre os embeddings das organizações.
+
+Estrutura IVF (inverted file): os vetores, normalizados, são agrupados com k-means em
+`n_lists` listas; cada consulta só compara o vetor com as organizações das `n_probe` listas
+de centroides mais próximos, em vez de com todas. Dentro das listas a similaridade de
+cosseno é exata (produto escalar dos vetores normalizados).
+
+O índice é gravado em um único `.npz` (sem pickle), lido pelo dashboard para o painel de
+organizações semelhantes. Para gerá-lo, execute `src/build_similarity_index.py`.
+"""
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+N_PROBE = 8  # Listas visitadas por consulta (mais listas: mais preciso e mais lento)
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class SimilarityIndex:
+    """Índice IVF de organizações (`names`, `groups`) a partir dos seus embeddings."""
+
+    def __init__(self, vectors, names, groups, centroids, offsets):
+        # Os vetores ficam ordenados por lista: a lista i ocupa as linhas offsets[i]:offsets[i + 1]
+        self.vectors = vectors
+        self.names = names
+        self.groups = groups
+        self.centroids = centroids
+        self.offsets = offsets
+        self._positions = {(group, name): i for i, (group, name) in enumerate(zip(groups, names))}
+
+    @classmethod
+    def build(cls, vectors, names, groups, n_lists=None, random_state=42):
+        """Agrupa os vetores com k-means (por padrão, ~sqrt(n) listas) e monta o índice."""
+        vectors = normalize_rows(vectors)
+        n_lists = n_lists or max(1, int(np.sqrt(len(vectors))))
+        kmeans = KMeans(n_clusters=n_lists, n_init=1, random_state=random_state).fit(vectors)
+        order = np.argsort(kmeans.labels_, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(kmeans.labels_, minlength=n_lists))])
+        return cls(
+            np.ascontiguousarray(vectors[order]),
+            np.asarray(names, dtype=str)[order],
+            np.asarray(groups, dtype=str)[order],
+            normalize_rows(kmeans.cluster_centers_),
+            offsets,
+        )
+
+    def save(self, path):
+        np.savez(path, vectors=self.vectors, names=self.names, groups=self.groups,
+                 centroids=self.centroids, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['vectors'], data['names'], data['groups'], data['centroids'], data['offsets'])
+
+    def position(self, group, name):
+        """Posição de uma organização no índice, ou None se ela não estiver indexada."""
+        return self._positions.get((group, name))
+
+    def search(self, vector, k=5, n_probe=N_PROBE, groups=None, exclude=None):
+        """
+        As `k` organizações mais semelhantes a `vector`, como lista de (grupo, nome, similaridade).
+        `groups` restringe o resultado a alguns grupos; `exclude` é uma posição a ignorar
+        (a própria organização consultada).
+        """
+        vector = normalize_rows(np.atleast_2d(vector))[0]
+        lists = np.argsort(-(self.centroids @ vector))[:n_probe]
+        candidates = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+        if groups is not None:
+            candidates = candidates[np.isin(self.groups[candidates], list(groups))]
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        if len(candidates) == 0:
+            return []
+
+        scores = self.vectors[candidates] @ vector
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.groups[candidates[i]], self.names[candidates[i]], float(scores[i])) for i in top]
+
+    def similar_to(self, group, name, k=5, n_probe=N_PROBE, groups=None):
+        """Organizações mais semelhantes a uma organização já indexada (sem ela mesma)."""
+        position = self.position(group, name)
+        if position is None:
+            return []
+        return self.search(self.vectors[position], k=k, n_probe=n_probe, groups=groups, exclude=position)
@@ -2,13 +2,17 @@ import pandas as pd
 import numpy as np
 import os
 import joblib
+import argparse
 
 from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
-from sklearn.multioutput import MultiOutputClassifier
 from sklearn.metrics import classification_report
-# A biblioteca sentence-transformers é a peça central desta nova abordagem.
-from sentence_transformers import SentenceTransformer
+# Os embeddings (sentence-transformers) vêm do módulo compartilhado com a etapa de predição.
+from embeddings import (
+    EMBEDDING_MODEL_NAME, EMBEDDING_BATCH_SIZE, EMBEDDING_TOKEN_BUDGET, EMBEDDING_MAX_SEQ_LENGTH, embed_texts,
+)
+from data_io import read_table
+from hyperparameter_search import SEARCH_STRATEGIES, DEFAULT_BUDGET, make_search
+from multilabel import CLASSIFIER_KINDS, make_mission_classifier
 
 # --- CONFIGURAÇÃO ---
 GOLDEN_DATASET_PATH = os.path.join('data', 'processed', 'golden_dataset.csv')
@@ -18,9 +22,12 @@ TEST_SET_SIZE = 0.2
 RANDOM_STATE = 42
 MODEL_PIPELINE_PATH = os.path.join('reports', 'model_v4_embeddings.joblib')
 
-# MUDANÇA: Trocamos por um modelo de ponta, especificamente treinado para embeddings semânticos.
-# Este modelo é multilíngue e muito eficaz para tarefas como a nossa.
-EMBEDDING_MODEL_NAME = 'paraphrase-multilingual-mpnet-base-v2'
+# Espaço de busca da Regressão Logística, usado apenas com a opção --search
+# (com o classificador 'multilabel', os parâmetros não têm o prefixo `estimator__`)
+SEARCH_SPACE = {
+    'estimator__C': list(np.logspace(-3, 2, 21)),
+    'estimator__class_weight': ['balanced', None],
+}
 
 
 def load_and_prepare_data(filepath):
@@ -28,7 +35,7 @@ def load_and_prepare_data(filepath):
     if not os.path.exists(filepath):
         print(f"ERRO: Golden Dataset não encontrado em '{filepath}'")
         return None, None
-    df = pd.read_csv(filepath)
+    df = read_table(filepath, columns=TEXT_FEATURES + TARGET_LABELS)
     print(f"Golden Dataset carregado com sucesso. {len(df)} linhas encontradas.")
     for col in TEXT_FEATURES:
         df[col] = df[col].fillna('')
@@ -40,9 +47,15 @@ def load_and_prepare_data(filepath):
     
     return texts, labels, df
 
-def main():
+def main(search=None, budget=DEFAULT_BUDGET, time_budget=None, classifier_kind='multioutput',
+         batch_size=EMBEDDING_BATCH_SIZE, token_budget=EMBEDDING_TOKEN_BUDGET, max_seq_length=EMBEDDING_MAX_SEQ_LENGTH):
     """
     Função principal que orquestra o pipeline de treinamento com embeddings semânticos.
+    `classifier_kind` escolhe o classificador das missões (ver `multilabel.py`).
+    `batch_size`, `token_budget` e `max_seq_length` controlam os lotes e o truncamento da
+    codificação (ver `embeddings.py`); o truncamento fica gravado no classificador salvo.
+    Com `search` (ver `hyperparameter_search.py`), os hiperparâmetros da Regressão Logística
+    são escolhidos por validação cruzada no conjunto de treino, em vez de fixos.
     """
     print(f"Iniciando o pipeline de treinamento do modelo v4 (Embeddings Semânticos)...")
     
@@ -51,15 +64,11 @@ def main():
     if texts is None: return
 
     # 2. Gerar os Embeddings Semânticos
-    # A classe SentenceTransformer carrega o modelo pré-treinado.
-    # O download do modelo (aprox. 1.1GB) ocorrerá automaticamente na primeira vez.
-    print(f"Carregando o modelo de embedding '{EMBEDDING_MODEL_NAME}'...")
-    print("Isso pode demorar e fará o download de um modelo grande na primeira execução.")
-    embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-    
-    print("Gerando embeddings para todos os textos... (Isso pode levar alguns minutos)")
-    # O método encode() transforma a lista de textos em uma matriz de vetores numéricos.
-    X_embeddings = embedding_model.encode(texts, show_progress_bar=True)
+    # O módulo `embeddings.py` usa o modelo multilíngue EMBEDDING_MODEL_NAME e um cache em disco
+    # compartilhado com `predict_full_dataset.py`: textos já codificados em execuções anteriores
+    # (de qualquer etapa) são reaproveitados e o modelo só é carregado se houver textos novos.
+    print(f"Gerando embeddings com o modelo '{EMBEDDING_MODEL_NAME}'...")
+    X_embeddings = embed_texts(texts, batch_size=batch_size, token_budget=token_budget, max_seq_length=max_seq_length)
     print("Embeddings gerados com sucesso.")
 
     # 3. Dividir os dados (agora com embeddings) em treino e teste
@@ -73,10 +82,21 @@ def main():
     # Voltamos para a Regressão Logística, que foi nosso modelo mais equilibrado.
     # A complexidade agora está nos embeddings, não no classificador.
     print("Treinando o classificador sobre os embeddings...")
-    classifier = MultiOutputClassifier(
-        LogisticRegression(class_weight='balanced', solver='liblinear', random_state=RANDOM_STATE)
-    )
-    classifier.fit(X_train, y_train)
+    classifier = make_mission_classifier(classifier_kind, random_state=RANDOM_STATE)
+    if search:
+        print(f"Buscando os hiperparâmetros do classificador ({search})...")
+        space = SEARCH_SPACE
+        if classifier_kind == 'multilabel':
+            space = {name.replace('estimator__', ''): values for name, values in SEARCH_SPACE.items()}
+        searcher = make_search(
+            search, classifier, space, budget=budget, time_budget=time_budget,
+            cv=3, scoring='f1_weighted', n_jobs=-1, random_state=RANDOM_STATE
+        )
+        searcher.fit(X_train, y_train)
+        print(f"Melhores parâmetros (F1 ponderado na validação cruzada: {searcher.best_score_:.4f}): {searcher.best_params_}")
+        classifier = searcher.best_estimator_
+    else:
+        classifier.fit(X_train, y_train)
     print("Treinamento concluído.")
 
     # 5. Fazer previsões e avaliar
@@ -92,10 +112,45 @@ def main():
     print(report)
     
     # 6. Salvar o classificador treinado para uso futuro
+    # O truncamento muda os vetores: a predição e o serviço leem este atributo para codificar igual ao treino
+    classifier.embedding_options_ = {'model_name': EMBEDDING_MODEL_NAME, 'max_seq_length': max_seq_length}
     os.makedirs(os.path.dirname(MODEL_PIPELINE_PATH), exist_ok=True)
     joblib.dump(classifier, MODEL_PIPELINE_PATH)
     print(f"\nModelo classificador treinado salvo em '{MODEL_PIPELINE_PATH}'")
     print("Para usar o modelo, você precisará gerar embeddings para novos dados e depois usar este classificador.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(
+        description="Treino do modelo v4 (embeddings + Regressão Logística). O modelo v5 (encoder ajustado) é treinado por `finetune_encoder.py`."
+    )
+    parser.add_argument(
+        '--search', choices=SEARCH_STRATEGIES, default=None,
+        help="Busca os hiperparâmetros da Regressão Logística com a estratégia informada (padrão: parâmetros fixos)."
+    )
+    parser.add_argument(
+        '--budget', type=int, default=DEFAULT_BUDGET,
+        help="Máximo de combinações avaliadas pelas estratégias de halving e 'tpe' (padrão: %(default)s)."
+    )
+    parser.add_argument(
+        '--time-budget', type=float, default=None,
+        help="Tempo máximo das buscas 'halving-grid', 'halving-random' e 'tpe', em segundos."
+    )
+    parser.add_argument(
+        '--classifier', choices=CLASSIFIER_KINDS, default='multioutput',
+        help="'multioutput': seis regressões independentes; 'multilabel': uma única matriz de pesos (padrão: %(default)s)."
+    )
+    parser.add_argument(
+        '--batch-size', type=int, default=EMBEDDING_BATCH_SIZE,
+        help="Máximo de textos por lote de codificação (padrão: %(default)s)."
+    )
+    parser.add_argument(
+        '--token-budget', type=int, default=EMBEDDING_TOKEN_BUDGET,
+        help="Máximo de tokens (com padding) por lote de codificação (padrão: %(default)s)."
+    )
+    parser.add_argument(
+        '--max-seq-length', type=int, default=EMBEDDING_MAX_SEQ_LENGTH,
+        help="Truncamento dos textos, em tokens (padrão: o do modelo). Fica gravado no classificador salvo."
+    )
+    args = parser.parse_args()
+    main(search=args.search, budget=args.budget, time_budget=args.time_budget, classifier_kind=args.classifier,
+         batch_size=args.batch_size, token_budget=args.token_budget, max_seq_length=args.max_seq_length)
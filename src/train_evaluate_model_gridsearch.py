@@ -2,8 +2,9 @@ import pandas as pd
 import numpy as np
 import os
 import joblib
+import argparse
 
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.multioutput import MultiOutputClassifier
@@ -12,6 +13,9 @@ from sklearn.metrics import classification_report
 import nltk
 from nltk.corpus import stopwords
 
+from data_io import read_table
+from hyperparameter_search import SEARCH_STRATEGIES, DEFAULT_BUDGET, make_search
+
 # --- CONFIGURAÇÃO ---
 GOLDEN_DATASET_PATH = os.path.join('data', 'processed', 'golden_dataset.csv')
 TEXT_FEATURES = ['nome_organizacao', 'descricao_organizacao', 'segmento_atuacao', 'tecnologias_disruptivas']
@@ -20,6 +24,22 @@ TEST_SET_SIZE = 0.2
 RANDOM_STATE = 42
 MODEL_PIPELINE_PATH = os.path.join('reports', 'model_pipeline_v3.joblib')
 
+# Espaço de busca mais amplo, usado pelas estratégias que não avaliam todas as combinações
+# (halving e TPE). O GridSearchCV exaustivo continua usando a grade reduzida definida em `main`.
+SEARCH_SPACE = {
+    'tfidf__ngram_range': [(1, 1), (1, 2), (1, 3)],
+    'tfidf__max_features': [1000, 2000, 3000, 5000, None],
+    'tfidf__min_df': [1, 2, 3],
+    'tfidf__sublinear_tf': [False, True],
+    'clf__estimator__n_estimators': [100, 200, 400],
+    'clf__estimator__max_depth': [None, 10, 20, 40],
+    'clf__estimator__min_samples_leaf': [1, 2, 4],
+    'clf__estimator__max_features': ['sqrt', 'log2'],
+}
+
+# Cache em disco das matrizes TF-IDF ajustadas em cada fold, para cada configuração do TF-IDF
+FEATURE_CACHE_DIR = os.path.join('data', 'cache', 'tfidf_features')
+
 def download_nltk_resources():
     """Verifica e baixa os recursos necessários do NLTK."""
     try:
@@ -33,7 +53,7 @@ def load_and_prepare_data(filepath):
     if not os.path.exists(filepath):
         print(f"ERRO: Golden Dataset não encontrado em '{filepath}'")
         return None, None, None
-    df = pd.read_csv(filepath)
+    df = read_table(filepath, columns=TEXT_FEATURES + TARGET_LABELS)
     print(f"Golden Dataset carregado com sucesso. {len(df)} linhas encontradas.")
     for col in TEXT_FEATURES:
         df[col] = df[col].fillna('')
@@ -42,9 +62,14 @@ def load_and_prepare_data(filepath):
     y = df[TARGET_LABELS]
     return X, y, df
 
-def main():
+def main(feature_cache=True, search='grid', budget=DEFAULT_BUDGET, time_budget=None):
     """
     Função principal que orquestra o pipeline de treinamento com otimização.
+    `search` escolhe a estratégia de busca (ver `hyperparameter_search.py`); `budget` e
+    `time_budget` limitam o número de combinações avaliadas e o tempo da busca.
+    Com `feature_cache`, o TF-IDF ajustado em cada fold (e a matriz que ele produz) é guardado
+    em disco por configuração do TF-IDF e reaproveitado por todas as combinações de parâmetros
+    do RandomForest: o tempo da busca passa a depender quase só dos ajustes do classificador.
     """
     print("Iniciando o pipeline de treinamento do modelo v3 (RandomForest + GridSearchCV)...")
     download_nltk_resources()
@@ -61,10 +86,13 @@ def main():
     print(f"Dados divididos em {len(X_train)} para treino e {len(X_test)} para teste.")
 
     # 3. Construir o pipeline com o RandomForestClassifier
+    # `memory` faz o Pipeline memorizar o ajuste do TF-IDF pela chave (parâmetros, textos do fold).
+    # O cache persiste entre execuções; apague a pasta FEATURE_CACHE_DIR para liberar espaço.
+    memory = joblib.Memory(FEATURE_CACHE_DIR, verbose=0) if feature_cache else None
     pipeline = Pipeline([
         ('tfidf', TfidfVectorizer(stop_words=portuguese_stopwords)),
         ('clf', MultiOutputClassifier(RandomForestClassifier(class_weight='balanced', random_state=RANDOM_STATE)))
-    ])
+    ], memory=memory)
 
     # 4. Definir o Grid de Hiperparâmetros para o GridSearchCV
     # GridSearchCV irá testar todas as combinações destes parâmetros para encontrar a melhor.
@@ -76,23 +104,28 @@ def main():
         'clf__estimator__max_depth': [None, 10],   # Testa profundidade das árvores
     }
     
-    # 5. Configurar e executar o GridSearchCV
+    # 5. Configurar e executar a busca
     # scoring='f1_weighted': Otimiza para o F1-score ponderado, bom para datasets desbalanceados.
     # cv=3: Validação cruzada com 3 folds.
     # n_jobs=-1: Usa todos os processadores disponíveis para acelerar a busca.
-    grid_search = GridSearchCV(pipeline, parameters, cv=3, n_jobs=-1, verbose=2, scoring='f1_weighted')
+    grid_search = make_search(
+        search, pipeline, parameters if search == 'grid' else SEARCH_SPACE,
+        budget=budget, time_budget=time_budget, cv=3, scoring='f1_weighted',
+        n_jobs=-1, random_state=RANDOM_STATE, verbose=2
+    )
     
-    print("\nIniciando a busca por hiperparâmetros (GridSearchCV)...")
+    print(f"\nIniciando a busca por hiperparâmetros ({search})...")
     print("Isso vai levar um tempo considerável. Por favor, aguarde.")
     grid_search.fit(X_train, y_train)
 
     # 6. Exibir os melhores parâmetros encontrados
     print("\nBusca concluída!")
-    print("Melhores parâmetros encontrados pelo GridSearchCV:")
+    print(f"Melhores parâmetros encontrados (F1 ponderado na validação cruzada: {grid_search.best_score_:.4f}):")
     print(grid_search.best_params_)
 
     # 7. Avaliar o melhor modelo encontrado
-    best_model = grid_search.best_estimator_
+    # O modelo salvo não deve depender da pasta de cache
+    best_model = grid_search.best_estimator_.set_params(memory=None)
     y_pred = best_model.predict(X_test)
 
     print("\n--- Relatório de Classificação do Modelo v3 (Otimizado) ---\n")
@@ -110,4 +143,22 @@ def main():
     print(f"\nMelhor modelo salvo em '{MODEL_PIPELINE_PATH.replace('_v2', '_v3')}'")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Treino do modelo v3 (TF-IDF + RandomForest) com GridSearchCV.")
+    parser.add_argument(
+        '--no-feature-cache', action='store_true',
+        help="Reajusta o TF-IDF em cada fold e combinação de parâmetros, sem cache em disco."
+    )
+    parser.add_argument(
+        '--search', choices=SEARCH_STRATEGIES, default='grid',
+        help="Estratégia de busca de hiperparâmetros (padrão: %(default)s)."
+    )
+    parser.add_argument(
+        '--budget', type=int, default=DEFAULT_BUDGET,
+        help="Máximo de combinações avaliadas pelas estratégias de halving e 'tpe' (padrão: %(default)s)."
+    )
+    parser.add_argument(
+        '--time-budget', type=float, default=None,
+        help="Tempo máximo das buscas 'halving-grid', 'halving-random' e 'tpe', em segundos."
+    )
+    args = parser.parse_args()
+    main(feature_cache=not args.no_feature_cache, search=args.search, budget=args.budget, time_budget=args.time_budget)
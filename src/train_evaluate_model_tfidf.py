@@ -2,11 +2,10 @@ import pandas as pd
 import numpy as np
 import os
 import joblib
+import argparse
 
 from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.multioutput import MultiOutputClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import classification_report
 # NLTK é uma biblioteca popular para processamento de linguagem natural.
@@ -14,6 +13,9 @@ from sklearn.metrics import classification_report
 import nltk
 from nltk.corpus import stopwords
 
+from data_io import read_table
+from multilabel import CLASSIFIER_KINDS, make_mission_classifier
+
 # --- CONFIGURAÇÃO ---
 # ATUALIZADO: Apontando para o nosso novo dataset com os dados do batch 2 integrados.
 GOLDEN_DATASET_PATH = os.path.join('data', 'processed', 'golden_dataset.csv')
@@ -39,7 +41,7 @@ def load_and_prepare_data(filepath):
         print(f"ERRO: Golden Dataset não encontrado em '{filepath}'")
         return None, None, None
 
-    df = pd.read_csv(filepath)
+    df = read_table(filepath)
     print(f"Golden Dataset carregado com sucesso. {len(df)} linhas encontradas.")
     
     # Preenche valores NaN (nulos) nos campos de texto com uma string vazia
@@ -55,9 +57,10 @@ def load_and_prepare_data(filepath):
     
     return X, y, df
 
-def main():
+def main(classifier='multioutput'):
     """
     Função principal que orquestra o pipeline de treinamento e avaliação.
+    `classifier` escolhe o classificador das missões (ver `multilabel.py`).
     """
     print("Iniciando o pipeline de treinamento e avaliação do modelo v2 (balanceado) com dados aumentados...")
     
@@ -80,7 +83,7 @@ def main():
     print("Construindo o pipeline do modelo...")
     pipeline = Pipeline([
         ('tfidf', TfidfVectorizer(stop_words=portuguese_stopwords, ngram_range=(1, 2), max_features=3000)),
-        ('clf', MultiOutputClassifier(LogisticRegression(solver='liblinear', class_weight='balanced', random_state=RANDOM_STATE)))
+        ('clf', make_mission_classifier(classifier, random_state=RANDOM_STATE))
     ])
     
     # 4. Treinar o modelo
@@ -110,4 +113,10 @@ def main():
     print("O objetivo é ver uma melhora nos scores F1 das classes que foram aumentadas.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Treino e avaliação do modelo v2 (TF-IDF + Regressão Logística).")
+    parser.add_argument(
+        '--classifier', choices=CLASSIFIER_KINDS, default='multioutput',
+        help="'multioutput': seis regressões independentes; 'multilabel': uma única matriz de pesos (padrão: %(default)s)."
+    )
+    args = parser.parse_args()
+    main(classifier=args.classifier)